@@ -0,0 +1,448 @@
+"""A module that benchmarks the dashboard offline, so there is a performance baseline that can be compared across commits. The covid and news apis are replaced by synthetic data, so the results only depend on this code and the machine it runs on
+
+Run it from the project directory with:
+
+    python benchmark.py --output benchmark_results.json --compare old_results.json
+
+    Attributes
+    ----------
+    CSV_SIZES ( tuple ):
+        The number of rows in the synthetic CSV files.
+    REMOVED_SIZES ( tuple ):
+        The number of dismissed articles update_news() is benchmarked with.
+    SCHEDULER_JOBS ( int ):
+        The number of jobs used to measure the throughput of the scheduler.
+    RECORD_SIZES ( tuple ):
+        The number of articles and updates that are kept when the memory of the records is measured.
+
+    Methods
+    -------
+    time_function(function, repeat=5):
+        Function to time a function and return the fastest, median and mean time
+    write_synthetic_csv(file_name, rows):
+        Function to write a synthetic covid CSV file in the format of the covid api
+    bench_csv(sizes=CSV_SIZES, repeat=3):
+        Function to time parse_csv_data() with process_covid_csv_data(), and convert_csv_to_dict(), on synthetic files
+    bench_news(sizes=REMOVED_SIZES, articles=100, repeat=5):
+        Function to time update_news() when there are many dismissed articles
+    bench_scheduler(jobs=SCHEDULER_JOBS):
+        Function to time adding, cancelling and running thousands of scheduler jobs
+    bench_records(sizes=RECORD_SIZES):
+        Function to measure the memory of the article and update records against the dictionaries they replaced
+    bench_render(repeat=50):
+        Function to time home() with the flask test client
+    run_benchmarks(quick=False):
+        Function to run every benchmark and return the results
+    compare_results(old, new, threshold=1.2):
+        Function to find the timings that got slower between two sets of results
+
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+import threading
+import time
+from datetime import date, timedelta
+
+CSV_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+REMOVED_SIZES = (1_000, 10_000, 100_000)
+SCHEDULER_JOBS = 5_000
+RECORD_SIZES = (10_000, 100_000)
+
+
+def time_function(function, repeat: int = 5) -> dict:
+    """Function to time a function and return the fastest, median and mean time
+
+        Parameters:
+            function ( function ):
+                The function to time, which is called with no arguments
+            repeat ( int ):
+                The number of times the function is called
+
+        Returns:
+            timing ( dictionary ):
+                The min, median and mean time in milliseconds and the number of repeats
+
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return {'min_ms': round(min(times), 3), 'median_ms': round(statistics.median(times), 3), 'mean_ms': round(statistics.mean(times), 3), 'repeat': repeat}
+
+
+def write_synthetic_csv(file_name: str, rows: int) -> None:
+    """Function to write a synthetic covid CSV file in the format of the covid api, with the newest date first and the newest day of cases and deaths missing like the real data. The dates start again after 700,000 days, because the biggest files go back further than the year 1
+
+        Parameters:
+            file_name ( str ):
+                The name of the file to write
+            rows ( int ):
+                The number of rows after the header
+
+    """
+    newest = date(2021, 10, 28)
+    with open(file_name, 'w', encoding='cp1252') as csv_file:
+        csv_file.write('areaCode,areaName,areaType,date,cumDailyNsoDeathsByDeathDate,hospitalCases,newCasesBySpecimenDate\n')
+        for row in range(rows):
+            day = (newest - timedelta(days=row % 700_000)).isoformat()
+            deaths = '' if row < 12 else str(200_000 - row)
+            cases = '' if row == 0 else str(20_000 + (row * 7919) % 30_000)
+            csv_file.write('E92000001,England,nation,%s,%s,%d,%s\n' % (day, deaths, 5_000 + row % 3_000, cases))
+
+
+def bench_csv(sizes: tuple = CSV_SIZES, repeat: int = 3) -> dict:
+    """Function to time parse_csv_data() with process_covid_csv_data(), and convert_csv_to_dict(), on synthetic files
+
+        Parameters:
+            sizes ( tuple ):
+                The number of rows in each synthetic file
+            repeat ( int ):
+                The number of times every stage is timed
+
+        Returns:
+            results ( dictionary ):
+                The timings of every stage, with the number of rows as the key
+
+    """
+    from covid_data_handler import convert_csv_to_dict, parse_csv_data, process_covid_csv_data
+    results = {'parse_and_process': {}, 'convert_csv_to_dict': {}}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            file_name = os.path.join(directory, 'synthetic_%d.csv' % size)
+            write_synthetic_csv(file_name, size)
+            results['parse_and_process'][str(size)] = time_function(lambda: process_covid_csv_data(parse_csv_data(file_name)), repeat)
+            contents = parse_csv_data(file_name)
+            results['convert_csv_to_dict'][str(size)] = time_function(lambda: convert_csv_to_dict(contents), repeat)
+            del contents
+    return results
+
+
+def bench_news(sizes: tuple = REMOVED_SIZES, articles: int = 100, repeat: int = 5) -> dict:
+    """Function to time update_news() when there are many dismissed articles. The news api is replaced by a function that returns synthetic articles
+
+        Parameters:
+            sizes ( tuple ):
+                The number of dismissed articles
+            articles ( int ):
+                The number of articles the fake news api returns
+            repeat ( int ):
+                The number of times update_news() is timed for every size
+
+        Returns:
+            results ( dictionary ):
+                The timings with the number of dismissed articles as the key
+
+    """
+    import covid_news_handling
+    from request_cache import api_cache
+    response = {'articles': [{'title': 'Synthetic story %d' % number, 'content': 'Content', 'url': 'https://example.com/%d' % number} for number in range(articles)]}
+    fetch = covid_news_handling._news_api_request
+    max_entries = covid_news_handling.removed.max_entries
+    covid_news_handling._news_api_request = lambda covid_terms: response
+    results = {}
+    try:
+        for size in sizes:
+            api_cache.invalidate()
+            covid_news_handling.removed.clear()
+            covid_news_handling.removed.max_entries = size + articles
+            for number in range(size):
+                covid_news_handling.removed.add('https://example.com/dismissed/%d' % number)
+            results[str(size)] = time_function(covid_news_handling.update_news, repeat)
+    finally:
+        covid_news_handling._news_api_request = fetch
+        covid_news_handling.removed.clear()
+        covid_news_handling.removed.max_entries = max_entries
+        api_cache.invalidate()
+    return results
+
+
+def bench_scheduler(jobs: int = SCHEDULER_JOBS) -> dict:
+    """Function to time adding, cancelling and running thousands of scheduler jobs
+
+        Parameters:
+            jobs ( int ):
+                The number of jobs
+
+        Returns:
+            results ( dictionary ):
+                The time to add and cancel the jobs, and the time and jobs per second to run them
+
+    """
+    from scheduler import Scheduler
+    results = {'jobs': jobs}
+    scheduler = Scheduler(max_workers=2)
+    start = time.perf_counter()
+    added = [scheduler.enter(3600, 1, len, ((), ), name='job %d' % number) for number in range(jobs)]
+    results['enter_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    start = time.perf_counter()
+    for job in added:
+        scheduler.cancel(job)
+    results['cancel_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    finished = threading.Event()
+    remaining = [jobs]
+    lock = threading.Lock()
+
+    def count() -> None:
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                finished.set()
+
+    start = time.perf_counter()
+    for _ in range(jobs):
+        scheduler.enter(0, 1, count)
+    finished.wait(60)
+    seconds = time.perf_counter() - start
+    scheduler.stop()
+    results['run_ms'] = round(seconds * 1000, 3)
+    results['jobs_per_second'] = round(jobs / seconds, 1)
+    return results
+
+
+def _retained_bytes(build) -> int:
+    """Function to return the number of bytes still allocated by what build() returns"""
+    tracemalloc.start()
+    try:
+        kept = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return size
+
+
+def _bytes_each(build, size: int) -> float:
+    """Function to return the bytes kept for every item built by build(size). It builds once without measuring so one time allocations like caches and interned strings arent counted, then measures size and half of size items and divides the difference, so the fixed cost of the container is left out too
+
+        Parameters:
+            build ( function ):
+                A function that returns a list of the given number of items
+            size ( int ):
+                The number of items
+
+        Returns:
+            bytes_each ( float ):
+                The bytes kept for every item
+
+    """
+    build(size)
+    half = size // 2
+    return round((_retained_bytes(lambda: build(size)) - _retained_bytes(lambda: build(half))) / (size - half), 1)
+
+
+def bench_records(sizes: tuple = RECORD_SIZES) -> dict:
+    """Function to measure the memory of the Article and Update records against the dictionaries they replaced. The articles are decoded from synthetic news api JSON, once as full dictionaries and once with decode_news()
+
+        Parameters:
+            sizes ( tuple ):
+                The number of articles and updates that are kept
+
+        Returns:
+            results ( dictionary ):
+                The bytes per article and per update for the dictionaries and the records, and the time to decode and load the articles, with the number kept as the key
+
+    """
+    import covid_news_handling
+    from dashboard_records import Update
+
+    def news_body(size: int) -> bytes:
+        return json.dumps({'status': 'ok', 'totalResults': size, 'articles': [{
+            'source': {'id': 'bbc-news', 'name': 'BBC News'}, 'author': 'BBC News', 'title': 'Synthetic story %d' % number,
+            'description': 'A description of synthetic story %d that is never shown' % number, 'url': 'https://example.com/%d' % number,
+            'urlToImage': 'https://example.com/%d.jpg' % number, 'publishedAt': '2021-12-01T10:00:00Z',
+            'content': 'Content of synthetic story %d' % number} for number in range(size)]}).encode()
+
+    def update_time(number: int) -> str:
+        return '%02d:%02d' % divmod(number % 1440, 60)
+
+    results = {'articles': {}, 'updates': {}}
+    for size in sizes:
+        bodies = {size: news_body(size), size // 2: news_body(size // 2)}
+        body = bodies[size]
+        articles = covid_news_handling.decode_news([body])['articles']
+        results['articles'][str(size)] = {
+            'dict_bytes_each': _bytes_each(lambda count: json.loads(bodies[count]), size),
+            'record_bytes_each': _bytes_each(lambda count: covid_news_handling.decode_news([bodies[count]]), size),
+            'decode': time_function(lambda: covid_news_handling.decode_news([body[start:start + 16384] for start in range(0, len(body), 16384)]), 3),
+            'load': time_function(lambda: covid_news_handling.load_articles(articles), 3),
+        }
+        covid_news_handling.load_articles([])
+        del articles, bodies
+        results['updates'][str(size)] = {
+            'dict_bytes_each': _bytes_each(lambda count: [{'title': 'update %d' % number, 'content': 'REPEATING: Updating covid and news at ' + update_time(number)}
+                for number in range(count)], size),
+            'record_bytes_each': _bytes_each(lambda count: [Update('update %d' % number, update_time(number), True, True, True) for number in range(count)], size),
+        }
+    return results
+
+
+def bench_render(repeat: int = 50) -> dict:
+    """Function to time home() with the flask test client. The apis are replaced by synthetic data before main.py is imported, so the warm up doesnt reach the network, and the config points every file main.py writes into a temporary directory. The apis and the config are put back afterwards
+
+        Parameters:
+            repeat ( int ):
+                The number of requests of every kind
+
+        Returns:
+            results ( dictionary ):
+                The timings of a render of a new snapshot, a page that was already rendered, a gzipped page and a 304 response
+
+    """
+    import covid_data_handler
+    import covid_news_handling
+    import dashboard_config
+    import dashboard_logging
+    from state_backend import data_plane
+    stream_lines = covid_data_handler.stream_covid_csv_lines
+    news_request = covid_news_handling._news_api_request
+    config_file_name = dashboard_config.config.file_name
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'synthetic.csv')
+        write_synthetic_csv(file_name, 1_000)
+        with open(file_name, encoding='cp1252') as csv_file:
+            lines = csv_file.readlines()
+        with open(config_file_name, encoding='cp1252') as config_file:
+            config_data = json.load(config_file)
+        for field in ('series_cache_file', 'binary_cache_dir', 'schedule_journal', 'state_database'):
+            config_data[field] = os.path.join(directory, os.path.basename(config_data.get(field, field)))
+        config_data['logging'] = dict(config_data.get('logging', {}), file=os.path.join(directory, 'pysys.log'))
+        with open(os.path.join(directory, 'config.json'), 'w', encoding='cp1252') as config_file:
+            json.dump(config_data, config_file)
+        covid_data_handler.stream_covid_csv_lines = lambda location, location_type, timeout=None: iter(lines)
+        covid_news_handling._news_api_request = lambda covid_terms: {'articles': [{'title': 'Synthetic story %d' % number, 'content': 'Content', 'url': 'https://example.com/%d' % number} for number in range(20)]}
+        dashboard_config.config.file_name = os.path.join(directory, 'config.json')
+        dashboard_config.config.reload()
+        try:
+            import main
+            from dashboard_snapshot import publish
+            if not os.path.isdir(os.path.join(main.app.root_path, main.app.template_folder)):
+                main.app.template_folder = 'Templates'
+            client = main.app.test_client()
+            client.get('/')
+
+            def new_snapshot() -> None:
+                publish()
+                client.get('/', headers={'Accept-Encoding': 'identity'})
+
+            etag = client.get('/', headers={'Accept-Encoding': 'identity'}).headers['ETag']
+            return {
+                'render_new_snapshot': time_function(new_snapshot, repeat),
+                'cached_page': time_function(lambda: client.get('/', headers={'Accept-Encoding': 'identity'}), repeat),
+                'cached_gzip_page': time_function(lambda: client.get('/', headers={'Accept-Encoding': 'gzip'}), repeat),
+                'not_modified': time_function(lambda: client.get('/', headers={'Accept-Encoding': 'identity', 'If-None-Match': etag}), repeat),
+            }
+        finally:
+            data_plane.stop()
+            for thread in threading.enumerate():
+                if thread.name == 'warm-up':
+                    thread.join()
+            covid_data_handler.suspend_schedules()
+            covid_data_handler.open_journal('')
+            dashboard_logging.stop_logging()
+            covid_data_handler.stream_covid_csv_lines = stream_lines
+            covid_news_handling._news_api_request = news_request
+            dashboard_config.config.file_name = config_file_name
+            dashboard_config.config.reload()
+
+
+def _commit() -> str:
+    """Function to return the git commit the benchmark ran on, or None if it isnt a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(quick: bool = False) -> dict:
+    """Function to run every benchmark and return the results
+
+        Parameters:
+            quick ( bool ):
+                If True smaller sizes are used, so the benchmarks finish in a few seconds
+
+        Returns:
+            results ( dictionary ):
+                The commit, python version, platform and time the benchmarks ran, and the results of every benchmark
+
+    """
+    csv_sizes = CSV_SIZES[:2] if quick else CSV_SIZES
+    removed_sizes = REMOVED_SIZES[:2] if quick else REMOVED_SIZES
+    return {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'results': {
+            'csv': bench_csv(csv_sizes),
+            'news': bench_news(removed_sizes),
+            'scheduler': bench_scheduler(SCHEDULER_JOBS // 5 if quick else SCHEDULER_JOBS),
+            'records': bench_records(RECORD_SIZES[:1] if quick else RECORD_SIZES),
+            'render': bench_render(10 if quick else 50),
+        },
+    }
+
+
+def _timings(results: dict, path: tuple = ()) -> dict:
+    """Function to flatten the results into a dictionary with the path of every median time as the key"""
+    timings = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            timings.update(_timings(value, path + (key, )))
+        elif key in ('median_ms', 'run_ms', 'enter_ms', 'cancel_ms'):
+            timings['/'.join(path + (key, ))] = value
+    return timings
+
+
+def compare_results(old: dict, new: dict, threshold: float = 1.2) -> list:
+    """Function to find the timings that got slower between two sets of results
+
+        Parameters:
+            old ( dictionary ):
+                The results of an earlier run, as returned by run_benchmarks()
+            new ( dictionary ):
+                The results of the run to check
+            threshold ( float ):
+                How many times slower a timing has to be to count as a regression
+
+        Returns:
+            regressions ( list ):
+                A list of (name, old milliseconds, new milliseconds) for every timing that got slower by more than the threshold
+
+    """
+    old_timings = _timings(old['results'])
+    new_timings = _timings(new['results'])
+    return [(name, old_timings[name], milliseconds) for name, milliseconds in sorted(new_timings.items())
+        if old_timings.get(name) and milliseconds > old_timings[name] * threshold]
+
+
+def main() -> int:
+    """Function to run the benchmarks from the command line, write the results as JSON and compare them with an earlier run"""
+    parser = argparse.ArgumentParser(description='Benchmark the covid dashboard offline')
+    parser.add_argument('--output', default='benchmark_results.json', help='the JSON file the results are written to')
+    parser.add_argument('--compare', help='a JSON file from an earlier run to compare the results with')
+    parser.add_argument('--threshold', type=float, default=1.2, help='how many times slower a timing has to be to count as a regression')
+    parser.add_argument('--quick', action='store_true', help='use smaller sizes so the benchmarks finish quickly')
+    arguments = parser.parse_args()
+    results = run_benchmarks(arguments.quick)
+    with open(arguments.output, 'w', encoding='utf-8') as output_file:
+        json.dump(results, output_file, indent=2)
+    print('Wrote the results to ' + arguments.output)
+    if arguments.compare:
+        with open(arguments.compare, encoding='utf-8') as compare_file:
+            regressions = compare_results(json.load(compare_file), results, arguments.threshold)
+        for name, old_ms, new_ms in regressions:
+            print('%s got slower: %s ms -> %s ms' % (name, old_ms, new_ms))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""A module that works out rolling analytics over the covid series of many areas at once with NumPy. The series of every area are put in one matrix so the sums are worked out for all of the areas together, and the results are cached until the store of an area changes
+
+    Attributes
+    ----------
+    CACHE_SIZE ( int ):
+        The number of results that are kept in the cache.
+    WEEK ( int ):
+        The number of days the week on week growth compares against.
+
+    Classes
+    -------
+    SeriesAnalytics:
+        The rolling analytics of one metric of one area, with the oldest date first.
+
+    Methods
+    -------
+    series_matrix(stores, metric):
+        Function to put the series of a metric for many areas in one matrix, with the newest date of every area in the last column
+    rolling_sums(matrix, window):
+        Function to work out the rolling sums over every row of a matrix
+    analyse_areas(stores, metric='newCasesBySpecimenDate', window=7, populations=None):
+        Function to work out the rolling analytics of a metric for many areas in one batch
+    analyse_area(store, metric='newCasesBySpecimenDate', window=7, population=None):
+        Function to work out the rolling analytics of a metric for one area
+    latest_figures(analytics):
+        Function to return the analytics of the newest day that has a rolling sum
+    clear_cache():
+        Function to empty the cache of results
+
+"""
+import math
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import NamedTuple
+from covid_data_store import CovidDataStore
+
+CACHE_SIZE = 1024
+WEEK = 7
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class SeriesAnalytics(NamedTuple):
+    """The rolling analytics of one metric of one area. Every field is a read only NumPy array with the oldest date first, and days that cant be worked out, because a value in the window is missing or there isnt enough history, are NaN
+
+        Attributes
+        ----------
+        area_name ( str ):
+            The name of the area
+        metric ( str ):
+            The name of the metric
+        window ( int ):
+            The number of days in the rolling window
+        dates ( ndarray ):
+            The date of every day as a proleptic Gregorian ordinal
+        rolling_sum ( ndarray ):
+            The sum of the metric over the window ending on every day
+        rolling_average ( ndarray ):
+            The rolling sum divided by the number of days in the window
+        per_100k ( ndarray ):
+            The rolling sum per 100,000 people, or None if the population of the area isnt known
+        week_on_week ( ndarray ):
+            The change of the rolling sum compared to 7 days before, as a fraction so 0.1 is 10% growth
+        doubling_time ( ndarray ):
+            The number of days it takes the rolling sum to double at the growth of the last 7 days. Negative numbers are the number of days it takes to halve, and no change is NaN
+
+    """
+    area_name: str
+    metric: str
+    window: int
+    dates: object
+    rolling_sum: object
+    rolling_average: object
+    per_100k: object
+    week_on_week: object
+    doubling_time: object
+
+
+def series_matrix(stores: list, metric: str) -> tuple:
+    """Function to put the series of a metric for many areas in one matrix, with the newest date of every area in the last column. Areas with a shorter series are padded with NaN at the start
+
+        Parameters:
+            stores ( list ):
+                The stores of the areas
+            metric ( str ):
+                The name of the metric
+
+        Returns:
+            matrix ( ndarray ):
+                A float64 matrix with one row per store and the oldest date first, where missing values are NaN
+            lengths ( list ):
+                The number of days in the series of every store
+
+    """
+    import numpy as np
+    lengths = [len(store) for store in stores]
+    matrix = np.full((len(stores), max(lengths, default=0)), np.nan)
+    for row, store in enumerate(stores):
+        size = lengths[row]
+        if size == 0:
+            continue
+        values = np.frombuffer(store.values[metric], dtype=np.int32, count=size)[::-1]
+        missing = np.frombuffer(store.missing[metric], dtype=np.uint8, count=size)[::-1].astype(bool)
+        matrix[row, matrix.shape[1] - size:] = np.where(missing, np.nan, values)
+    return matrix, lengths
+
+
+def rolling_sums(matrix, window: int):
+    """Function to work out the rolling sums over every row of a matrix with one cumulative sum, so the time it takes doesnt depend on the window
+
+        Parameters:
+            matrix ( ndarray ):
+                A float64 matrix with the oldest value first in every row, where missing values are NaN
+            window ( int ):
+                The number of values in the window
+
+        Returns:
+            sums ( ndarray ):
+                A matrix of the same shape, where every value is the sum of the window ending there, or NaN if the window has a missing value or starts before the first value
+
+    """
+    import numpy as np
+    rows, columns = matrix.shape
+    present = ~np.isnan(matrix)
+    totals = np.zeros((rows, columns + 1))
+    counts = np.zeros((rows, columns + 1), dtype=np.int64)
+    np.cumsum(np.where(present, matrix, 0.0), axis=1, out=totals[:, 1:])
+    np.cumsum(present, axis=1, out=counts[:, 1:])
+    sums = np.full((rows, columns), np.nan)
+    if 0 < window <= columns:
+        window_sums = totals[:, window:] - totals[:, :-window]
+        complete = (counts[:, window:] - counts[:, :-window]) == window
+        sums[:, window - 1:] = np.where(complete, window_sums, np.nan)
+    return sums
+
+
+def _growth(sums):
+    """Function to work out the week on week growth and the doubling time from a matrix of rolling sums"""
+    import numpy as np
+    growth = np.full(sums.shape, np.nan)
+    doubling_time = np.full(sums.shape, np.nan)
+    if sums.shape[1] > WEEK:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = sums[:, WEEK:] / sums[:, :-WEEK]
+            growth[:, WEEK:] = np.where(np.isfinite(ratio), ratio - 1, np.nan)
+            log_ratio = np.log(ratio)
+            doubling = WEEK * math.log(2) / log_ratio
+        doubling_time[:, WEEK:] = np.where(np.isfinite(doubling) & (ratio > 0), doubling, np.nan)
+    return growth, doubling_time
+
+
+def _read_only(values):
+    """Function to stop a cached array from being changed by the code that uses it"""
+    values.flags.writeable = False
+    return values
+
+
+def analyse_areas(stores: dict, metric: str = 'newCasesBySpecimenDate', window: int = 7, populations: dict = None) -> dict:
+    """Function to work out the rolling analytics of a metric for many areas in one batch. Areas whose store hasnt changed since the last call come from the cache, and the rest are worked out together in one matrix
+
+        Parameters:
+            stores ( dictionary ):
+                A dictionary with any key for every area, for example (areaName, areaType), and the store of that area as the value
+            metric ( str ):
+                The name of the metric
+            window ( int ):
+                The number of days in the rolling window
+            populations ( dictionary ):
+                An optional dictionary with the area name as the key and its population as the value, used for the rate per 100,000 people
+
+        Returns:
+            analytics ( dictionary ):
+                A dictionary with the same keys as stores and the SeriesAnalytics of every area as the value
+
+    """
+    import numpy as np
+    populations = populations or {}
+    results = {}
+    pending = []
+    with _cache_lock:
+        for key, store in stores.items():
+            cache_key = (store.area_type, store.area_name, store.version, metric, window, populations.get(store.area_name))
+            if store.version and cache_key in _cache:
+                _cache.move_to_end(cache_key)
+                results[key] = _cache[cache_key]
+            else:
+                pending.append((key, store, cache_key))
+    if not pending:
+        return results
+    matrix, lengths = series_matrix([store for _, store, _ in pending], metric)
+    sums = rolling_sums(matrix, window)
+    growth, doubling_time = _growth(sums)
+    columns = matrix.shape[1]
+    computed = []
+    for row, (key, store, cache_key) in enumerate(pending):
+        start = columns - lengths[row]
+        row_sums = sums[row, start:].copy()
+        population = cache_key[-1]
+        analytics = SeriesAnalytics(
+            area_name=store.area_name,
+            metric=metric,
+            window=window,
+            dates=_read_only(np.frombuffer(store.dates, dtype=np.int32, count=lengths[row])[::-1].copy()),
+            rolling_sum=_read_only(row_sums),
+            rolling_average=_read_only(row_sums / window),
+            per_100k=_read_only(row_sums * (100_000 / population)) if population else None,
+            week_on_week=_read_only(growth[row, start:].copy()),
+            doubling_time=_read_only(doubling_time[row, start:].copy()),
+        )
+        results[key] = analytics
+        computed.append((cache_key, analytics))
+    with _cache_lock:
+        for cache_key, analytics in computed:
+            if cache_key[2]:
+                _cache[cache_key] = analytics
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return results
+
+
+def analyse_area(store: CovidDataStore, metric: str = 'newCasesBySpecimenDate', window: int = 7, population: int = None) -> SeriesAnalytics:
+    """Function to work out the rolling analytics of a metric for one area, see analyse_areas() for the parameters
+
+        Returns:
+            analytics ( SeriesAnalytics ):
+                The rolling analytics of the area
+
+    """
+    populations = {store.area_name: population} if population else None
+    return analyse_areas({store.area_name: store}, metric, window, populations)[store.area_name]
+
+
+def latest_figures(analytics: SeriesAnalytics) -> dict:
+    """Function to return the analytics of the newest day that has a rolling sum, with plain numbers so they can be sent as JSON
+
+        Parameters:
+            analytics ( SeriesAnalytics ):
+                The rolling analytics of an area
+
+        Returns:
+            figures ( dictionary ):
+                The date in the YYYY-MM-DD format and the rolling sum, rolling average, rate per 100,000 people, week on week growth and doubling time of that day, where a figure that cant be worked out is None. Every value is None if no day has a rolling sum
+
+    """
+    fields = ('rolling_sum', 'rolling_average', 'per_100k', 'week_on_week', 'doubling_time')
+    for row in range(len(analytics.rolling_sum) - 1, -1, -1):
+        if not math.isnan(analytics.rolling_sum[row]):
+            break
+    else:
+        return dict({'date': None}, **{field: None for field in fields})
+    figures = {'date': date.fromordinal(int(analytics.dates[row])).isoformat()}
+    for field in fields:
+        values = getattr(analytics, field)
+        value = None if values is None else float(values[row])
+        figures[field] = None if value is None or math.isnan(value) else value
+    return figures
+
+
+def clear_cache() -> None:
+    """Function to empty the cache of results"""
+    with _cache_lock:
+        _cache.clear()
@@ -2,15 +2,43 @@
 
     Attributes
     ----------
-    s ( sched ):
-        The scheduler object that allows the program to store a queue of events and run them after a speficied time.
+    s ( Scheduler ):
+        The scheduler object that allows the program to store a queue of events and run them after a speficied time on a background thread.
     updates ( list ):
-        A list of all the updates that have been scheduled to happen by the user
+        A list of the Update records of all the updates that have been scheduled to happen by the user
     covid_data_list ( list ):
         A list of the current covid data with local_number_of_cases, local_current_number_of_hospital, local_cummulative_number_of_deaths,
-        national_number_of_cases, national_current_number_of_hospital and national_cummulative_number_of_deaths. This gets updated after every update to the covid data. 
+        national_number_of_cases, national_current_number_of_hospital and national_cummulative_number_of_deaths. This gets replaced in one step after every update to the covid data, which also publishes a new dashboard snapshot.
     schedules ( dictionary ):
         A dictionary that holds the active schedules that have been scheduled by the scheduler.
+    area_series ( dictionary ):
+        A dictionary with the area filters as the key and the dictionary from convert_csv_to_dict of that area as the value. Only the rows that change are appended to the series cache file after every update, so only new days have to be requested, parsed and written.
+    series_stores ( dictionary ):
+        A dictionary with the area filters as the key and the store of the whole series of that area as the value, so a refresh only has to parse the new rows.
+    pending_series ( dictionary ):
+        A dictionary with the area filters as the key and the rows that were requested since the series cache file was last written as the value.
+    COVID_STRUCTURE ( dictionary ):
+        The structure of the data that is requested from the covid api.
+    area_stores ( dictionary ):
+        A dictionary with the (areaName, areaType) of every area that was fetched in the last update as the key and the store of its data as the value.
+    area_analytics ( dictionary ):
+        A dictionary with the same keys as area_stores and the rolling analytics of the new cases of that area as the value, worked out for every area in one batch after each update and served at /api/analytics.
+    covid_updater ( CoalescedAction ):
+        Runs update_covid() for the scheduled updates, so updates that are due close together or while the covid data is still fresh share one download.
+    news_updater ( CoalescedAction ):
+        Runs update_news() for the scheduled updates in the same way.
+    journal ( ScheduleJournal ):
+        The journal the scheduled updates are recorded in so they survive a restart, or None if there isnt one.
+    COVID_API_TIMEOUT ( int ):
+        The number of seconds to wait for the covid api before giving up.
+    RETRY_BACKOFF ( float ):
+        The number of seconds to wait before the first retry of a failed area, this doubles after every retry.
+    HOSPITAL_AREA_TYPES ( tuple ):
+        The area types the covid api publishes hospital cases for. Smaller areas like ltla never have them, so a stream for them doesnt wait for one.
+    STREAM_SEARCH_DAYS ( int ):
+        The number of days after the newest complete week a stream keeps reading to find the latest deaths and hospital cases before it gives up and stops.
+    SERIES_COMPACT_AFTER ( int ):
+        The smallest number of out of date lines before the series cache file is rewritten with one line for every area.
     
     Methods
     -------
@@ -20,20 +48,56 @@
         Function to process the covid data from a variable
     process_covid_csv_data(covid_csv_data):
         Function for processing the csv file data
-    covid_api_request(location="areaName=Exeter", location_type="areaType=ltla"):
+    request_errors():
+        Function to return the exceptions that mean a request to the covid api failed
+    stream_covid_csv_lines(location, location_type):
+        Function to stream the lines of the CSV data from the covid api as the bytes arrive
+    covid_api_stream(location="areaName=Exeter", location_type="areaType=ltla", stop_early=True, fetch_lines=None):
+        Function for requesting data from the api and parsing it straight into a store
+    covid_api_request(location="areaName=Exeter", location_type="areaType=ltla", fetch_lines=None):
         Function for requesting data from the api
+    covid_api_rows(location, location_type, last_date=None, revision_window=7, fetch_lines=None):
+        Function for requesting only the rows that are newer than the last known date minus the revision window
+    covid_api_delta(location, location_type, known_series=None, revision_window=7, fetch_lines=None):
+        Function for requesting only the data that is newer than the data that is already known
     convert_csv_to_dict(contents):
         Function to convert the csv data into a dictionary
+    load_area_series(series_file_name):
+        Function to load the saved area series from the series cache file
+    save_area_series(series_file_name):
+        Function to append the rows that changed to the series cache file
+    compact_area_series(series_file_name):
+        Function to rewrite the series cache file with one line for every area
+    refresh_area(location, location_type, revision_window):
+        Function to bring the saved series of an area up to date and return a store of it
+    fetch_area(area_name, area_type, incremental=True, revision_window=7, timeout=COVID_API_TIMEOUT, retries=2, fetch_lines=None):
+        Function to fetch the data of one area with a time limit and retries
+    fetch_areas(area_filters, max_workers=4, timeout=COVID_API_TIMEOUT, retries=2, incremental=True, revision_window=7, fetch_lines=None):
+        Function to fetch the data of many areas at the same time with a bounded pool of worker threads
     schedule_covid_updates(update_interval, update_name, repeat, update_covid_tick, update_news_tick):
         Function to schedule a covid update
+    update_jobs(run_at, update_name, repeat, update_covid_tick, update_news_tick):
+        Function to build the scheduler jobs of an update
+    schedule_update(update_name, update_at, update_covid_tick=None, update_news_tick=None, repeat=None):
+        Function to add an update to the updates list and schedule it for the next time the clock reaches update_at
     get_s():
-        A function to return the sched object
+        A function to return the scheduler object
     remove_completed_update(what_to_remove):
         Function to remove an item from the update
     process_covid_dictionary_data(covid_dictionary_data):
         Function to process the covid dictionary data
     remove_from_update(what_to_remove):
         Function to remove an item from the update
+    publish_covid_metrics(local_store, national_store, location):
+        Function to work out the headline figures from the local and national stores and publish them to the dashboard
+    save_area_binaries(stores, cache_dir):
+        Function to save the store of every area to a binary file that can be memory mapped the next time the program starts
+    analyse_area_stores():
+        Function to work out the rolling analytics of every area in area_stores
+    reload_area_stores():
+        Function to memory map the binary stores of the areas again if they were saved since they were last mapped
+    load_cached_covid_data():
+        Function to memory map the binary stores saved by the last update and publish their figures
     update_covid():
         Function to handler the update of the covid data to be displayed on the dashboard
     get_covid_data_list():
@@ -42,22 +106,71 @@
         Function to update the update function
     get_updates():
     Function to get the update list
+    record_update_ran(update_name):
+        Function that records a run of a repeating update in the journal
+    open_journal(file_name, fsync=True):
+        Function to open the journal the scheduled updates are recorded in
+    restore_schedules():
+        Function to replay the journal and put every active update back in the scheduler in one step
+    restore_updates():
+        Function to make the updates list match the updates of the current dashboard snapshot
+    catch_up_updates(covid, news):
+        Function that runs once for all of the updates that were missed while the program was stopped
+    suspend_schedules():
+        Function to cancel every scheduled job when this worker stops being the leader
 
 """
-import sched
 import time
 import json
 import logging
-import sys
-from uk_covid19 import Cov19API
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from covid_analytics import analyse_areas
+from instrumentation import increment, timer
+from dashboard_config import get_config
+from covid_trends import sparkline
+from covid_data_store import CovidDataStore, INCOMPLETE_DAYS, WINDOW_DAYS, as_store, binary_file_name
+from dashboard_records import Update
+from dashboard_snapshot import get_snapshot, publish
 from covid_news_handling import update_news
+from request_cache import api_cache
+from schedule_journal import ScheduleJournal
+from scheduler import CoalescedAction, Scheduler
+from state_backend import data_plane
+from time_handling import seconds_until_hhmm
 
+logger = logging.getLogger(__name__)
 
-s = sched.scheduler(time.time, time.sleep)
+s = Scheduler()
 
 updates = []
 covid_data_list = []
 schedules = {}
+area_series = {}
+series_stores = {}
+pending_series = {}
+_series_lines = 0
+_series_rewrite = False
+area_stores = {}
+area_analytics = {}
+binary_signatures = {}
+journal = None
+
+COVID_STRUCTURE = {
+    "areaCode": "areaCode",
+    "areaName": "areaName",
+    "areaType" : "areaType",
+    "date": "date",
+    "cumDailyNsoDeathsByDeathDate": "cumDailyNsoDeathsByDeathDate",
+    "hospitalCases": "hospitalCases",
+    "newCasesBySpecimenDate": "newCasesBySpecimenDate",
+    }
+COVID_API_TIMEOUT = 30
+RETRY_BACKOFF = 0.5
+HOSPITAL_AREA_TYPES = ('overview', 'nation', 'nhsRegion')
+STREAM_SEARCH_DAYS = 60
+SERIES_COMPACT_AFTER = 100
 
 def parse_csv_data(csv_filename: str ) -> list:
     """Function to open and return the contents of the CSV file
@@ -72,18 +185,19 @@ def parse_csv_data(csv_filename: str ) -> list:
 
     """
     contents = []
-    with open(csv_filename, 'r', encoding='cp1252') as file:
-        contents = file.readlines()
+    with timer('dashboard_csv_parse_seconds'):
+        with open(csv_filename, 'r', encoding='cp1252') as file:
+            contents = file.readlines()
     return contents
 
 def process_covid_api_csv_data(covid_csv_data: list, local: bool) -> str:
     """Function to process the covid data from a list of data from the covid api
     
         Parameters:
-            covid_csv_data ( list ):
-                A list of the covid data from a CSV file, where each entry is one line of the CSV file
+            covid_csv_data ( list or CovidDataStore ):
+                A list of the covid data from a CSV file, where each entry is one line of the CSV file, or a store that was already built from it
             local ( bool ):
-                States if the data being requested is for the local or nation data
+                States if the data being requested is for the local or nation data. It is only kept so older callers still work, because the newest complete window is found from the data itself
 
         Returns:
             number_of_cases ( int ):
@@ -94,44 +208,15 @@ def process_covid_api_csv_data(covid_csv_data: list, local: bool) -> str:
                 The total number of deaths due to covid from the data
 
     """
-    again = True
-    temp_num = 1
-    number_of_cases = 0
-    last_seven_strings = []
-    cummulative_number_of_deaths = 0
-    current_number_of_hospital = 0
-    if local:
-        last_seven_strings = covid_csv_data[2:9]
-    else:
-        last_seven_strings = covid_csv_data[3:10]
-  
-    for item in last_seven_strings:
-        temp_list = item.split(',')
-        number_of_cases += int(temp_list[6])
-    for data in covid_csv_data[2::]:
-        temp_death_list = data.split(',')
-        if temp_death_list[0] != '\n':
-            if temp_death_list[4] != '' and temp_death_list[4] != '\n':
-                cummulative_number_of_deaths = int(temp_death_list[4])
-                break
-    while again:
-        try:
-            temp_list = covid_csv_data[temp_num].split(',')
-            if temp_list[5] != '':
-                current_number_of_hospital = int(temp_list[5])
-                again = False
-            else:
-                temp_num += 1
-        except:
-            break
-    return number_of_cases, current_number_of_hospital, cummulative_number_of_deaths
+    with timer('dashboard_csv_process_seconds'):
+        return as_store(covid_csv_data).headline_figures()
 
 def process_covid_csv_data(covid_csv_data: list) -> str:
     """Function for processing the csv file data from a list where every entry is one row of the file
         
         Parameters:
-            covid_csv_data ( list ):
-                A list of the covid data from a CSV file, where each entry is one line of the CSV file
+            covid_csv_data ( list or CovidDataStore ):
+                A list of the covid data from a CSV file, where each entry is one line of the CSV file, or a store that was already built from it
 
         Returns:
             number_of_cases ( int ):
@@ -142,26 +227,106 @@ def process_covid_csv_data(covid_csv_data: list) -> str:
                 The total number of deaths due to covid from the data
 
     """
-    number_of_cases = 0
-    last_seven_strings = []
-    cummulative_number_of_deaths = 0
-    current_number_of_hospital = 0
-    last_seven_strings = covid_csv_data[3:10]
-    for item in last_seven_strings:
-        temp_list = item.split(',')
-        number_of_cases += int(temp_list[6])
-    for data in covid_csv_data[2::]:
-        temp_death_list = data.split(',')
-        if temp_death_list[0] != '\n':
-            if temp_death_list[4] != '' and temp_death_list[4] != '\n':
-                cummulative_number_of_deaths = int(temp_death_list[4])
+    with timer('dashboard_csv_process_seconds'):
+        return as_store(covid_csv_data).headline_figures()
+
+def request_errors() -> tuple:
+    """Function to return the exceptions that mean a request to the covid api failed. requests is only imported here and in stream_covid_csv_lines, so importing this module stays fast. A ConnectionError is raised again by the functions that read the lines, so it is retried like the errors of requests
+    
+        Returns:
+            errors ( tuple ):
+                The exception classes that can be retried
+
+    """
+    import requests
+    return (requests.RequestException, TimeoutError, ConnectionError)
+
+def stream_covid_csv_lines(location: str, location_type: str, timeout: int = COVID_API_TIMEOUT):
+    """Function to stream the lines of the CSV data from the covid api as the bytes arrive, one page at a time
+    
+        Parameters:
+            location ( str ):
+                The location used in the api request to get the correct data
+            location_type ( str ):
+                The type of location, inputs include ltla, region, utla
+            timeout ( int ):
+                The number of seconds to wait for the api to connect or send more bytes
+
+        Returns:
+            lines ( iterator ):
+                An iterator over the lines of the CSV data, where every page starts with a header line. Closing the iterator closes the connection
+
+    """
+    import requests
+    from uk_covid19 import Cov19API
+    api_params = Cov19API(filters=[location, location_type], structure=COVID_STRUCTURE).api_params
+    api_params['format'] = 'csv'
+    api_params['page'] = 1
+    while True:
+        with requests.get(Cov19API.endpoint, params=api_params, stream=True, timeout=timeout) as response:
+            if response.status_code == 204:
                 break
-    temp_list = covid_csv_data[1].split(',')
-    if temp_list[5] != '':
-        current_number_of_hospital = int(temp_list[5])
-    return number_of_cases, current_number_of_hospital, cummulative_number_of_deaths
+            response.raise_for_status()
+            for line in response.iter_lines():
+                yield line.decode('utf-8')
+        api_params['page'] += 1
 
-def covid_api_request(location: str = "areaName=Exeter", location_type: str = "areaType=ltla") -> dict:
+def covid_api_stream(location: str = "areaName=Exeter", location_type: str = "areaType=ltla", stop_early: bool = True, fetch_lines=None) -> CovidDataStore:
+    """Function for requesting data from the api and parsing it straight into a store without saving it to a file
+    
+        Parameters:
+            location ( str ):
+                The location used in the api request to get the correct data
+            location_type ( str ):
+                The type of location, inputs include ltla, region, utla
+            stop_early ( bool ):
+                If True the request stops as soon as the latest 7 days and the latest deaths and hospital values have been read. Hospital cases are only waited for in the HOSPITAL_AREA_TYPES, and the request stops STREAM_SEARCH_DAYS days after the latest 7 days even if a value wasnt found
+            fetch_lines ( function ):
+                The function used to get the lines of CSV data, by default stream_covid_csv_lines. Tests can pass in a fake of the api
+
+        Returns:
+            store ( CovidDataStore ):
+                The store holding the covid data that was read
+
+    """
+    if fetch_lines is None:
+        fetch_lines = stream_covid_csv_lines
+    store = CovidDataStore()
+    found_deaths = False
+    found_hospital = location_type.split('=')[-1] not in HOSPITAL_AREA_TYPES
+    latest_cases = -1
+    logger.info('streaming data from covid api')
+    lines = fetch_lines(location, location_type)
+    try:
+        for line in lines:
+            store.add_line(line)
+            if not stop_early or len(store) == 0:
+                continue
+            row = len(store) - 1
+            if not found_hospital and not store.missing['hospitalCases'][row]:
+                found_hospital = True
+            if not found_deaths and not store.missing['cumDailyNsoDeathsByDeathDate'][row]:
+                found_deaths = True
+            if latest_cases == -1 and not store.missing['newCasesBySpecimenDate'][row]:
+                latest_cases = row
+            if latest_cases == -1 or len(store) < latest_cases + INCOMPLETE_DAYS + WINDOW_DAYS:
+                continue
+            if found_deaths and found_hospital:
+                logger.info('stopped streaming covid data after %s rows', len(store))
+                break
+            if len(store) >= latest_cases + INCOMPLETE_DAYS + WINDOW_DAYS + STREAM_SEARCH_DAYS:
+                logger.info('stopped streaming covid data after %s rows without finding the latest deaths or hospital cases', len(store))
+                break
+    except ConnectionError:
+        logger.error('Connection Error')
+        raise
+    finally:
+        if hasattr(lines, 'close'):
+            lines.close()
+    store.build_index()
+    return store
+
+def covid_api_request(location: str = "areaName=Exeter", location_type: str = "areaType=ltla", fetch_lines=None) -> dict:
     """Function for requesting data from the api
         
         Parameters:
@@ -169,32 +334,98 @@ def covid_api_request(location: str = "areaName=Exeter", location_type: str = "a
                 The location used in the api request to get the correct data
             location_type ( str ):
                 The type of location, inputs include ltla, region, utla
+            fetch_lines ( function ):
+                The function used to get the lines of CSV data. By default stream_covid_csv_lines is used through the api cache, so identical requests close together only reach the api once
 
         Returns:
             covid_dict ( dictionary ):
                 A dictionary with the date as the key and add the data as the value
 
     """
-    contents = []
+    if fetch_lines is None:
+        key = ('covid', location.lower(), location_type.lower())
+        return api_cache.get_or_call(key, _request_covid_dict, location, location_type, stream_covid_csv_lines)
+    return _request_covid_dict(location, location_type, fetch_lines)
+
+def _request_covid_dict(location: str, location_type: str, fetch_lines) -> dict:
+    """Function to request the data of an area and convert it to a dictionary, without going through the cache"""
     covid_dict = {}
-    cases_and_deaths = {
-    "areaCode": "areaCode",
-    "areaName": "areaName",
-    "areaType" : "areaType",
-    "date": "date",
-    "cumDailyNsoDeathsByDeathDate": "cumDailyNsoDeathsByDeathDate",
-    "hospitalCases": "hospitalCases",
-    "newCasesBySpecimenDate": "newCasesBySpecimenDate",
-    }
     try:
-        logging.info('requesting data from covid api')
-        api = Cov19API(filters=[location,location_type], structure=cases_and_deaths)
-        api.get_csv(save_as="data.csv")
-        contents = parse_csv_data("data.csv")
-        covid_dict = convert_csv_to_dict(contents)
+        logger.info('requesting data from covid api')
+        covid_dict = convert_csv_to_dict(fetch_lines(location, location_type))
+    except ConnectionError:
+        logger.error('Connection Error')
+        raise
+    return covid_dict
+
+def covid_api_rows(location: str, location_type: str, last_date: str = None, revision_window: int = 7, fetch_lines=None) -> dict:
+    """Function for requesting only the rows that are newer than the last known date minus the revision window. The api returns the newest dates first, so the request stops at the first date that is older than that
+    
+        Parameters:
+            location ( str ):
+                The location used in the api request to get the correct data
+            location_type ( str ):
+                The type of location, inputs include ltla, region, utla
+            last_date ( str ):
+                The newest date that is already known in the YYYY-MM-DD format, or None to request all of the data
+            revision_window ( int ):
+                The number of days before the last known date that are requested again, because the api revises recent figures
+            fetch_lines ( function ):
+                The function used to get the lines of CSV data, by default stream_covid_csv_lines
+
+        Returns:
+            covid_rows ( dictionary ):
+                A dictionary in the format of convert_csv_to_dict with only the rows that were requested
+
+    """
+    if fetch_lines is None:
+        fetch_lines = stream_covid_csv_lines
+    cutoff = ''
+    if last_date:
+        cutoff = (date.fromisoformat(last_date) - timedelta(days=revision_window)).isoformat()
+    covid_rows = {}
+    lines = fetch_lines(location, location_type)
+    try:
+        for line in lines:
+            fields = line.rstrip('\r\n').split(',')
+            if len(fields) < 4 or fields[3] == 'date':
+                continue
+            if fields[3] < cutoff:
+                break
+            covid_rows[fields.pop(3)] = fields
     except ConnectionError:
-        logging.error('Connection Error')
-        sys.exit()
+        logger.error('Connection Error')
+        raise
+    finally:
+        if hasattr(lines, 'close'):
+            lines.close()
+    logger.info('requested %s rows of covid data for %s', len(covid_rows), location)
+    return covid_rows
+
+def covid_api_delta(location: str, location_type: str, known_series: dict = None, revision_window: int = 7, fetch_lines=None) -> dict:
+    """Function for requesting only the data that is newer than the data that is already known, with covid_api_rows()
+    
+        Parameters:
+            location ( str ):
+                The location used in the api request to get the correct data
+            location_type ( str ):
+                The type of location, inputs include ltla, region, utla
+            known_series ( dictionary ):
+                A dictionary from convert_csv_to_dict of the data that is already known, or None to request all of the data
+            revision_window ( int ):
+                The number of days before the last known date that are requested again, because the api revises recent figures
+            fetch_lines ( function ):
+                The function used to get the lines of CSV data, by default stream_covid_csv_lines
+
+        Returns:
+            covid_dict ( dictionary ):
+                A new dictionary with the known data and the new data merged together, where the new data replaces the known data
+
+    """
+    covid_dict = {}
+    if known_series:
+        covid_dict = {key: value for key, value in known_series.items() if key != 'date'}
+    covid_dict.update(covid_api_rows(location, location_type, max(covid_dict) if covid_dict else None, revision_window, fetch_lines))
     return covid_dict
 
 def convert_csv_to_dict(contents: list) -> dict:
@@ -217,6 +448,229 @@ def convert_csv_to_dict(contents: list) -> dict:
             covid_dict[temp_date] = item
     return covid_dict
 
+def load_area_series(series_file_name: str) -> None:
+    """Function to load the saved area series from the series cache file into the area_series dictionary. Every line of the file is a JSON object with the rows of one area, and later lines replace the rows of earlier ones. A file saved as one JSON object of every area is read in the same way
+    
+        Parameters:
+            series_file_name ( str ):
+                The file name of the series cache file. If it doesnt exist nothing is loaded
+    
+    """
+    global _series_lines, _series_rewrite
+    if not os.path.exists(series_file_name):
+        return
+    lines = 0
+    with open(series_file_name, 'r', encoding='utf-8') as series_file:
+        for line in series_file:
+            lines += 1
+            try:
+                entry = json.loads(line)
+                if 'area' in entry and 'rows' in entry:
+                    area_series.setdefault(entry['area'], {}).update(entry['rows'])
+                else:
+                    for key, series in entry.items():
+                        area_series.setdefault(key, {}).update(series)
+                    _series_rewrite = True
+            except (ValueError, AttributeError, TypeError):
+                logger.error('Skipped line %s of the series cache file %s because it cant be read', lines, series_file_name)
+                _series_rewrite = True
+    _series_lines = lines
+    logger.info('Loaded the area series from %s', series_file_name)
+
+def save_area_series(series_file_name: str) -> None:
+    """Function to append the rows that were requested since the last save to the series cache file, with one line for every area that has new rows, so the cost of a save only grows with the new days. A file in the old format or with a line that couldnt be read is rewritten instead. The file is compacted with compact_area_series() once it has more out of date lines than SERIES_COMPACT_AFTER and the number of areas
+    
+        Parameters:
+            series_file_name ( str ):
+                The file name of the series cache file
+    
+    """
+    global _series_lines
+    if _series_rewrite or not _ends_with_newline(series_file_name):
+        compact_area_series(series_file_name)
+        return
+    changes = [(key, pending_series.pop(key)) for key in list(pending_series)]
+    changes = [(key, rows) for key, rows in changes if rows]
+    if not changes:
+        return
+    with open(series_file_name, 'a', encoding='utf-8') as series_file:
+        for key, rows in changes:
+            series_file.write(json.dumps({'area': key, 'rows': rows}, separators=(',', ':')) + '\n')
+    _series_lines += len(changes)
+    logger.info('Appended the new rows of %s areas to %s', len(changes), series_file_name)
+    if _series_lines - len(area_series) > max(SERIES_COMPACT_AFTER, len(area_series)):
+        compact_area_series(series_file_name)
+
+def _ends_with_newline(file_name: str) -> bool:
+    """Function to check that a file exists and ends with a new line, so a line can be appended to it. A series cache file saved as one JSON object doesnt, and is rewritten instead"""
+    try:
+        with open(file_name, 'rb') as series_file:
+            series_file.seek(-1, os.SEEK_END)
+            return series_file.read(1) == b'\n'
+    except OSError:
+        return False
+
+def compact_area_series(series_file_name: str) -> None:
+    """Function to rewrite the series cache file with one line for every area. The file is replaced in one step so a crash cant leave half a file behind
+    
+        Parameters:
+            series_file_name ( str ):
+                The file name of the series cache file
+    
+    """
+    global _series_lines, _series_rewrite
+    temp_file_name = series_file_name + '.tmp'
+    with open(temp_file_name, 'w', encoding='utf-8') as series_file:
+        for key, rows in list(area_series.items()):
+            series_file.write(json.dumps({'area': key, 'rows': rows}, separators=(',', ':')) + '\n')
+    os.replace(temp_file_name, series_file_name)
+    pending_series.clear()
+    _series_lines = len(area_series)
+    _series_rewrite = False
+    logger.info('Saved the area series to %s', series_file_name)
+
+def refresh_area(location: str, location_type: str, revision_window: int = 7, fetch_lines=None) -> CovidDataStore:
+    """Function to bring the saved series of an area up to date by only requesting the new days, and return a store of the whole series. Only the new rows and the known rows they overlap are parsed, the older rows are copied from the last store of the area
+    
+        Parameters:
+            location ( str ):
+                The location used in the api request to get the correct data
+            location_type ( str ):
+                The type of location, inputs include ltla, region, utla
+            revision_window ( int ):
+                The number of days before the last known date that are requested again
+            fetch_lines ( function ):
+                The function used to get the lines of CSV data, by default stream_covid_csv_lines
+
+        Returns:
+            store ( CovidDataStore ):
+                The store holding the whole series of the area
+    
+    """
+    key = location + ';' + location_type
+    known_series = area_series.setdefault(key, {})
+    known_series.pop('date', None)
+    store = series_stores.get(key)
+    if store is not None and len(store):
+        last_date = store.date_at(0)
+    else:
+        last_date = max(known_series) if known_series else None
+    covid_rows = covid_api_rows(location, location_type, last_date, revision_window, fetch_lines)
+    known_series.update(covid_rows)
+    pending_series.setdefault(key, {}).update(covid_rows)
+    if store is None or not len(store):
+        store = CovidDataStore.from_dict(known_series)
+    elif covid_rows:
+        overlap = set(covid_rows)
+        oldest_new_date = min(covid_rows)
+        row = 0
+        while row < len(store) and store.date_at(row) >= oldest_new_date:
+            overlap.add(store.date_at(row))
+            row += 1
+        store = store.with_newer_rows(CovidDataStore.from_dict({row_date: known_series[row_date] for row_date in overlap}))
+    series_stores[key] = store
+    return store
+
+def _lines_before_deadline(lines, deadline: float):
+    """Function to pass on lines until the deadline from time.monotonic() has passed, then raise a TimeoutError"""
+    try:
+        for line in lines:
+            if time.monotonic() > deadline:
+                raise TimeoutError('The area took too long to fetch')
+            yield line
+    finally:
+        if hasattr(lines, 'close'):
+            lines.close()
+
+def fetch_area(area_name: str, area_type: str, incremental: bool = True, revision_window: int = 7, timeout: int = COVID_API_TIMEOUT, retries: int = 2, fetch_lines=None) -> CovidDataStore:
+    """Function to fetch the data of one area with a time limit and retries
+    
+        Parameters:
+            area_name ( str ):
+                The name of the area, for example Exeter
+            area_type ( str ):
+                The type of the area, inputs include nation, ltla, region, utla
+            incremental ( bool ):
+                If True only the new days are requested with refresh_area, else the latest days are streamed with covid_api_stream
+            revision_window ( int ):
+                The number of days before the last known date that are requested again
+            timeout ( int ):
+                The number of seconds one attempt can take before it is given up
+            retries ( int ):
+                The number of times a failed attempt is tried again
+            fetch_lines ( function ):
+                The function used to get the lines of CSV data, by default stream_covid_csv_lines. It doesnt go through the api cache, because update_covid() only runs through covid_updater, which already skips a run while the data is fresh, and a refresh that does run should reach the api
+
+        Returns:
+            store ( CovidDataStore ):
+                The store holding the data of the area
+
+    """
+    location = 'areaName=' + area_name
+    location_type = 'areaType=' + area_type
+    def timed_lines(fetch_location: str, fetch_location_type: str):
+        if fetch_lines is None:
+            lines = stream_covid_csv_lines(fetch_location, fetch_location_type, timeout)
+        else:
+            lines = fetch_lines(fetch_location, fetch_location_type)
+        return _lines_before_deadline(lines, time.monotonic() + timeout)
+
+    for attempt in range(retries + 1):
+        try:
+            with timer('dashboard_upstream_request_seconds', api='covid'):
+                if incremental:
+                    return refresh_area(location, location_type, revision_window, timed_lines)
+                return covid_api_stream(location, location_type, fetch_lines=timed_lines)
+        except request_errors() as error:
+            increment('dashboard_upstream_errors_total', api='covid')
+            if attempt == retries:
+                raise
+            logger.warning('Attempt %s to fetch %s failed: %s', attempt + 1, area_name, error)
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+    return None
+
+def fetch_areas(area_filters: list, max_workers: int = 4, timeout: int = COVID_API_TIMEOUT, retries: int = 2, incremental: bool = True, revision_window: int = 7, fetch_lines=None) -> dict:
+    """Function to fetch the data of many areas at the same time with a bounded pool of worker threads
+    
+        Parameters:
+            area_filters ( list ):
+                A list of (areaName, areaType) pairs, for example [('Exeter', 'ltla'), ('England', 'nation')]
+            max_workers ( int ):
+                The largest number of areas that are fetched at the same time
+            timeout ( int ):
+                The number of seconds one attempt for one area can take
+            retries ( int ):
+                The number of times a failed area is tried again
+            incremental ( bool ):
+                If True only the new days are requested for every area
+            revision_window ( int ):
+                The number of days before the last known date that are requested again
+            fetch_lines ( function ):
+                The function used to get the lines of CSV data, by default stream_covid_csv_lines
+
+        Returns:
+            results ( dictionary ):
+                A dictionary with the (areaName, areaType) pair as the key and the store of that area as the value, or None if the area could not be fetched
+
+    """
+    results = {}
+    area_filters = list(dict.fromkeys(tuple(area) for area in area_filters))
+    if not area_filters:
+        return results
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(area_filters)))) as executor:
+        futures = {}
+        for area_name, area_type in area_filters:
+            future = executor.submit(fetch_area, area_name, area_type, incremental, revision_window, timeout, retries, fetch_lines)
+            futures[future] = (area_name, area_type)
+        for future in as_completed(futures):
+            area = futures[future]
+            try:
+                results[area] = future.result()
+            except request_errors() as error:
+                logger.error('Could not fetch the covid data for %s: %s', area[0], error)
+                results[area] = None
+    return results
+
 def schedule_covid_updates(update_interval: int, update_name: str, repeat: str='no', update_covid_tick: str='no',update_news_tick: str='no') -> None:
     """Function to schedule an update to the dashboard. It can update the covid data, and news articles either both together or seperatly, as well as scheduling updates to repeat every 24 hours
     
@@ -233,44 +687,79 @@ def schedule_covid_updates(update_interval: int, update_name: str, repeat: str='
                     The string that states if it will update the news articles or not. If its 'news-data', the news articles will update, else it wont.
 
     """
-    templist = []
-    logging.debug(update_interval)
-    if update_covid_tick == 'covid-data' and update_news_tick == 'news-data':
-        e3 = s.enter(update_interval,2,update_news)
-        logging.info("Added an event to update the news to the scheduler")
-        e32 = s.enter(update_interval,1,update_covid)
-        logging.info("Added an event to update the covd data to the scheduler")
-        templist.append(e3)
-        templist.append(e32)
-    elif update_news_tick == 'news':
-        e2 = s.enter(update_interval,2,update_news)
-        logging.info("Added an event to update the news with the name "+ update_name +" to the scheduler")
-        templist.append(e2)
-    elif update_covid_tick == 'covid-data':
-        e1 = s.enter(update_interval,1,update_covid)
-        logging.info("Added an event to update the covid data with the name "+ update_name +" to the scheduler")
-        templist.append(e1)
+    logger.debug('Scheduling %s in %s seconds', update_name, update_interval)
+    schedules[update_name] = s.enter_many(update_jobs(time.time() + update_interval, update_name, repeat, update_covid_tick, update_news_tick))
 
-    if repeat != 'repeat':
-        e4 = s.enter(update_interval,3, remove_completed_update, argument=(update_name, ))
-        logging.info("Added an event to remove the toast for " + update_name + " to the scheduler")
-        templist.append(e4)
+def update_jobs(run_at: float, update_name: str, repeat: str, update_covid_tick: str, update_news_tick: str) -> list:
+    """Function to build the scheduler jobs of an update, so one update or thousands of restored updates can be added to the scheduler in one step
+    
+        Parameters:
+                run_at ( float ):
+                    The time the update is due, in seconds since the epoch
+                update_name ( str ):
+                    The name of the update
+                repeat ( str ):
+                    'repeat' if the update repeats every 24 hours
+                update_covid_tick ( str ):
+                    'covid-data' if the covid data will update
+                update_news_tick ( str ):
+                    'news' or 'news-data' if the news articles will update
+
+        Returns:
+                jobs ( list ):
+                    Tuples of (run_at, priority, action, argument, name, repeat_every) for Scheduler.enter_many()
+
+    """
+    jobs = []
+    repeat_every = None
     if repeat == 'repeat':
-        e5 = s.enter(86400,4, schedule_covid_updates, argument=(update_interval, update_name, repeat, update_news_tick, update_covid_tick))
-        logging.info("Added an event to reshedule an event "+ update_name +"to the scheduler")
-        templist.append(e5)
-    schedules[update_name] = templist
+        repeat_every = 86400
+    if update_news_tick in ('news', 'news-data'):
+        jobs.append((run_at, 2, news_updater, (), update_name, repeat_every))
+        logger.debug("Added an event to update the news with the name %s to the scheduler", update_name)
+    if update_covid_tick == 'covid-data':
+        jobs.append((run_at, 1, covid_updater, (), update_name, repeat_every))
+        logger.debug("Added an event to update the covid data with the name %s to the scheduler", update_name)
+    if repeat != 'repeat':
+        jobs.append((run_at, 3, remove_completed_update, (update_name, ), update_name, None))
+        logger.debug("Added an event to remove the toast for %s to the scheduler", update_name)
+    else:
+        jobs.append((run_at, 4, record_update_ran, (update_name, ), update_name, repeat_every))
+    return jobs
 
+def schedule_update(update_name: str, update_at: str, update_covid_tick: str = None, update_news_tick: str = None, repeat: str = None) -> int:
+    """Function to add an update to the updates list and schedule it for the next time the clock reaches update_at
+    
+        Parameters:
+                update_name ( str ):
+                    The name of the update, this is the name that will appear at the top of the toast
+                update_at ( str ):
+                    The time of the update in the HH:MM format
+                update_covid_tick ( str ):
+                    'covid-data' if the covid data will be updated, else None
+                update_news_tick ( str ):
+                    'news' if the news articles will be updated, else None
+                repeat ( str ):
+                    'repeat' if the update will repeat every 24 hours, else None
 
+        Returns:
+                update_interval ( int ):
+                    The number of seconds until the update happens
 
-    s.run(blocking=False)
-    logging.info("Scheduler set to run with blocking=False")
+    """
+    update_updates( update_name, update_at, update_covid_tick, update_news_tick, repeat )
+    update_interval = seconds_until_hhmm( update_at )
+    logger.info( 'seconds until update %s', update_interval )
+    schedule_covid_updates( update_interval, update_name, repeat, update_covid_tick, update_news_tick )
+    if journal is not None:
+        journal.record_add( update_name, update_at, update_covid_tick == 'covid-data', update_news_tick in ('news', 'news-data'), repeat == 'repeat', time.time() + update_interval )
+    return update_interval
 
-def get_s() -> sched:
-    """A function to return the sched object
+def get_s() -> Scheduler:
+    """A function to return the scheduler object
     
         Returns:
-            s ( sched ): A schedule object that lets the program run schedule events
+            s ( Scheduler ): A scheduler object that runs the scheduled events on a background thread
 
     """
     return s
@@ -283,12 +772,15 @@ def remove_completed_update(what_to_remove: str) -> None:
                 The name of the update that will be removed from the updates and schedules lists
     
     """
-    for keys in updates:
+    for keys in list(updates):
         if keys['title'] == what_to_remove:
             updates.remove(keys)
-            logging.info('Removed a completed update from the updates list called: ' + what_to_remove)
-            schedules.pop(what_to_remove)
-            logging.info('Removed a completed update from the schedules list: ' + what_to_remove)
+            publish(updates=updates)
+            logger.info('Removed a completed update from the updates list called: %s', what_to_remove)
+            schedules.pop(what_to_remove, None)
+            logger.info('Removed a completed update from the schedules list: %s', what_to_remove)
+            if journal is not None:
+                journal.record_remove(what_to_remove)
 
 def process_covid_dictionary_data(covid_dictionary_data: dict) -> int:
     """Function to process the covid data from a dictionary to retrieve the number of cases, current number of hospital cases and the total number of deaths
@@ -306,21 +798,7 @@ def process_covid_dictionary_data(covid_dictionary_data: dict) -> int:
                 The total number of deaths in the region  
     
     """
-    number_of_cases = 0
-    last_seven_strings = []
-    cummulative_number_of_deaths = 0
-    last_seven_strings = covid_dictionary_data[3:10]
-    for item in last_seven_strings:
-        temp_list = item.split(',')
-        number_of_cases += int(temp_list[6])
-    for data in covid_dictionary_data[2::]:
-        temp_death_list = data.split(',')
-        if temp_death_list[4] != '':
-            cummulative_number_of_deaths = int(temp_death_list[4])
-            break
-    temp_list = covid_dictionary_data[1].split(',')
-    current_number_of_hospital = int(temp_list[5])
-    return number_of_cases, current_number_of_hospital, cummulative_number_of_deaths
+    return as_store(covid_dictionary_data).headline_figures()
 
 def remove_from_update(what_to_remove: str) -> None:
     """Function to remove an item from the update list where the name of the the item is what_to_remove
@@ -329,47 +807,155 @@ def remove_from_update(what_to_remove: str) -> None:
             what_to_remove ( str ): The name of the item that is going to be removed from the update lists
     
     """
-    for keys in updates:
+    for keys in list(updates):
         if keys['title'] == what_to_remove:
             updates.remove(keys)
-            #for value in schedules[what_to_remove]:
-                #try:
-                    #s.cancel(value)
-                #except ValueError:
-                    #logging.info('cannot cancel scheduled event: Because event doesnt exist')
-            for number in range(len(schedules[what_to_remove])):
-                if schedules[what_to_remove][number] is not None:
-                    try:
-                        s.cancel(schedules[what_to_remove][number])
-                        logging.info('Successfully canncelled a scheduled event called ' + what_to_remove + 'at position '+ str(number))
-                    except:
-                        logging.error('ValueError: list.remove(x): x not in list')
-            schedules.pop(what_to_remove)
-            logging.info('Removed ' + what_to_remove + ' from the schedules list')
-
-def update_covid() -> None:
-    """Function to handler the update of the covid data to be displayed on the dashboard by requesting the up to date data from the covid api and adding it to the covid data list"""
-    
-    logging.info("updating covid")
-    covid_data_list.clear()
-    with open("config.json", 'r', encoding='cp1252') as json_data_file:
-        data = json.load(json_data_file)
-        location = 'areaName=' + data['area_name']
-        area_type = 'areaType=' + data['location_type']
-        covid_api_request(location, area_type)
-    with open("config.json", 'r', encoding='cp1252') as json_data_file:
-        data = json.load(json_data_file)
-    content = parse_csv_data(data['covid_file_name'])
-    local_number_of_cases, local_current_number_of_hospital, local_cummulative_number_of_deaths = process_covid_api_csv_data( content, True )
-    covid_data_list.append(local_number_of_cases)
-    covid_data_list.append(local_current_number_of_hospital)
-    covid_data_list.append(local_cummulative_number_of_deaths)
-    covid_api_request('areaName=England', 'areaType=nation')
-    content = parse_csv_data('data.csv')
-    national_number_of_cases, national_current_number_of_hospital, national_cummulative_number_of_deaths = process_covid_api_csv_data( content, False )
-    covid_data_list.append(national_number_of_cases)
-    covid_data_list.append(national_current_number_of_hospital)
-    covid_data_list.append(national_cummulative_number_of_deaths)
+            publish(updates=updates)
+            cancelled = s.cancel_name(what_to_remove)
+            logger.info('Cancelled %s scheduled events called %s', cancelled, what_to_remove)
+            schedules.pop(what_to_remove, None)
+            logger.info('Removed %s from the schedules list', what_to_remove)
+            if journal is not None:
+                journal.record_remove(what_to_remove)
+
+def publish_covid_metrics(local_store: CovidDataStore, national_store: CovidDataStore, location: str) -> list:
+    """Function to work out the headline figures and the trend charts from the local and national stores, put the figures in the covid data list and publish them to the dashboard
+    
+        Parameters:
+            local_store ( CovidDataStore ):
+                The store of the local area
+            national_store ( CovidDataStore ):
+                The store of the nation
+            location ( str ):
+                The name of the local area
+
+        Returns:
+            metrics ( list ):
+                The local number of cases, hospital cases and deaths, followed by the national ones
+    
+    """
+    local_number_of_cases, local_current_number_of_hospital, local_cummulative_number_of_deaths = process_covid_api_csv_data( local_store, True )
+    national_number_of_cases, national_current_number_of_hospital, national_cummulative_number_of_deaths = process_covid_api_csv_data( national_store, False )
+    metrics = [local_number_of_cases, local_current_number_of_hospital, local_cummulative_number_of_deaths,
+        national_number_of_cases, national_current_number_of_hospital, national_cummulative_number_of_deaths]
+    covid_data_list[:] = metrics
+    nation_location = national_store.area_name or 'England'
+    trends = (('Weekly cases in ' + location, sparkline(local_store, 'cases', resolution='weekly')),
+        ('Hospital cases in ' + nation_location, sparkline(national_store, 'hospital')),
+        ('Total deaths in ' + nation_location, sparkline(national_store, 'deaths')))
+    publish(metrics=metrics, location=location, nation_location=nation_location, trends=trends)
+    return metrics
+
+def save_area_binaries(stores: dict, cache_dir: str) -> None:
+    """Function to save the store of every area to a binary file that can be memory mapped the next time the program starts
+    
+        Parameters:
+            stores ( dictionary ):
+                A dictionary with the (areaName, areaType) pair as the key and the store of that area as the value
+            cache_dir ( str ):
+                The folder the binary files are saved in
+    
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    for (area_name, area_type), store in stores.items():
+        if store is not None:
+            store.save_binary(binary_file_name(cache_dir, area_name, area_type))
+    logger.info('Saved %s binary stores to %s', len(stores), cache_dir)
+
+def analyse_area_stores() -> dict:
+    """Function to work out the rolling analytics of the new cases of every area in area_stores in one batch and keep them in area_analytics. Areas whose store hasnt changed come from the cache of covid_analytics, so it is cheap to call again. NumPy is only imported here, so the dashboard still runs without it
+    
+        Returns:
+            area_analytics ( dictionary ):
+                A dictionary with the (areaName, areaType) pair as the key and the SeriesAnalytics of that area as the value
+    
+    """
+    data = get_config()
+    results = analyse_areas(dict(area_stores), window=data.get('analytics_window', 7), populations=data.get('area_populations', {}))
+    area_analytics.clear()
+    area_analytics.update(results)
+    return results
+
+def reload_area_stores() -> int:
+    """Function to memory map the binary store of every area again if its file was saved since it was last mapped. Only the leader fetches data, so the other workers call this whenever they read a newer shared state, which keeps area_stores and the trends api the same on every worker
+    
+        Returns:
+            reloaded ( int ):
+                The number of stores that were mapped again
+    
+    """
+    data = get_config()
+    cache_dir = data.get('binary_cache_dir', 'covid_cache')
+    reloaded = 0
+    for area in [(data['area_name'], data['location_type']), ('England', 'nation')] + [tuple(area) for area in data.get('batch_areas', [])]:
+        file_name = binary_file_name(cache_dir, area[0], area[1])
+        try:
+            stat = os.stat(file_name)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if area in area_stores and binary_signatures.get(area) == signature:
+                continue
+            area_stores[area] = CovidDataStore.load_binary(file_name)
+            binary_signatures[area] = signature
+            reloaded += 1
+        except (OSError, ValueError) as error:
+            logger.debug('No cached covid data for %s: %s', area[0], error)
+    if reloaded:
+        logger.info('Mapped %s binary stores from %s', reloaded, cache_dir)
+    return reloaded
+
+def load_cached_covid_data() -> bool:
+    """Function to memory map the binary stores that were saved by the last update and publish their figures, so the dashboard has data before the first update finishes
+    
+        Returns:
+            loaded ( bool ):
+                True if the local and national stores were found and published
+    
+    """
+    data = get_config()
+    local_area = (data['area_name'], data['location_type'])
+    national_area = ('England', 'nation')
+    reload_area_stores()
+    if local_area not in area_stores or national_area not in area_stores:
+        return False
+    publish_covid_metrics(area_stores[local_area], area_stores[national_area], data['area_name'])
+    logger.info('Published the cached covid data')
+    return True
+
+def update_covid() -> bool:
+    """Function to handler the update of the covid data to be displayed on the dashboard by requesting the up to date data from the covid api and adding it to the covid data list
+    
+        Returns:
+            updated ( bool ):
+                False if the local or national data could not be fetched and the old data was kept
+
+    """
+    
+    logger.info("updating covid")
+    data = get_config()
+    incremental = data.get('incremental_updates', True)
+    series_file_name = data.get('series_cache_file', 'covid_series.json')
+    local_area = (data['area_name'], data['location_type'])
+    national_area = ('England', 'nation')
+    area_filters = [local_area, national_area] + [tuple(area) for area in data.get('batch_areas', [])]
+    if incremental and not area_series:
+        load_area_series(series_file_name)
+    results = fetch_areas(area_filters, data.get('max_workers', 4), data.get('area_timeout', COVID_API_TIMEOUT),
+        data.get('area_retries', 2), incremental, data.get('revision_window_days', 7))
+    if incremental:
+        save_area_series(series_file_name)
+    save_area_binaries(results, data.get('binary_cache_dir', 'covid_cache'))
+    area_stores.update({area: store for area, store in results.items() if store is not None})
+    updated = results[local_area] is not None and results[national_area] is not None
+    if updated:
+        publish_covid_metrics(results[local_area], results[national_area], data['area_name'])
+    else:
+        logger.error('Keeping the old covid data because an area could not be fetched')
+    if data.get('analytics', True):
+        try:
+            analyse_area_stores()
+        except Exception:
+            logger.exception('Could not work out the covid analytics')
+    return updated
 
 def get_covid_data_list() -> list:
     """Returns all of the covid data in a list
@@ -380,7 +966,7 @@ def get_covid_data_list() -> list:
     return covid_data_list
 
 def update_updates(update_name:str, update_at:int, update_covid_tick:str, update_news_tick:str, repeating:str) -> None:
-    """Function to update the updates list with all the content that the toats on the dashboard needs
+    """Function to add an Update record to the updates list. The text of its toast is made from its flags
     
         Parameters:
             update_name ( str ): 
@@ -396,44 +982,142 @@ def update_updates(update_name:str, update_at:int, update_covid_tick:str, update
     
     """
     if update_name is not None and update_at is not None:
-        update_dict = {}
-        update_dict['title'] = update_name
-        if update_covid_tick is not None and update_news_tick is not None:
-            if repeating == 'repeat':
-                update_dict['content'] = 'REPEATING: Updating covid and news at ' + update_at
-                logging.info('Added ' + update_name + ' to the update dictionary')
-            else:
-                update_dict['content'] = 'Updating covid and news at ' + update_at
-                logging.info('Added ' + update_name + ' to the update dictionary')
-        elif update_covid_tick is not None:
-            if repeating == 'repeat':
-                update_dict['content'] = 'REPEATING: Updating covid at ' + update_at
-                logging.info('Added ' + update_name + ' to the update dictionary')
-            else:
-                update_dict['content'] = 'Updating covid at ' + update_at
-                logging.info('Added ' + update_name + ' to the update dictionary')
-        elif update_news_tick is not None:
-            if repeating == 'repeat':
-                update_dict['content'] = 'REPEATING: Updating news at ' + update_at
-                logging.info('Added ' + update_name + ' to the update dictionary')
-            else:
-                update_dict['content'] = 'Updating news at ' + update_at
-                logging.info('Added ' + update_name + ' to the update dictionary')
-                logging.info('Added ' + update_name + ' to the update dictionary')
-        else:
-            if repeating == 'repeat':
-                update_dict['content'] = 'REPEATING: Updating nothing at ' + update_at
-                logging.info('Added ' + update_name + ' to the update dictionary')
-            else:
-                update_dict['content'] = 'Updating nothing at ' + update_at
-                logging.info('Added ' + update_name + ' to the update dictionary')
-        updates.append(update_dict)
+        updates.append(Update(update_name, update_at, update_covid_tick is not None, update_news_tick is not None, repeating == 'repeat'))
+        logger.info('Added %s to the update dictionary', update_name)
+        publish(updates=updates)
 
 def get_updates() -> list:
     """Function to get the update list
     
         Returns:
             updates ( list ):
-                A list of updates with all the content and titles that the toats on the dashboard need
+                A list of Update records with the titles of the toasts, whose content is made from their flags
     """
     return updates
+
+def record_update_ran(update_name: str) -> None:
+    """Function that runs after every run of a repeating update and records it in the journal, so a run that is missed while the program is stopped can be found
+    
+        Parameters:
+            update_name ( str ):
+                The name of the update
+
+    """
+    if journal is not None:
+        journal.record_ran(update_name)
+
+def open_journal(file_name: str, fsync: bool = True) -> ScheduleJournal:
+    """Function to open the journal the scheduled updates are recorded in
+    
+        Parameters:
+            file_name ( str ):
+                The name of the journal file, or an empty string to not keep a journal
+            fsync ( bool ):
+                If True every change is flushed to the disk before the function returns
+
+        Returns:
+            journal ( ScheduleJournal ):
+                The journal, or None if there isnt one
+
+    """
+    global journal
+    if journal is not None:
+        journal.close()
+    journal = ScheduleJournal(file_name, fsync) if file_name else None
+    return journal
+
+def restore_updates() -> int:
+    """Function to make the updates list match the updates of the current dashboard snapshot. A follower only reads the snapshots the leader shares, so when it becomes the leader its list has to match them before restore_schedules() or a new update changes it
+    
+        Returns:
+            restored ( int ):
+                The number of updates in the list
+    
+    """
+    updates[:] = get_snapshot().updates
+    logger.info('Restored %s updates from the shared state', len(updates))
+    return len(updates)
+
+def restore_schedules() -> int:
+    """Function to replay the journal and put every update that is still active back in the scheduler in one step. One off updates that were due while the program was stopped and repeating updates that missed a run are joined into a single catch up run, so the data is only fetched once however many were missed
+    
+        Returns:
+            restored ( int ):
+                The number of updates that are scheduled again
+
+    """
+    if journal is None:
+        return 0
+    now = time.time()
+    entries = journal.replay()
+    titles = {update['title'] for update in updates}
+    jobs = []
+    new_updates = []
+    missed_covid = missed_news = False
+    for update_name, entry in entries.items():
+        if update_name in schedules:
+            continue
+        update_covid_tick = 'covid-data' if entry['covid'] else None
+        update_news_tick = 'news' if entry['news'] else None
+        repeat = 'repeat' if entry['repeat'] else None
+        due = entry['due']
+        if due <= now:
+            if repeat is None:
+                missed_covid = missed_covid or entry['covid']
+                missed_news = missed_news or entry['news']
+                journal.record_remove(update_name)
+                continue
+            last_due = due + (now - due) // 86400 * 86400
+            if entry.get('ran', 0) < last_due:
+                missed_covid = missed_covid or entry['covid']
+                missed_news = missed_news or entry['news']
+            due = last_due + 86400
+        if update_name not in titles:
+            new_updates.append(Update(update_name, entry['at'], entry['covid'], entry['news'], entry['repeat']))
+        jobs.extend(update_jobs(due, update_name, repeat, update_covid_tick, update_news_tick))
+    for job in s.enter_many(jobs):
+        schedules.setdefault(job.name, []).append(job)
+    if new_updates:
+        updates.extend(new_updates)
+        publish(updates=updates)
+    if missed_covid or missed_news:
+        s.enter(0, 1, catch_up_updates, (missed_covid, missed_news), name='catch-up')
+    journal.compact()
+    restored = len({job[4] for job in jobs})
+    logger.info('Restored %s updates from the schedule journal', restored)
+    return restored
+
+def catch_up_updates(covid: bool, news: bool) -> None:
+    """Function that runs once at start up for all of the updates that were missed while the program was stopped
+    
+        Parameters:
+            covid ( bool ):
+                True if a missed update would have refreshed the covid data
+            news ( bool ):
+                True if a missed update would have refreshed the news
+
+    """
+    logger.info('Catching up on missed updates, covid %s, news %s', covid, news)
+    if covid:
+        covid_updater()
+    if news:
+        news_updater()
+
+def suspend_schedules() -> int:
+    """Function to cancel every scheduled job when this worker stops being the leader, so only the new leader fetches data and writes the state. The journal is left as it is, so restore_schedules() schedules the updates again if this worker becomes the leader again
+    
+        Returns:
+            cancelled ( int ):
+                The number of jobs that were cancelled
+
+    """
+    cancelled = s.cancel_all()
+    schedules.clear()
+    logger.warning('Cancelled %s scheduled jobs because this worker is no longer the leader', cancelled)
+    return cancelled
+
+covid_updater = CoalescedAction(update_covid)
+news_updater = CoalescedAction(update_news)
+
+data_plane.register('schedule_update', schedule_update)
+data_plane.register('remove_update', remove_from_update)
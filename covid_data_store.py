@@ -0,0 +1,497 @@
+"""A module that holds the covid data for one area in a columnar store, so the CSV lines only have to be split once
+
+    Attributes
+    ----------
+    METRICS ( tuple ):
+        The names of the metric columns that are kept for every area.
+    CSV_COLUMNS ( tuple ):
+        The order of the columns in the CSV files from the covid api, used when a file has no header line.
+    BINARY_MAGIC ( bytes ):
+        The first four bytes of a binary store file.
+    BINARY_VERSION ( int ):
+        The version of the binary store file format.
+    INCOMPLETE_DAYS ( int ):
+        The number of days, counting the newest day that has a value, that are still being reported and so arent part of a complete window.
+    WINDOW_DAYS ( int ):
+        The number of days in the window that the headline figures add up.
+
+    Classes
+    -------
+    CovidDataStore:
+        A store with one date column and one int column per metric, where every metric has a missing value mask.
+
+    Methods
+    -------
+    binary_file_name(cache_dir, area_name, area_type):
+        Function to return the file name of the binary store of an area
+    as_store(covid_data):
+        Function to turn a list of CSV lines into a store, or return the store if it already is one
+
+"""
+import itertools
+import mmap
+import os
+import struct
+from array import array
+from datetime import date
+
+METRICS = ('cumDailyNsoDeathsByDeathDate', 'hospitalCases', 'newCasesBySpecimenDate')
+CSV_COLUMNS = ('areaCode', 'areaName', 'areaType', 'date') + METRICS
+BINARY_MAGIC = b'CVDS'
+BINARY_VERSION = 1
+_BINARY_HEADER = struct.Struct('=4sHHII64s64s64s4x')
+_BYTE_ORDER_MARK = 0x01020304
+_versions = itertools.count(1)
+INCOMPLETE_DAYS = 1
+WINDOW_DAYS = 7
+
+
+class CovidDataStore:
+    """A columnar store of the covid data for one area, with the newest date in row 0 like the api returns it
+
+        Attributes
+        ----------
+        area_code ( str ):
+            The area code of the rows in the store
+        area_name ( str ):
+            The area name of the rows in the store
+        area_type ( str ):
+            The area type of the rows in the store
+        dates ( array ):
+            The date of every row as a proleptic Gregorian ordinal, in an int32 array
+        values ( dictionary ):
+            A dictionary with the metric name as the key and an int32 array of that metric as the value
+        missing ( dictionary ):
+            A dictionary with the metric name as the key and a bytearray as the value, where 1 means the value was empty
+        version ( int ):
+            A number that is different every time the store is indexed or loaded, so results worked out from the store can be cached until its data changes
+        latest ( dictionary ):
+            A dictionary with the metric name as the key and the newest row where that metric isnt missing as the value, or -1 if every row is missing
+        window_start ( dictionary ):
+            A dictionary with the metric name as the key and the first row of the newest complete window of WINDOW_DAYS days as the value, or -1 if there arent enough rows
+
+    """
+
+    def __init__(self) -> None:
+        self.area_code = ''
+        self.area_name = ''
+        self.area_type = ''
+        self.dates = array('i')
+        self.values = {metric: array('i') for metric in METRICS}
+        self.missing = {metric: bytearray() for metric in METRICS}
+        self._columns = {name: number for number, name in enumerate(CSV_COLUMNS)}
+        self._prefix_sums = {}
+        self._next_valid = {}
+        self._indexed = False
+        self.version = 0
+        self.latest = {}
+        self.window_start = {}
+
+    @classmethod
+    def from_lines(cls, lines) -> 'CovidDataStore':
+        """Function to build a store from an iterable of CSV lines in one pass
+
+            Parameters:
+                lines ( iterable ):
+                    The lines of a CSV file from the covid api, the header line is optional
+
+            Returns:
+                store ( CovidDataStore ):
+                    The store holding all of the rows from the lines
+
+        """
+        store = cls()
+        for line in lines:
+            store.add_line(line)
+        store.build_index()
+        return store
+
+    @classmethod
+    def from_dict(cls, covid_dict: dict) -> 'CovidDataStore':
+        """Function to build a store from a dictionary made by convert_csv_to_dict, with the newest date in row 0
+
+            Parameters:
+                covid_dict ( dictionary ):
+                    A dictionary with the date as the key and the rest of the CSV fields as the value
+
+            Returns:
+                store ( CovidDataStore ):
+                    The store holding all of the dates in the dictionary
+
+        """
+        store = cls()
+        for row_date in sorted(covid_dict, reverse=True):
+            if row_date == 'date':
+                continue
+            fields = covid_dict[row_date]
+            store.add_fields(fields[:3] + [row_date] + fields[3:])
+        store.build_index()
+        return store
+
+    def with_newer_rows(self, newer: 'CovidDataStore') -> 'CovidDataStore':
+        """Function to return a new store with the rows of a newer store followed by the rows of this store that are older than its oldest row, so a refresh only has to parse the new days and the old columns are copied as they are
+
+            Parameters:
+                newer ( CovidDataStore ):
+                    A store of the newest days, including every day of this store that it overlaps
+
+            Returns:
+                store ( CovidDataStore ):
+                    The merged store, which is indexed again
+
+        """
+        if not newer.dates:
+            return self
+        oldest_new_date = newer.dates[-1]
+        keep = 0
+        while keep < len(self.dates) and self.dates[keep] >= oldest_new_date:
+            keep += 1
+        store = type(self)()
+        store.area_code = newer.area_code
+        store.area_name = newer.area_name
+        store.area_type = newer.area_type
+        store.dates = array('i', newer.dates)
+        store.dates.frombytes(bytes(self.dates[keep:]))
+        for metric in METRICS:
+            store.values[metric] = array('i', newer.values[metric])
+            store.values[metric].frombytes(bytes(self.values[metric][keep:]))
+            store.missing[metric] = bytearray(newer.missing[metric]) + bytes(self.missing[metric][keep:])
+        store.build_index()
+        return store
+
+    @classmethod
+    def from_file(cls, csv_filename: str) -> 'CovidDataStore':
+        """Function to build a store from a CSV file without keeping the lines of the file in memory
+
+            Parameters:
+                csv_filename ( str ):
+                    The file name of the CSV file that is to be parsed
+
+            Returns:
+                store ( CovidDataStore ):
+                    The store holding all of the rows from the file
+
+        """
+        with open(csv_filename, 'r', encoding='cp1252') as file:
+            return cls.from_lines(file)
+
+    def add_line(self, line: str) -> None:
+        """Function to add one line of a CSV file to the store. Header lines update the column order and empty lines are skipped
+
+            Parameters:
+                line ( str ):
+                    One line of a CSV file from the covid api
+
+        """
+        line = line.rstrip('\r\n')
+        if line == '':
+            return
+        fields = line.split(',')
+        if 'date' in fields:
+            self._columns = {name: number for number, name in enumerate(fields)}
+            return
+        self.add_fields(fields)
+
+    def add_fields(self, fields: list) -> None:
+        """Function to add one row that has already been split into its fields to the store
+
+            Parameters:
+                fields ( list ):
+                    The fields of one row of a CSV file from the covid api, in the order of the last header line
+
+        """
+        columns = self._columns
+        if not self.dates:
+            self.area_code = fields[columns['areaCode']] if 'areaCode' in columns else ''
+            self.area_name = fields[columns['areaName']] if 'areaName' in columns else ''
+            self.area_type = fields[columns['areaType']] if 'areaType' in columns else ''
+        self.dates.append(date.fromisoformat(fields[columns['date']]).toordinal())
+        for metric in METRICS:
+            number = columns.get(metric)
+            field = fields[number] if number is not None and number < len(fields) else ''
+            if field == '':
+                self.values[metric].append(0)
+                self.missing[metric].append(1)
+            else:
+                self.values[metric].append(int(field))
+                self.missing[metric].append(0)
+        self._indexed = False
+
+    def build_index(self) -> None:
+        """Function to build the prefix sums and next valid row index of every metric, so that lookups take constant time"""
+        size = len(self.dates)
+        for metric in METRICS:
+            values = self.values[metric]
+            missing = self.missing[metric]
+            prefix_sums = array('q', [0]) * (size + 1)
+            next_valid = array('i', [-1]) * (size + 1)
+            running_total = 0
+            for row in range(size):
+                running_total += values[row]
+                prefix_sums[row + 1] = running_total
+            for row in range(size - 1, -1, -1):
+                next_valid[row] = next_valid[row + 1] if missing[row] else row
+            self._prefix_sums[metric] = prefix_sums
+            self._next_valid[metric] = next_valid
+        self._index_latest()
+        self._indexed = True
+        self.version = next(_versions)
+
+    def _index_latest(self) -> None:
+        """Function to record the newest non missing row and the start of the newest complete window of every metric. The newest day that has a value is still being reported, so the complete window starts INCOMPLETE_DAYS rows after it, whatever the publication lag of the area is"""
+        size = len(self.dates)
+        for metric in METRICS:
+            latest = self._next_valid[metric][0] if size else -1
+            self.latest[metric] = latest
+            start = latest + INCOMPLETE_DAYS
+            self.window_start[metric] = start if latest != -1 and start + WINDOW_DAYS <= size else -1
+
+    def save_binary(self, file_name: str) -> None:
+        """Function to save the store to a binary file with fixed width columns, so it can be memory mapped with load_binary(). The file is replaced in one step so a reader never sees half a file
+
+            The file has a header followed by the int32 dates, then for every metric the int32 values, the int32 next valid row index and the uint8 missing mask, then for every metric the int64 prefix sums. Every column starts on an 8 byte boundary
+
+            Parameters:
+                file_name ( str ):
+                    The file name of the binary file
+
+        """
+        if not self._indexed:
+            self.build_index()
+        header = _BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(METRICS), _BYTE_ORDER_MARK, len(self.dates),
+            self.area_code.encode('utf-8')[:64], self.area_name.encode('utf-8')[:64], self.area_type.encode('utf-8')[:64])
+        columns = [array('i', self.dates)]
+        for metric in METRICS:
+            columns.append(array('i', self.values[metric]))
+            columns.append(array('i', self._next_valid[metric]))
+            columns.append(bytes(self.missing[metric]))
+        for metric in METRICS:
+            columns.append(array('q', self._prefix_sums[metric]))
+        temp_file_name = file_name + '.tmp'
+        with open(temp_file_name, 'wb') as binary_file:
+            binary_file.write(header)
+            for column in columns:
+                data = bytes(column)
+                binary_file.write(data)
+                binary_file.write(bytes(-len(data) % 8))
+        os.replace(temp_file_name, file_name)
+
+    @classmethod
+    def load_binary(cls, file_name: str) -> 'CovidDataStore':
+        """Function to load a store saved with save_binary() by memory mapping the file, so nothing is parsed and the pages are shared by every process that maps the same file. The store that is returned is read only
+
+            Parameters:
+                file_name ( str ):
+                    The file name of the binary file
+
+            Returns:
+                store ( CovidDataStore ):
+                    The store with its columns pointing into the memory mapped file
+
+        """
+        with open(file_name, 'rb') as binary_file:
+            mapped = mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, metric_count, byte_order, size, area_code, area_name, area_type = _BINARY_HEADER.unpack_from(mapped)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION or metric_count != len(METRICS) or byte_order != _BYTE_ORDER_MARK:
+            mapped.close()
+            raise ValueError('Not a binary store file that this version can read: ' + file_name)
+        view = memoryview(mapped)
+        offset = _BINARY_HEADER.size
+
+        def column(item_format: str, count: int) -> memoryview:
+            nonlocal offset
+            length = count * struct.calcsize(item_format)
+            data = view[offset:offset + length].cast(item_format)
+            offset += length + (-length % 8)
+            return data
+
+        store = cls()
+        store.area_code = area_code.rstrip(b'\0').decode('utf-8')
+        store.area_name = area_name.rstrip(b'\0').decode('utf-8')
+        store.area_type = area_type.rstrip(b'\0').decode('utf-8')
+        store.dates = column('i', size)
+        for metric in METRICS:
+            store.values[metric] = column('i', size)
+            store._next_valid[metric] = column('i', size + 1)
+            store.missing[metric] = column('B', size)
+        for metric in METRICS:
+            store._prefix_sums[metric] = column('q', size + 1)
+        store._mapped = mapped
+        store._index_latest()
+        store._indexed = True
+        store.version = next(_versions)
+        return store
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def date_at(self, row: int) -> str:
+        """Function to return the date of a row
+
+            Parameters:
+                row ( int ):
+                    The row number, where row 0 is the newest date
+
+            Returns:
+                date ( str ):
+                    The date of the row in the YYYY-MM-DD format
+
+        """
+        return date.fromordinal(self.dates[row]).isoformat()
+
+    def value_at(self, metric: str, row: int) -> int:
+        """Function to return the value of a metric on one row
+
+            Parameters:
+                metric ( str ):
+                    The name of the metric
+                row ( int ):
+                    The row number, where row 0 is the newest date
+
+            Returns:
+                value ( int ):
+                    The value of the metric, or None if the value is missing or the row doesnt exist
+
+        """
+        if row < 0 or row >= len(self.dates) or self.missing[metric][row]:
+            return None
+        return self.values[metric][row]
+
+    def window_sum(self, metric: str, start: int, length: int) -> int:
+        """Function to add up the values of a metric over a window of rows, where missing values count as 0
+
+            Parameters:
+                metric ( str ):
+                    The name of the metric
+                start ( int ):
+                    The first row of the window
+                length ( int ):
+                    The number of rows in the window
+
+            Returns:
+                total ( int ):
+                    The sum of the metric over the rows of the window that exist
+
+        """
+        if not self._indexed:
+            self.build_index()
+        size = len(self.dates)
+        start = min(max(start, 0), size)
+        end = min(start + max(length, 0), size)
+        prefix_sums = self._prefix_sums[metric]
+        return prefix_sums[end] - prefix_sums[start]
+
+    def latest_row(self, metric: str, start: int = 0) -> int:
+        """Function to find the newest row at or after start where the metric isnt missing
+
+            Parameters:
+                metric ( str ):
+                    The name of the metric
+                start ( int ):
+                    The row to start looking from
+
+            Returns:
+                row ( int ):
+                    The row number, or -1 if every row from start is missing
+
+        """
+        if not self._indexed:
+            self.build_index()
+        if start < 0 or start >= len(self.dates):
+            return -1
+        return self._next_valid[metric][start]
+
+    def latest_value(self, metric: str, start: int = 0, default: int = 0) -> int:
+        """Function to return the newest value of a metric at or after start that isnt missing
+
+            Parameters:
+                metric ( str ):
+                    The name of the metric
+                start ( int ):
+                    The row to start looking from
+                default ( int ):
+                    The value that is returned when every row from start is missing
+
+            Returns:
+                value ( int ):
+                    The newest value of the metric
+
+        """
+        row = self.latest_row(metric, start)
+        if row == -1:
+            return default
+        return self.values[metric][row]
+
+    def latest_window_sum(self, metric: str = 'newCasesBySpecimenDate') -> int:
+        """Function to add up a metric over the newest complete window of WINDOW_DAYS days
+
+            Parameters:
+                metric ( str ):
+                    The name of the metric
+
+            Returns:
+                total ( int ):
+                    The sum of the metric over the window, or 0 if there isnt a complete window
+
+        """
+        if not self._indexed:
+            self.build_index()
+        start = self.window_start[metric]
+        if start == -1:
+            return 0
+        return self.window_sum(metric, start, WINDOW_DAYS)
+
+    def headline_figures(self) -> tuple:
+        """Function to return the figures shown on the dashboard, which are all lookups in the indexes built when the store was indexed
+
+            Returns:
+                number_of_cases ( int ):
+                    The number of cases in the newest complete 7-day window
+                current_number_of_hospital ( int ):
+                    The newest number of people in hospital
+                cummulative_number_of_deaths ( int ):
+                    The newest total number of deaths
+
+        """
+        return (self.latest_window_sum('newCasesBySpecimenDate'),
+            self.latest_value('hospitalCases'),
+            self.latest_value('cumDailyNsoDeathsByDeathDate'))
+
+
+def binary_file_name(cache_dir: str, area_name: str, area_type: str) -> str:
+    """Function to return the file name of the binary store of an area
+
+        Parameters:
+            cache_dir ( str ):
+                The folder the binary stores are kept in
+            area_name ( str ):
+                The name of the area
+            area_type ( str ):
+                The type of the area
+
+        Returns:
+            file_name ( str ):
+                The file name of the binary store
+
+    """
+    safe_name = ''.join(character if character.isalnum() else '_' for character in area_name)
+    return os.path.join(cache_dir, area_type + '_' + safe_name + '.bin')
+
+
+def as_store(covid_data) -> CovidDataStore:
+    """Function to turn a list of CSV lines or a dictionary made by convert_csv_to_dict into a store, or return the store if it already is one
+
+        Parameters:
+            covid_data ( list, dictionary or CovidDataStore ):
+                A list of the lines of a CSV file from the covid api, a dictionary with the date as the key, or a store that has already been built
+
+        Returns:
+            store ( CovidDataStore ):
+                The store holding the covid data
+
+    """
+    if isinstance(covid_data, CovidDataStore):
+        return covid_data
+    if isinstance(covid_data, dict):
+        return CovidDataStore.from_dict(covid_data)
+    return CovidDataStore.from_lines(covid_data)
@@ -3,29 +3,157 @@
     Attributes
     ----------
     ARTICLES ( list ):
-        A list of articles that is returned from the news api, this is cleared and refreshed everytime a new request is sent to the api.
-    removed ( list ):
-        A list of articles the user has removed from the dashboard that can later be used to make sure the same articles dont reappear
+        A list of the Article records from the news api that are shown. It is built from the index of the articles every time the news is published, and replaced everytime a new request is sent to the api.
+    removed ( DismissedKeys ):
+        The keys of the articles the user has removed from the dashboard, used to make sure the same articles dont reappear. Keys are forgotten after a time to live so it doesnt grow forever
+    news_session ( NewsSession ):
+        The pooled keep alive session every request to the news api goes through.
+
+    Classes
+    -------
+    DismissedKeys:
+        A bounded set of article keys where every key expires after a time to live.
+    NewsSession:
+        A keep alive session for the news api that sends conditional requests and retries with a backoff.
 
     Methods
     -------
+    article_key( article ):
+        Function to return the stable key of an article, which is its url or its title if it has no url
+    duplicate_key( article ):
+        Function to return a key that is the same for copies of one story that were published by different sites, where the name of the site is only left out of the title when it is the source of the article
+    load_articles( articles ):
+        Function to index a list of articles from the news api, leaving out removed articles and duplicate stories
     news_api_request( covid_terms ):
         Function to get the news data from the news api and return a response in a json format
+    decode_news( chunks ):
+        Function to decode a response of the news api as it arrives, turning every entry of the articles array into an Article record
     get_articles( ):
         A function that returns the list of articles where each entry is a dictionary of title, content pairs.
     update_news( ):
         A function that controls how the articles variable is updated. It requests a new update from the news api and removes any previously removed articles
+    restore_articles( ):
+        Function to rebuild the index of the articles from the current dashboard snapshot, so a worker that becomes the leader carries on from the articles of the last leader
     remove_from_articles( what_to_remove ):
         A function that removes the articles the user deletes by removing it from the articles list and adding it to the removed list.
 
 """
 
+import codecs
 import json
 import logging
-import requests
+import re
+import threading
+import time
+from collections import OrderedDict
+from dashboard_config import get_config
+from dashboard_records import Article
+from dashboard_snapshot import get_snapshot, publish
+from instrumentation import timer
+from request_cache import api_cache
+from state_backend import data_plane
+
+logger = logging.getLogger(__name__)
+
+
+class DismissedKeys:
+    """A bounded set of article keys where every key expires after a time to live
+
+        Attributes
+        ----------
+        ttl ( float ):
+            The number of seconds a key is kept for
+        max_entries ( int ):
+            The largest number of keys, the oldest keys are forgotten first when there are more
+
+    """
+
+    def __init__(self, ttl: float = 30 * 86400, max_entries: int = 10000, clock=time.time) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._expiry = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: str) -> None:
+        """Function to add a key, or restart its time to live if it is already in the set"""
+        with self._lock:
+            self._expiry[key] = self._clock() + self.ttl
+            self._expiry.move_to_end(key)
+            while len(self._expiry) > self.max_entries:
+                self._expiry.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            expiry = self._expiry.get(key)
+            if expiry is None:
+                return False
+            if expiry <= self._clock():
+                del self._expiry[key]
+                return False
+            return True
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def clear(self) -> None:
+        """Function to forget every key"""
+        with self._lock:
+            self._expiry.clear()
+
+    def expire(self) -> None:
+        """Function to forget every key whose time to live has run out"""
+        now = self._clock()
+        with self._lock:
+            while self._expiry and next(iter(self._expiry.values())) <= now:
+                self._expiry.popitem(last=False)
+
 
 ARTICLES = []
-removed = []
+removed = DismissedKeys()
+_articles_by_key = OrderedDict()
+_keys_by_title = {}
+_articles_lock = threading.Lock()
+_SOURCE_SUFFIX = re.compile(r'\s+[-|–]\s+([^-|–]{1,40})$')
+_NOT_WORDS = re.compile(r'[^a-z0-9]+')
+NEWS_API_URL = 'https://newsapi.org/v2/everything'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+NEWS_CHUNK_SIZE = 16384
+
+def article_key(article: dict) -> str:
+    """Function to return the stable key of an article, which is its url or its title if it has no url
+    
+        Parameters:
+            article ( Article ):
+                An article from the news api, as an Article or a dictionary
+
+        Returns:
+            key ( str ):
+                The key of the article
+
+    """
+    return article.get('url') or 'title:' + article['title']
+
+def duplicate_key(article: dict) -> str:
+    """Function to return a key that is the same for copies of one story that were published by different sites. It is the title in lower case without punctuation, and without the part after the last dash or bar when that part is the name of the source of the article, so "Covid cases - Scotland" and "Covid cases - Wales" stay different stories
+    
+        Parameters:
+            article ( Article ):
+                An article from the news api, as an Article or a dictionary
+
+        Returns:
+            key ( str ):
+                The key shared by copies of the story
+
+    """
+    title = article['title'] or ''
+    source = article.get('source')
+    if isinstance(source, dict):
+        source = source.get('name')
+    suffix = _SOURCE_SUFFIX.search(title)
+    if suffix and source and _NOT_WORDS.sub(' ', suffix.group(1).lower()).strip() == _NOT_WORDS.sub(' ', source.lower()).strip():
+        title = title[:suffix.start()]
+    return 'story:' + _NOT_WORDS.sub(' ', title.lower()).strip()
 
 def news_api_request(covid_terms: str="Covid COVID-19 coronavirus") -> json:
     """Function to get the news data from the news api
@@ -36,20 +164,209 @@ def news_api_request(covid_terms: str="Covid COVID-19 coronavirus") -> json:
     
         Returns:
             response.json():
-                Returns the response from the news api in a json format. ou can access the articles by doing response['articles']
+                Returns the response from the news api in a json format. ou can access the articles by doing response['articles']. Identical requests close together share one response from the api cache
                 
     """
-    with open("config.json", 'r', encoding='cp1252') as json_data_file:
-        data = json.load(json_data_file)
-    url = ('https://newsapi.org/v2/everything?'
-       'q='+covid_terms+'&'
-       'language=en&'
-       'sortBy=publishedAt&'
-       'apiKey=' + data["api_key"])
-
-    logging.info('Requesting response from news api')
-    response = requests.get(url)
-    return response.json()
+    key = ('news', ' '.join(covid_terms.split()))
+    return api_cache.get_or_call(key, _news_api_request, covid_terms)
+
+def _news_api_request(covid_terms: str) -> json:
+    """Function to get the news data from the news api through the pooled session, without going through the cache"""
+    return news_session.get_news(covid_terms)
+
+def decode_news(chunks) -> dict:
+    """Function to decode a response of the news api from the chunks of bytes as they arrive. Every entry of the articles array is turned into an Article record as soon as it has been read, so the whole response and the full dictionaries of the articles are never held in memory at once. Objects outside the articles array are left as they are
+    
+        Parameters:
+            chunks ( iterable ):
+                The body of the response as chunks of UTF-8 bytes
+    
+        Returns:
+            news ( dictionary ):
+                The decoded response, where every article is an Article record
+    
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    state = {'buffer': '', 'position': 0, 'finished': False}
+
+    def fill() -> bool:
+        """Function to add the next chunk to the buffer, dropping what has already been read. Returns False at the end of the body"""
+        if state['finished']:
+            return False
+        chunk = next(chunks, None)
+        if chunk is None:
+            state['finished'] = True
+            text = text_decoder.decode(b'', final=True)
+        else:
+            text = text_decoder.decode(chunk)
+        state['buffer'] = state['buffer'][state['position']:] + text
+        state['position'] = 0
+        return True
+
+    def peek() -> str:
+        """Function to skip whitespace and return the next character, or an empty string at the end of the body"""
+        while True:
+            buffer, position = state['buffer'], state['position']
+            while position < len(buffer) and buffer[position] in ' \t\r\n':
+                position += 1
+            state['position'] = position
+            if position < len(buffer):
+                return buffer[position]
+            if not fill():
+                return ''
+
+    def take(expected: str) -> str:
+        """Function to read one of the expected characters"""
+        character = peek()
+        if not character or character not in expected:
+            raise ValueError('The news api response is not valid JSON: expected one of %r but found %r' % (expected, character))
+        state['position'] += 1
+        return character
+
+    def value():
+        """Function to decode the next JSON value. A value that ends at the end of the buffer might be a number that goes on in the next chunk, so it is only kept once something follows it"""
+        peek()
+        while True:
+            try:
+                result, end = decoder.raw_decode(state['buffer'], state['position'])
+                if end < len(state['buffer']) or state['finished']:
+                    state['position'] = end
+                    return result
+            except json.JSONDecodeError:
+                if state['finished']:
+                    raise
+            fill()
+
+    news = {}
+    take('{')
+    if peek() == '}':
+        return news
+    while True:
+        key = value()
+        take(':')
+        if key == 'articles' and peek() == '[':
+            take('[')
+            articles = []
+            if peek() == ']':
+                take(']')
+            else:
+                while True:
+                    entry = value()
+                    articles.append(Article.from_dict(entry) if isinstance(entry, dict) else entry)
+                    if take(',]') == ']':
+                        break
+            news[key] = articles
+        else:
+            news[key] = value()
+        if take(',}') == '}':
+            return news
+
+
+class NewsSession:
+    """A keep alive session for the news api. Connections and TLS sessions are reused from a pool, and every request sends the ETag and Last-Modified of the last response so an unchanged feed is a small 304 response
+
+        Attributes
+        ----------
+        api_key ( str ):
+            The key of the news api, or None to use the "api_key" field of the config, which can be set by the DASHBOARD_API_KEY environment variable
+        timeout ( tuple ):
+            The number of seconds to wait to connect and to wait for the response
+        retries ( int ):
+            The number of times a request that failed to connect, timed out or got a 429 or 5xx response is tried again
+        backoff ( float ):
+            The number of seconds to wait before the first retry, this doubles after every retry
+        pool_size ( int ):
+            The largest number of connections that are kept open
+
+    """
+
+    def __init__(self, api_key: str = None, timeout: tuple = (3.05, 10), retries: int = 2, backoff: float = 0.5, pool_size: int = 4) -> None:
+        self.api_key = api_key
+        self.timeout = tuple(timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._session = None
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    def configure(self, api_key: str = None, timeout: tuple = (3.05, 10), retries: int = 2, backoff: float = 0.5, pool_size: int = 4) -> None:
+        """Function to change the settings of the session, see the attributes of the class for the parameters"""
+        self.api_key = api_key
+        self.timeout = tuple(timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.close()
+
+    def session(self):
+        """Function to return the requests session, which is made the first time it is needed. requests is imported here so importing this module stays fast"""
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                self._session.mount('https://', adapter)
+                self._session.mount('http://', adapter)
+            return self._session
+
+    def close(self) -> None:
+        """Function to close every pooled connection"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def get_news(self, covid_terms: str) -> dict:
+        """Function to request the newest english articles that match the terms
+        
+            Parameters:
+                covid_terms ( str ):
+                    The terms that the articles have to match
+
+            Returns:
+                response ( dictionary ):
+                    The response of the news api, where every article is an Article record. If the feed didnt change since the last request, the last response is returned
+
+        """
+        import requests
+        api_key = self.api_key or get_config()['api_key']
+        params = {'q': covid_terms, 'language': 'en', 'sortBy': 'publishedAt'}
+        key = tuple(params.values())
+        with self._lock:
+            etag, last_modified, last_response = self._validators.get(key, (None, None, None))
+        headers = {'X-Api-Key': api_key}
+        if last_response is not None:
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        logger.info('Requesting response from news api')
+        for attempt in range(self.retries + 1):
+            try:
+                with timer('dashboard_upstream_request_seconds', api='news'):
+                    with self.session().get(NEWS_API_URL, params=params, headers=headers, timeout=self.timeout, stream=True) as response:
+                        if response.status_code == 304 and last_response is not None:
+                            logger.info('The news has not changed since the last request')
+                            return last_response
+                        if response.status_code not in RETRY_STATUSES:
+                            response.raise_for_status()
+                            news = decode_news(response.iter_content(NEWS_CHUNK_SIZE))
+                            break
+                        if attempt == self.retries:
+                            response.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if attempt == self.retries:
+                    raise
+                logger.warning('Attempt %s to fetch the news failed: %s', attempt + 1, error)
+            time.sleep(self.backoff * 2 ** attempt)
+        if response.ok:
+            with self._lock:
+                self._validators[key] = (response.headers.get('ETag'), response.headers.get('Last-Modified'), news)
+        return news
 
 def get_articles() -> list:
     """Function to return the articles list that contains all of the articles from the news api that the users hasnt deleted yet
@@ -61,6 +378,66 @@ def get_articles() -> list:
     """
     return ARTICLES
 
+def load_articles(articles: list) -> list:
+    """Function to index a list of articles from the news api, leaving out removed articles and duplicate stories, and make it the articles list
+    
+        Parameters:
+            articles ( list ):
+                The articles from the news api as Article records or dictionaries, newest first
+
+        Returns:
+            ARTICLES ( list ):
+                The new articles list
+    
+    """
+    articles_by_key = OrderedDict()
+    stories = set()
+    for article in articles:
+        if not isinstance(article, Article):
+            article = Article.from_dict(article)
+        key = article_key(article)
+        story = duplicate_key(article)
+        if key in removed or story in stories or key in articles_by_key:
+            continue
+        stories.add(story)
+        articles_by_key[key] = article
+    with _articles_lock:
+        _articles_by_key.clear()
+        _articles_by_key.update(articles_by_key)
+        _keys_by_title.clear()
+        _keys_by_title.update((article['title'], key) for key, article in articles_by_key.items())
+    logger.info('Loaded %s of %s articles', len(articles_by_key), len(articles))
+    return _publish_articles()
+
+def _publish_articles() -> list:
+    """Function to build the articles list from the index of the articles and publish it, so removing an article only has to take it out of the index"""
+    global ARTICLES
+    with _articles_lock:
+        ARTICLES = list(_articles_by_key.values())
+        articles = ARTICLES
+    publish(articles=articles)
+    return articles
+
+def restore_articles() -> int:
+    """Function to rebuild the index of the articles from the articles of the current dashboard snapshot. A follower only reads the snapshots the leader shares, so when it becomes the leader its index has to be made to match them before it changes the articles itself
+    
+        Returns:
+            restored ( int ):
+                The number of articles in the index
+    
+    """
+    global ARTICLES
+    articles = [article if isinstance(article, Article) else Article.from_dict(article) for article in get_snapshot().articles]
+    with _articles_lock:
+        _articles_by_key.clear()
+        _articles_by_key.update((article_key(article), article) for article in articles)
+        _keys_by_title.clear()
+        _keys_by_title.update((article['title'], key) for key, article in _articles_by_key.items())
+        ARTICLES = list(_articles_by_key.values())
+        restored = len(ARTICLES)
+    logger.info('Restored %s articles from the shared state', restored)
+    return restored
+
 def update_news(test:str='') -> None:
     """Function to update the news when the user requests or the dashboard refreshes
     
@@ -68,14 +445,9 @@ def update_news(test:str='') -> None:
             test ( str ):
                 A variable that exists because one of the tests have it
     """
-    global ARTICLES
     response = news_api_request()
-    test = response['articles']
-    ARTICLES = test
-    for article in removed:
-        if article in ARTICLES:
-            ARTICLES.remove(article)
-            logging.info('Article removed from the articles list: ' + article['title'])
+    removed.expire()
+    load_articles(response['articles'])
 
 def remove_from_articles(what_to_remove:str) -> None:
     """Function to remove an item from the article dictionary
@@ -85,9 +457,15 @@ def remove_from_articles(what_to_remove:str) -> None:
                 The name of the article that is going to be removed from the articles list and added to the removed list
     
     """
-    for keys in ARTICLES:
-        if keys['title'] == what_to_remove:
-            ARTICLES.remove(keys)
-            logging.info('Article removed from the articles list: ' + keys['title'])
-            removed.append(keys)
-            logging.info('Article added to the removed list: ' + keys['title'])
+    with _articles_lock:
+        key = _keys_by_title.pop(what_to_remove, None)
+        if key is None:
+            return
+        del _articles_by_key[key]
+    removed.add(key)
+    logger.info('Article removed from the articles list and added to the removed list: %s', what_to_remove)
+    _publish_articles()
+
+news_session = NewsSession()
+
+data_plane.register('remove_article', remove_from_articles)
@@ -0,0 +1,290 @@
+"""A module that rolls the covid series of an area up into daily, weekly and monthly series once per update, and downsamples a date range of a rollup to a few hundred points while keeping the highs and lows, so drawing a chart only costs the points that are shown and not the whole history
+
+    Attributes
+    ----------
+    TREND_METRICS ( dictionary ):
+        The names of the metrics that can be charted, with the name of the metric column in the store as the value.
+    AGGREGATES ( dictionary ):
+        How the days of a week or month are joined for every metric column. New cases are added up, hospital cases are averaged and the cumulative deaths use the last day.
+    RESOLUTIONS ( tuple ):
+        The resolutions of the rollups, finest first.
+    MAX_POINTS ( int ):
+        The largest number of points that are returned for a chart by default.
+    CACHE_SIZE ( int ):
+        The number of areas whose rollups are kept.
+
+    Classes
+    -------
+    Rollup:
+        One metric of one area at one resolution, with the oldest period first.
+
+    Methods
+    -------
+    build_rollups(store):
+        Function to work out every rollup of a store
+    rollups(store):
+        Function to return the rollups of a store, which are only worked out again when the store changes
+    select(rollup, start=None, end=None):
+        Function to return the periods of a rollup between two dates
+    downsample(dates, values, max_points=MAX_POINTS):
+        Function to cut a series down to at most max_points points, keeping the lowest and highest value of every bucket
+    trend(store, metric, start=None, end=None, resolution='auto', max_points=MAX_POINTS):
+        Function to return the points of a chart of one metric of an area
+    sparkline(store, metric, width=300, height=60, max_points=120, resolution='auto'):
+        Function to return the points of a small SVG line chart of the whole history of a metric
+    clear_cache():
+        Function to forget the rollups of every area
+
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date
+from typing import NamedTuple
+from covid_data_store import CovidDataStore
+
+TREND_METRICS = {'cases': 'newCasesBySpecimenDate', 'hospital': 'hospitalCases', 'deaths': 'cumDailyNsoDeathsByDeathDate'}
+AGGREGATES = {'newCasesBySpecimenDate': 'sum', 'hospitalCases': 'mean', 'cumDailyNsoDeathsByDeathDate': 'last'}
+RESOLUTIONS = ('daily', 'weekly', 'monthly')
+MAX_POINTS = 200
+CACHE_SIZE = 64
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class Rollup(NamedTuple):
+    """One metric of one area at one resolution. Periods where every day is missing are left out
+
+        Attributes
+        ----------
+        area_name ( str ):
+            The name of the area
+        metric ( str ):
+            The name of the metric column
+        resolution ( str ):
+            daily, weekly or monthly
+        dates ( tuple ):
+            The first day of every period as a proleptic Gregorian ordinal, oldest first. Weeks start on a Monday
+        values ( tuple ):
+            The value of every period
+
+    """
+    area_name: str
+    metric: str
+    resolution: str
+    dates: tuple
+    values: tuple
+
+
+def _period_start(ordinal: int, resolution: str) -> int:
+    """Function to return the first day of the period a day is in"""
+    if resolution == 'daily':
+        return ordinal
+    if resolution == 'weekly':
+        return ordinal - (ordinal - 1) % 7
+    day = date.fromordinal(ordinal)
+    return date(day.year, day.month, 1).toordinal()
+
+
+def build_rollups(store: CovidDataStore) -> dict:
+    """Function to work out the daily, weekly and monthly rollups of every metric of a store, with one pass over the column of a metric for every resolution
+
+        Parameters:
+            store ( CovidDataStore ):
+                The store of the area
+
+        Returns:
+            rollups ( dictionary ):
+                A dictionary with (metric, resolution) as the key and the Rollup as the value
+
+    """
+    results = {}
+    for metric, aggregate in AGGREGATES.items():
+        values = store.values[metric]
+        missing = store.missing[metric]
+        for resolution in RESOLUTIONS:
+            dates = []
+            totals = []
+            counts = []
+            for row in range(len(store) - 1, -1, -1):
+                if missing[row]:
+                    continue
+                start = _period_start(store.dates[row], resolution)
+                if not dates or dates[-1] != start:
+                    dates.append(start)
+                    totals.append(0)
+                    counts.append(0)
+                if aggregate == 'last':
+                    totals[-1] = values[row]
+                else:
+                    totals[-1] += values[row]
+                counts[-1] += 1
+            if aggregate == 'mean':
+                totals = [round(total / count, 1) for total, count in zip(totals, counts)]
+            results[metric, resolution] = Rollup(store.area_name, metric, resolution, tuple(dates), tuple(totals))
+    return results
+
+
+def rollups(store: CovidDataStore) -> dict:
+    """Function to return the rollups of a store. They are cached by the area and the version of the store, so they are worked out once per update
+
+        Parameters:
+            store ( CovidDataStore ):
+                The store of the area
+
+        Returns:
+            rollups ( dictionary ):
+                A dictionary with (metric, resolution) as the key and the Rollup as the value
+
+    """
+    key = (store.area_name, store.area_type, store.version)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    results = build_rollups(store)
+    with _cache_lock:
+        _cache[key] = results
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return results
+
+
+def select(rollup: Rollup, start: date = None, end: date = None) -> tuple:
+    """Function to return the periods of a rollup that start between two dates. The range is found with a binary search, so it doesnt depend on the length of the history
+
+        Parameters:
+            rollup ( Rollup ):
+                The rollup
+            start ( date ):
+                The first day, or None for the start of the history
+            end ( date ):
+                The last day, or None for the end of the history
+
+        Returns:
+            dates ( tuple ):
+                The first day of every period in the range
+            values ( tuple ):
+                The value of every period in the range
+
+    """
+    low = 0 if start is None else bisect_left(rollup.dates, _period_start(start.toordinal(), rollup.resolution))
+    high = len(rollup.dates) if end is None else bisect_right(rollup.dates, end.toordinal())
+    return rollup.dates[low:high], rollup.values[low:high]
+
+
+def downsample(dates: tuple, values: tuple, max_points: int = MAX_POINTS) -> tuple:
+    """Function to cut a series down to at most max_points points. The series is split into max_points / 2 buckets and the lowest and highest point of every bucket are kept in date order, so peaks and troughs are never smoothed away
+
+        Parameters:
+            dates ( tuple ):
+                The dates of the points, oldest first
+            values ( tuple ):
+                The values of the points
+            max_points ( int ):
+                The largest number of points to return
+
+        Returns:
+            dates ( list ):
+                The dates of the points that are kept
+            values ( list ):
+                The values of the points that are kept
+
+    """
+    if len(dates) <= max_points:
+        return list(dates), list(values)
+    buckets = max(1, max_points // 2)
+    size = len(dates) / buckets
+    kept_dates = []
+    kept_values = []
+    for bucket in range(buckets):
+        low = int(bucket * size)
+        high = int((bucket + 1) * size)
+        if high <= low:
+            continue
+        lowest = min(range(low, high), key=values.__getitem__)
+        highest = max(range(low, high), key=values.__getitem__)
+        for index in sorted({lowest, highest}):
+            kept_dates.append(dates[index])
+            kept_values.append(values[index])
+    return kept_dates, kept_values
+
+
+def trend(store: CovidDataStore, metric: str, start: date = None, end: date = None, resolution: str = 'auto', max_points: int = MAX_POINTS) -> dict:
+    """Function to return the points of a chart of one metric of an area. With the auto resolution the finest rollup with at most four times max_points periods in the range is used, so a chart never reads more than a few times the points it shows
+
+        Parameters:
+            store ( CovidDataStore ):
+                The store of the area
+            metric ( str ):
+                cases, hospital or deaths
+            start ( date ):
+                The first day, or None for the start of the history
+            end ( date ):
+                The last day, or None for the end of the history
+            resolution ( str ):
+                daily, weekly, monthly or auto
+            max_points ( int ):
+                The largest number of points to return
+
+        Returns:
+            trend ( dictionary ):
+                The area, metric, resolution and how the days of a period are joined, with the points as [date, value] pairs and the date in the YYYY-MM-DD format
+
+    """
+    column = TREND_METRICS[metric]
+    area_rollups = rollups(store)
+    if resolution == 'auto':
+        for resolution in RESOLUTIONS:
+            dates, values = select(area_rollups[column, resolution], start, end)
+            if len(dates) <= max_points * 4:
+                break
+    else:
+        dates, values = select(area_rollups[column, resolution], start, end)
+    dates, values = downsample(dates, values, max_points)
+    return {
+        'area': store.area_name,
+        'metric': metric,
+        'resolution': resolution,
+        'aggregate': AGGREGATES[column],
+        'points': [[date.fromordinal(ordinal).isoformat(), value] for ordinal, value in zip(dates, values)],
+    }
+
+
+def sparkline(store: CovidDataStore, metric: str, width: int = 300, height: int = 60, max_points: int = 120, resolution: str = 'auto') -> str:
+    """Function to return the points of a small SVG line chart of the whole history of a metric, scaled to fit a width by height box
+
+        Parameters:
+            store ( CovidDataStore ):
+                The store of the area
+            metric ( str ):
+                cases, hospital or deaths
+            width ( int ):
+                The width of the chart
+            height ( int ):
+                The height of the chart
+            max_points ( int ):
+                The largest number of points on the line
+            resolution ( str ):
+                daily, weekly, monthly or auto
+
+        Returns:
+            points ( str ):
+                The points attribute of an SVG polyline, or an empty string if there is no data
+
+    """
+    points = trend(store, metric, resolution=resolution, max_points=max_points)['points']
+    if not points:
+        return ''
+    values = [value for _, value in points]
+    lowest = min(values)
+    spread = (max(values) - lowest) or 1
+    step = width / max(len(points) - 1, 1)
+    return ' '.join('%.1f,%.1f' % (number * step, height - (value - lowest) / spread * height) for number, value in enumerate(values))
+
+
+def clear_cache() -> None:
+    """Function to forget the rollups of every area"""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,207 @@
+"""A module with the JSON api of the dashboard, so clients can poll small payloads instead of the whole page and reads are kept separate from writes
+
+    Attributes
+    ----------
+    api ( Blueprint ):
+        The flask blueprint with all of the api routes, registered by main.py.
+
+    Methods
+    -------
+    build_payload(name, snapshot):
+        Function to build the JSON payload of an endpoint from a snapshot, or return the one already built for that snapshot version
+    get_metrics():
+        GET /api/metrics returns the local and national covid figures
+    get_news():
+        GET /api/news returns the news articles that are shown
+    get_updates():
+        GET /api/updates returns the scheduled updates
+    post_update():
+        POST /api/updates schedules a new update. The writes are sent to the data plane, so with several workers they run on the leader
+    delete_update(update_name):
+        DELETE /api/updates/<update_name> cancels a scheduled update
+    delete_article(title):
+        DELETE /api/news/<title> dismisses a news article
+    get_trend(metric):
+        GET /api/trends/<metric> returns the downsampled history of cases, hospital cases or deaths of an area
+    get_analytics():
+        GET /api/analytics returns the newest rolling analytics of the new cases of every area
+
+"""
+import hashlib
+import json
+import logging
+import re
+from datetime import date
+from flask import Blueprint, Response, jsonify, request
+# the handler modules register the commands the write routes submit to the data plane
+import covid_data_handler
+import covid_news_handling  # pylint: disable=unused-import
+from covid_analytics import latest_figures
+from covid_trends import MAX_POINTS, RESOLUTIONS, TREND_METRICS, trend
+from dashboard_config import get_config
+from dashboard_snapshot import get_snapshot
+from state_backend import data_plane
+from time_handling import seconds_until_hhmm
+
+logger = logging.getLogger(__name__)
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+_payloads = {}
+_HHMM = re.compile(r'^([01]?[0-9]|2[0-3]):[0-5][0-9]$')
+
+
+def _metrics_payload(snapshot) -> dict:
+    """Function to build the metrics payload from a snapshot"""
+    metrics = snapshot.metrics
+    return {
+        'local': {'location': snapshot.location, 'cases_7day': metrics[0], 'hospital_cases': metrics[1], 'deaths_total': metrics[2]},
+        'national': {'location': snapshot.nation_location, 'cases_7day': metrics[3], 'hospital_cases': metrics[4], 'deaths_total': metrics[5]},
+    }
+
+
+def _news_payload(snapshot) -> dict:
+    """Function to build the news payload from a snapshot"""
+    return {'articles': [{'title': article['title'], 'content': article['content'], 'url': article.get('url')} for article in snapshot.articles]}
+
+
+def _updates_payload(snapshot) -> dict:
+    """Function to build the updates payload from a snapshot"""
+    return {'updates': [{'title': update['title'], 'content': update['content']} for update in snapshot.updates]}
+
+
+_BUILDERS = {'metrics': _metrics_payload, 'news': _news_payload, 'updates': _updates_payload}
+
+
+def build_payload(name: str, snapshot) -> tuple:
+    """Function to build the JSON payload of an endpoint from a snapshot, or return the one already built for that snapshot version
+
+        Parameters:
+            name ( str ):
+                The name of the endpoint, one of metrics, news or updates
+            snapshot ( DashboardSnapshot ):
+                The snapshot the payload is built from
+
+        Returns:
+            payload ( tuple ):
+                The snapshot version, the JSON as bytes and an ETag that only changes when the JSON changes
+
+    """
+    payload = _payloads.get(name)
+    if payload is None or payload[0] != snapshot.version:
+        body = json.dumps(_BUILDERS[name](snapshot), separators=(',', ':')).encode('utf-8')
+        payload = (snapshot.version, body, hashlib.sha1(body).hexdigest()[:20])
+        _payloads[name] = payload
+    return payload
+
+
+def _json_response(name: str) -> Response:
+    """Function to send the payload of an endpoint, or a 304 response if the client already has it"""
+    snapshot = get_snapshot()
+    _, body, etag = build_payload(name, snapshot)
+    response = Response(body, mimetype='application/json')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+@api.route('/metrics', methods=['GET'])
+def get_metrics() -> Response:
+    """GET /api/metrics returns the local and national 7-day cases, hospital cases and total deaths"""
+    return _json_response('metrics')
+
+
+@api.route('/news', methods=['GET'])
+def get_news() -> Response:
+    """GET /api/news returns the title, content and url of the news articles that are shown"""
+    return _json_response('news')
+
+
+@api.route('/updates', methods=['GET'])
+def get_updates() -> Response:
+    """GET /api/updates returns the title and content of the scheduled updates"""
+    return _json_response('updates')
+
+
+@api.route('/updates', methods=['POST'])
+def post_update() -> Response:
+    """POST /api/updates schedules a new update. The body is JSON with a name, a time in the HH:MM format and optional covid, news and repeat booleans"""
+    data = request.get_json(silent=True) or {}
+    update_name = data.get('name')
+    update_at = data.get('time')
+    if not isinstance(update_name, str) or not update_name.strip():
+        return jsonify(error='name is required'), 400
+    if not isinstance(update_at, str) or not _HHMM.match(update_at):
+        return jsonify(error='time must be formatted as HH:MM'), 400
+    if any(update['title'] == update_name for update in get_snapshot().updates):
+        return jsonify(error='an update with that name already exists'), 409
+    update_covid_tick = 'covid-data' if data.get('covid') else None
+    update_news_tick = 'news' if data.get('news') else None
+    repeat = 'repeat' if data.get('repeat') else None
+    update_interval = seconds_until_hhmm(update_at)
+    data_plane.submit('schedule_update', update_name=update_name, update_at=update_at, update_covid_tick=update_covid_tick, update_news_tick=update_news_tick, repeat=repeat)
+    logger.info('Scheduled %s through the api', update_name)
+    return jsonify(name=update_name, seconds_until_update=update_interval), 201
+
+
+@api.route('/updates/<path:update_name>', methods=['DELETE'])
+def delete_update(update_name: str) -> Response:
+    """DELETE /api/updates/<update_name> cancels a scheduled update and removes its toast"""
+    if not any(update['title'] == update_name for update in get_snapshot().updates):
+        return jsonify(error='no update with that name'), 404
+    data_plane.submit('remove_update', what_to_remove=update_name)
+    return Response(status=204)
+
+
+@api.route('/news/<path:title>', methods=['DELETE'])
+def delete_article(title: str) -> Response:
+    """DELETE /api/news/<title> dismisses a news article so it doesnt come back when the news is updated"""
+    if not any(article['title'] == title for article in get_snapshot().articles):
+        return jsonify(error='no article with that title'), 404
+    data_plane.submit('remove_article', what_to_remove=title)
+    return Response(status=204)
+
+
+@api.route('/trends/<metric>', methods=['GET'])
+def get_trend(metric: str) -> Response:
+    """GET /api/trends/<metric> returns the history of cases, hospital or deaths for an area as [date, value] points. The query can set the area and area_type, the start and end dates in the YYYY-MM-DD format, the resolution (daily, weekly, monthly or auto) and the largest number of points"""
+    if metric not in TREND_METRICS:
+        return jsonify(error='metric must be one of ' + ', '.join(TREND_METRICS)), 400
+    resolution = request.args.get('resolution', 'auto')
+    if resolution != 'auto' and resolution not in RESOLUTIONS:
+        return jsonify(error='resolution must be auto or one of ' + ', '.join(RESOLUTIONS)), 400
+    try:
+        start = date.fromisoformat(request.args['start']) if 'start' in request.args else None
+        end = date.fromisoformat(request.args['end']) if 'end' in request.args else None
+        max_points = min(max(int(request.args.get('points', MAX_POINTS)), 2), 2000)
+    except ValueError:
+        return jsonify(error='start and end must be formatted as YYYY-MM-DD and points must be a number'), 400
+    config_data = get_config()
+    area = (request.args.get('area', config_data['area_name']), request.args.get('area_type', config_data['location_type']))
+    store = covid_data_handler.area_stores.get(area)
+    if store is None:
+        return jsonify(error='no data for that area'), 404
+    body = json.dumps(trend(store, metric, start, end, resolution, max_points), separators=(',', ':')).encode('utf-8')
+    response = Response(body, mimetype='application/json')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.set_etag(hashlib.sha1(body).hexdigest()[:20])
+    return response.make_conditional(request)
+
+
+@api.route('/analytics', methods=['GET'])
+def get_analytics() -> Response:
+    """GET /api/analytics returns the rolling sum, average, rate per 100,000 people, week on week growth and doubling time of the new cases of every area on the newest day that has them. They are worked out from the stores every worker keeps, so any worker can answer"""
+    config_data = get_config()
+    if not config_data.get('analytics', True):
+        return jsonify(error='the analytics are turned off in the config file'), 404
+    try:
+        analytics = covid_data_handler.analyse_area_stores()
+    except ImportError:
+        return jsonify(error='the analytics need NumPy, which is not installed'), 503
+    areas = [dict({'area': area_name, 'area_type': area_type, 'window': area_analytics.window}, **latest_figures(area_analytics))
+        for (area_name, area_type), area_analytics in sorted(analytics.items())]
+    body = json.dumps({'areas': areas}, separators=(',', ':')).encode('utf-8')
+    response = Response(body, mimetype='application/json')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.set_etag(hashlib.sha1(body).hexdigest()[:20])
+    return response.make_conditional(request)
@@ -0,0 +1,192 @@
+"""A module that reads the config file once and serves it from memory. The file is only read again when its modification time or size changes, and environment variables can override any field, so the api key doesnt have to be kept in the file
+
+    Attributes
+    ----------
+    REQUIRED_FIELDS ( dictionary ):
+        The fields every config file must have, with the type of their value.
+    LOCATION_TYPES ( tuple ):
+        The area types the covid api accepts for "location_type".
+    ENV_PREFIX ( str ):
+        The start of the name of the environment variables that override fields, for example DASHBOARD_API_KEY overrides "api_key". Only fields that are in the config file or are required can be overridden.
+    config ( ConfigService ):
+        The config service used by the program, for the config.json file.
+
+    Classes
+    -------
+    ConfigService:
+        Reads, checks and caches a config file.
+
+    Methods
+    -------
+    freeze(value):
+        Function to return a copy of a value from the config file that cant be changed
+    validate(config_data):
+        Function to check that the config has every required field with the right type
+    get_config():
+        Function to return the current config from the config service of the program
+
+"""
+import json
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = {'api_key': str, 'area_name': str, 'location_type': str, 'covid_file_name': str}
+LOCATION_TYPES = ('overview', 'nation', 'region', 'nhsRegion', 'utla', 'ltla')
+ENV_PREFIX = 'DASHBOARD_'
+
+
+def freeze(value):
+    """Function to return a copy of a value from the config file that cant be changed. Dictionaries become read only mappings and lists become tuples
+
+        Parameters:
+            value:
+                A value decoded from JSON
+
+        Returns:
+            value:
+                The read only copy
+
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def validate(config_data: dict) -> None:
+    """Function to check that the config has every required field with the right type, and raise a ValueError that names every problem if it doesnt
+
+        Parameters:
+            config_data ( dictionary ):
+                The decoded config file
+
+    """
+    problems = []
+    for field, field_type in REQUIRED_FIELDS.items():
+        if field not in config_data:
+            problems.append('"%s" is missing' % field)
+        elif not isinstance(config_data[field], field_type):
+            problems.append('"%s" must be a %s' % (field, field_type.__name__))
+    if isinstance(config_data.get('location_type'), str) and config_data['location_type'] not in LOCATION_TYPES:
+        problems.append('"location_type" must be one of %s' % ', '.join(LOCATION_TYPES))
+    if problems:
+        raise ValueError('The config file is not valid: ' + '; '.join(problems))
+
+
+def _environment_overrides(environ, config_data: dict) -> dict:
+    """Function to return the fields set by environment variables. Fields that are strings in the file or in REQUIRED_FIELDS keep the value as it is, so an api key made of digits stays a string. For any other field a value that is valid JSON is decoded, so DASHBOARD_MAX_WORKERS=8 is a number. Variables for fields the config doesnt have are logged and ignored"""
+    overrides = {}
+    for name, value in environ.items():
+        if not name.startswith(ENV_PREFIX) or len(name) == len(ENV_PREFIX):
+            continue
+        field = name[len(ENV_PREFIX):].lower()
+        if field not in config_data and field not in REQUIRED_FIELDS:
+            logger.warning('Ignoring %s because the config has no "%s" field', name, field)
+        elif REQUIRED_FIELDS.get(field) is str or isinstance(config_data.get(field), str):
+            overrides[field] = value
+        else:
+            try:
+                overrides[field] = json.loads(value)
+            except ValueError:
+                overrides[field] = value
+    return overrides
+
+
+class ConfigService:
+    """Reads, checks and caches a config file. The file is checked for changes at most once every check_interval seconds, and a change that isnt valid is logged and ignored so the program keeps the last good config
+
+        Attributes
+        ----------
+        file_name ( str ):
+            The name of the config file
+        check_interval ( float ):
+            The smallest number of seconds between two checks of the modification time of the file
+        environ ( dictionary ):
+            The environment variables the overrides are read from
+        loads ( int ):
+            The number of times the file was read
+
+    """
+
+    def __init__(self, file_name: str = 'config.json', check_interval: float = 1.0, environ=None, clock=time.monotonic) -> None:
+        self.file_name = file_name
+        self.check_interval = check_interval
+        self.environ = os.environ if environ is None else environ
+        self.loads = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._config = None
+        self._signature = None
+        self._checked_at = None
+
+    def get(self):
+        """Function to return the current config, reading the file again first if it changed
+
+            Returns:
+                config ( MappingProxyType ):
+                    The config, which cant be changed
+
+        """
+        now = self._clock()
+        if self._config is not None and now - self._checked_at < self.check_interval:
+            return self._config
+        with self._lock:
+            if self._config is None or now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                self._refresh()
+            return self._config
+
+    def reload(self):
+        """Function to read the file again now, whether or not it changed. Unlike get() an invalid file raises the error"""
+        with self._lock:
+            self._checked_at = self._clock()
+            self._load(self._file_signature())
+            return self._config
+
+    def _file_signature(self) -> tuple:
+        """Function to return the modification time and size of the file, which change whenever it is written"""
+        stat = os.stat(self.file_name)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self) -> None:
+        """Function to read the file if it changed since it was last read, the lock must be held"""
+        if self._config is None:
+            self._load(self._file_signature())
+            return
+        try:
+            signature = self._file_signature()
+            if signature != self._signature:
+                self._load(signature)
+        except (OSError, ValueError) as error:
+            logger.error('Keeping the last config because %s could not be read: %s', self.file_name, error)
+
+    def _load(self, signature: tuple) -> None:
+        """Function to read, override, check and freeze the file, the lock must be held"""
+        with open(self.file_name, 'r', encoding='cp1252') as json_data_file:
+            config_data = json.load(json_data_file)
+        config_data.update(_environment_overrides(self.environ, config_data))
+        validate(config_data)
+        self._config = freeze(config_data)
+        self._signature = signature
+        self.loads += 1
+        logger.info('Loaded the config from %s', self.file_name)
+
+
+config = ConfigService()
+
+
+def get_config():
+    """Function to return the current config from the config service of the program
+
+        Returns:
+            config ( MappingProxyType ):
+                The config, which cant be changed
+
+    """
+    return config.get()
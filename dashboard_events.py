@@ -0,0 +1,249 @@
+"""A module that pushes the changes to the dashboard to the browsers that have it open as server-sent events, so they dont have to reload the whole page to find out if anything changed
+
+    Every snapshot that is published is compared with the one before it and the changes are encoded once, then the same bytes are put on the queue of every open connection. A connection that is waiting for events costs a blocked thread and nothing else.
+
+    Attributes
+    ----------
+    broadcaster ( Broadcaster ):
+        The broadcaster used by the program. main.py adds its publish_snapshot() as a listener of the snapshots and streams it at /events.
+
+    Classes
+    -------
+    Broadcaster:
+        Sends every event to every open connection.
+
+    Methods
+    -------
+    snapshot_state(snapshot):
+        Function to return everything a browser needs from a snapshot
+    snapshot_diff(old, new):
+        Function to return the events that turn one snapshot into another
+    encode_event(event, data, event_id=None):
+        Function to encode an event in the server-sent events format
+
+"""
+import json
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _metrics(snapshot) -> dict:
+    """Function to return the figures of a snapshot with the names of their areas"""
+    metrics = snapshot.metrics
+    return {
+        'local': {'location': snapshot.location, 'cases_7day': metrics[0], 'hospital_cases': metrics[1], 'deaths_total': metrics[2]},
+        'national': {'location': snapshot.nation_location, 'cases_7day': metrics[3], 'hospital_cases': metrics[4], 'deaths_total': metrics[5]},
+    }
+
+
+def _toasts(records) -> list:
+    """Function to return the title and content of every article or update"""
+    return [{'title': record['title'], 'content': record['content']} for record in records]
+
+
+def _added_and_removed(old_records, new_records) -> dict:
+    """Function to return the articles or updates that are new and the titles of the ones that are gone"""
+    old_titles = {record['title'] for record in old_records}
+    new_titles = {record['title'] for record in new_records}
+    return {'added': _toasts(record for record in new_records if record['title'] not in old_titles),
+        'removed': [record['title'] for record in old_records if record['title'] not in new_titles]}
+
+
+def snapshot_state(snapshot) -> dict:
+    """Function to return everything a browser needs from a snapshot, which is sent when it connects
+
+        Parameters:
+            snapshot ( DashboardSnapshot ):
+                The snapshot
+
+        Returns:
+            state ( dictionary ):
+                The figures, the news, the updates and the points of the charts
+
+    """
+    return {'metrics': _metrics(snapshot), 'news': _toasts(snapshot.articles), 'updates': _toasts(snapshot.updates), 'trends': [list(chart) for chart in snapshot.trends]}
+
+
+def snapshot_diff(old, new) -> list:
+    """Function to return the events that turn one snapshot into another. Only the parts that changed are sent
+
+        Parameters:
+            old ( DashboardSnapshot ):
+                The snapshot the browsers have
+            new ( DashboardSnapshot ):
+                The snapshot that was just published
+
+        Returns:
+            events ( list ):
+                A list of (event, data) pairs, where event is metrics, news, updates or trends
+
+    """
+    events = []
+    if old.metrics != new.metrics or old.location != new.location or old.nation_location != new.nation_location:
+        events.append(('metrics', _metrics(new)))
+    if old.articles != new.articles:
+        changes = _added_and_removed(old.articles, new.articles)
+        if changes['added'] or changes['removed']:
+            events.append(('news', changes))
+    if old.updates != new.updates:
+        changes = _added_and_removed(old.updates, new.updates)
+        if changes['added'] or changes['removed']:
+            events.append(('updates', changes))
+    if old.trends != new.trends:
+        events.append(('trends', [list(chart) for chart in new.trends]))
+    return events
+
+
+def encode_event(event: str, data, event_id: int = None) -> bytes:
+    """Function to encode an event in the server-sent events format
+
+        Parameters:
+            event ( str ):
+                The name of the event
+            data:
+                The data of the event, which is sent as JSON
+            event_id ( int ):
+                The id of the event, which the browser sends back in the Last-Event-ID header when it reconnects
+
+        Returns:
+            message ( bytes ):
+                The encoded event
+
+    """
+    message = ''
+    if event_id is not None:
+        message += 'id: %s\n' % event_id
+    return (message + 'event: %s\ndata: %s\n\n' % (event, json.dumps(data, separators=(',', ':')))).encode('utf-8')
+
+
+class Broadcaster:
+    """Sends every event to every open connection. Every connection has its own bounded queue, and a connection that falls too far behind is closed so the browser reconnects and gets the whole state again
+
+        Attributes
+        ----------
+        queue_size ( int ):
+            The largest number of events that wait on the queue of one connection
+        heartbeat ( float ):
+            The number of seconds without an event before a comment is sent, so proxies dont close the connection
+
+    """
+    CLOSE = object()
+
+    def __init__(self, queue_size: int = 64, heartbeat: float = 15.0) -> None:
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self._lock = threading.Lock()
+        self._clients = set()
+        self._snapshot = None
+        self._state = None
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def publish_snapshot(self, snapshot) -> None:
+        """Function that is called with every snapshot that is published. The changes since the last snapshot are encoded once and sent to every connection
+
+            Parameters:
+                snapshot ( DashboardSnapshot ):
+                    The snapshot that was published
+
+        """
+        with self._lock:
+            old = self._snapshot
+            if old is not None and old.version >= snapshot.version:
+                return
+            self._snapshot = snapshot
+            if old is None or not self._clients:
+                return
+            messages = [encode_event(event, data, snapshot.version) for event, data in snapshot_diff(old, snapshot)]
+            if not messages:
+                return
+            for client in list(self._clients):
+                try:
+                    for message in messages:
+                        client.put_nowait(message)
+                except queue.Full:
+                    logger.warning('Closing an event stream that fell behind')
+                    self._clients.discard(client)
+                    self._close(client)
+
+    def subscribe(self, snapshot) -> queue.Queue:
+        """Function to open a connection, whose queue starts with the whole state of the snapshot, or of a newer snapshot if the broadcaster has already seen one. The encoded state is reused by every connection until the snapshot changes
+
+            Parameters:
+                snapshot ( DashboardSnapshot ):
+                    The current snapshot
+
+            Returns:
+                client ( Queue ):
+                    The queue the events of the connection are put on
+
+        """
+        client = queue.Queue(self.queue_size)
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version < snapshot.version:
+                self._snapshot = snapshot
+            snapshot = self._snapshot
+            if self._state is None or self._state[0] != snapshot.version:
+                self._state = (snapshot.version, encode_event('snapshot', snapshot_state(snapshot), snapshot.version))
+            client.put_nowait(self._state[1])
+            self._clients.add(client)
+        return client
+
+    def unsubscribe(self, client: queue.Queue) -> None:
+        """Function to close a connection"""
+        with self._lock:
+            self._clients.discard(client)
+
+    def stream(self, snapshot):
+        """Function that yields the events of a new connection until the browser disconnects
+
+            Parameters:
+                snapshot ( DashboardSnapshot ):
+                    The current snapshot, which is sent first
+
+            Returns:
+                messages ( generator ):
+                    The encoded events
+
+        """
+        client = self.subscribe(snapshot)
+        try:
+            yield b'retry: 5000\n\n'
+            while True:
+                try:
+                    message = client.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield b': keep-alive\n\n'
+                    continue
+                if message is self.CLOSE:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(client)
+
+    def close_all(self) -> None:
+        """Function to close every connection, for example when the program stops"""
+        with self._lock:
+            clients = list(self._clients)
+            self._clients.clear()
+        for client in clients:
+            self._close(client)
+
+    def _close(self, client: queue.Queue) -> None:
+        """Function to tell a connection to close, making space on its queue if it is full"""
+        while True:
+            try:
+                client.put_nowait(self.CLOSE)
+                return
+            except queue.Full:
+                try:
+                    client.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+broadcaster = Broadcaster()
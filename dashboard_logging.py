@@ -0,0 +1,134 @@
+"""A module that sets up the logging of the program. Log records are put on a queue and a background thread formats them and writes them to a rotating file, so a request never waits for the disk
+
+    Attributes
+    ----------
+    request_id ( ContextVar ):
+        The id of the web request that is being handled, added to every record that is logged while handling it.
+    job_id ( ContextVar ):
+        The id of the scheduler job that is running, added to every record that is logged while it runs.
+
+    Classes
+    -------
+    ContextFilter:
+        A filter that adds the request id and job id to every record.
+    JsonFormatter:
+        A formatter that turns a record into one line of JSON.
+    DeferredQueueHandler:
+        A queue handler that leaves the formatting of the message to the background thread.
+
+    Methods
+    -------
+    configure_logging(settings):
+        Function to set up the queue, the background thread, the rotating file and the level of every module
+    stop_logging():
+        Function to write the records that are still on the queue and stop the background thread
+
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import time
+from contextvars import ContextVar
+
+request_id = ContextVar('request_id', default=None)
+job_id = ContextVar('job_id', default=None)
+
+TEXT_FORMAT = '%(levelname)s: %(asctime)s %(name)s %(message)s'
+
+_listener = None
+
+
+class ContextFilter(logging.Filter):
+    """A filter that adds the request id and job id of the thread that logged a record to the record. It has to run on that thread, so it is added to the queue handler"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        record.job_id = job_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """A formatter that turns a record into one line of JSON with the time, level, logger, message and the request or job id"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + '.%03dZ' % record.msecs,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        if getattr(record, 'job_id', None):
+            entry['job_id'] = record.job_id
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """A queue handler that only copies the record, so the message is formatted on the background thread instead of the thread that logged it. A traceback is turned into text straight away, because it cant be kept until later"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(settings: dict = None) -> logging.handlers.QueueListener:
+    """Function to set up the logging of the program from the "logging" field of the config file
+
+        Parameters:
+            settings ( dictionary ):
+                "file" is the name of the log file, "level" is the level of the root logger, "levels" is a dictionary with a logger name as the key and its level as the value, "format" is "json" or "text", "max_bytes" is the size a log file can grow to before it is rotated, "backup_count" is the number of rotated files that are kept, and "async" states if the records are written on a background thread
+
+        Returns:
+            listener ( QueueListener ):
+                The listener that writes the records, or None if they are written on the thread that logged them
+
+    """
+    global _listener
+    settings = settings or {}
+    stop_logging()
+    file_handler = logging.handlers.RotatingFileHandler(settings.get('file', 'pysys.log'), maxBytes=settings.get('max_bytes', 5_000_000),
+        backupCount=settings.get('backup_count', 3), encoding='utf-8', delay=True)
+    if settings.get('format', 'json') == 'json':
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.setLevel(settings.get('level', 'INFO'))
+    for name, level in settings.get('levels', {}).items():
+        logging.getLogger(name).setLevel(level)
+    if settings.get('async', True):
+        handler = DeferredQueueHandler(queue.SimpleQueue())
+        _listener = logging.handlers.QueueListener(handler.queue, file_handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        handler = file_handler
+    handler.addFilter(ContextFilter())
+    root.addHandler(handler)
+    return _listener
+
+
+def stop_logging() -> None:
+    """Function to write the records that are still on the queue and stop the background thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
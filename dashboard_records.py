@@ -0,0 +1,155 @@
+"""A module with the compact records the dashboard keeps for every news article and scheduled update. They use __slots__ so a record has no dictionary of its own, and they can be read like the dictionaries they replace, so templates that use article['title'] still work
+
+    Classes
+    -------
+    Article:
+        A news article with only the fields the dashboard uses.
+    Update:
+        A scheduled update, whose toast text is made from its flags.
+
+    Methods
+    -------
+    intern(value):
+        Function to return the interned copy of a string, so a string that many records repeat is only kept once
+
+"""
+import sys
+
+
+def intern(value):
+    """Function to return the interned copy of a string, so every record with the same string shares it. It is only used for fields with few different values, like times, because interning a string that is almost always unique only grows the table of interned strings. Anything that isnt a string is returned as it is
+
+        Parameters:
+            value ( str ):
+                The string to intern
+
+        Returns:
+            value ( str ):
+                The interned string
+
+    """
+    return sys.intern(value) if type(value) is str else value
+
+
+class Article:
+    """A news article with only the fields the dashboard uses
+
+        Attributes
+        ----------
+        title ( str ):
+            The headline of the article
+        content ( str ):
+            The start of the text of the article
+        url ( str ):
+            The link to the article, or None if it has none
+        published_at ( str ):
+            The time the article was published, in the ISO 8601 format
+        source ( str ):
+            The name of the site that published the article, or None if it isnt known
+
+    """
+    __slots__ = ('title', 'content', 'url', 'published_at', 'source')
+    FIELDS = {'title': 'title', 'content': 'content', 'url': 'url', 'publishedAt': 'published_at', 'source': 'source'}
+
+    def __init__(self, title: str, content: str = None, url: str = None, published_at: str = None, source: str = None) -> None:
+        self.title = title
+        self.content = content
+        self.url = url
+        self.published_at = intern(published_at)
+        self.source = intern(source)
+
+    @classmethod
+    def from_dict(cls, entry: dict) -> 'Article':
+        """Function to make an article from a dictionary from the news api, where the source is an object with a name, or from the dictionary returned by as_dict(), where it is just the name"""
+        source = entry.get('source')
+        if isinstance(source, dict):
+            source = source.get('name')
+        return cls(entry.get('title'), entry.get('content'), entry.get('url'), entry.get('publishedAt'), source)
+
+    def as_dict(self) -> dict:
+        """Function to return the article as a dictionary with the field names of the news api"""
+        return {key: getattr(self, field) for key, field in self.FIELDS.items()}
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, self.FIELDS[key])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        """Function to return a field by the name the news api uses, or the default if the article doesnt have it"""
+        value = getattr(self, self.FIELDS[key], None) if key in self.FIELDS else None
+        return default if value is None else value
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Article):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self) -> str:
+        return 'Article(title=%r, url=%r)' % (self.title, self.url)
+
+
+class Update:
+    """A scheduled update that is shown as a toast
+
+        Attributes
+        ----------
+        title ( str ):
+            The name of the update
+        at ( str ):
+            The time of the update in the HH:MM format
+        covid ( bool ):
+            True if the update refreshes the covid data
+        news ( bool ):
+            True if the update refreshes the news
+        repeat ( bool ):
+            True if the update repeats every 24 hours
+
+    """
+    __slots__ = ('title', 'at', 'covid', 'news', 'repeat')
+    FIELDS = ('title', 'at', 'covid', 'news', 'repeat')
+    WHAT = {(True, True): 'covid and news', (True, False): 'covid', (False, True): 'news', (False, False): 'nothing'}
+
+    def __init__(self, title: str, at: str, covid: bool = False, news: bool = False, repeat: bool = False) -> None:
+        self.title = title
+        self.at = intern(at)
+        self.covid = bool(covid)
+        self.news = bool(news)
+        self.repeat = bool(repeat)
+
+    @property
+    def content(self) -> str:
+        """The text of the toast, for example 'REPEATING: Updating covid and news at 09:00'"""
+        return ('REPEATING: ' if self.repeat else '') + 'Updating ' + self.WHAT[self.covid, self.news] + ' at ' + self.at
+
+    @classmethod
+    def from_dict(cls, entry: dict) -> 'Update':
+        """Function to make an update from the dictionary returned by as_dict()"""
+        return cls(entry['title'], entry['at'], entry.get('covid'), entry.get('news'), entry.get('repeat'))
+
+    def as_dict(self) -> dict:
+        """Function to return the update as a dictionary"""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __getitem__(self, key: str):
+        if key == 'content':
+            return self.content
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        """Function to return a field, or the default if the update doesnt have it"""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Update):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self) -> str:
+        return 'Update(title=%r, at=%r)' % (self.title, self.at)
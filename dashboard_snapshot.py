@@ -0,0 +1,138 @@
+"""A module that holds the current state of the dashboard as one immutable snapshot. Updates build a new snapshot and publish it with a single reference swap, so a page that is being rendered never sees half updated values
+
+    Attributes
+    ----------
+    NO_METRICS ( tuple ):
+        The metrics that are shown before the first covid update has finished.
+
+    Classes
+    -------
+    DashboardSnapshot:
+        An immutable snapshot of the metrics, articles, updates and location, with the arguments for the template already built.
+
+    Methods
+    -------
+    get_snapshot():
+        Function to return the current snapshot
+    publish(**changes):
+        Function to build a new snapshot with some of the fields changed and make it the current snapshot
+    add_listener(listener):
+        Function to add a function that is called with every snapshot that is published
+
+"""
+import threading
+import time
+from types import MappingProxyType
+from typing import NamedTuple
+
+NO_METRICS = ('', '', '', '', '', '')
+
+
+class DashboardSnapshot(NamedTuple):
+    """An immutable snapshot of everything the dashboard shows
+
+        Attributes
+        ----------
+        version ( int ):
+            A number that goes up by one every time a snapshot is published
+        published_at ( float ):
+            The time the snapshot was published, in seconds since the epoch
+        metrics ( tuple ):
+            The local number of cases, hospital cases and deaths, followed by the national number of cases, hospital cases and deaths
+        articles ( tuple ):
+            The news articles that are shown
+        updates ( tuple ):
+            The scheduled updates that are shown as toasts
+        location ( str ):
+            The name of the local area
+        nation_location ( str ):
+            The name of the nation
+        trends ( tuple ):
+            The small charts of the history, as (title, points) pairs where points is the points attribute of an SVG polyline
+        render_arguments ( mappingproxy ):
+            The arguments for render_template, built once when the snapshot is published
+
+    """
+    version: int = 0
+    published_at: float = 0.0
+    metrics: tuple = NO_METRICS
+    articles: tuple = ()
+    updates: tuple = ()
+    location: str = ''
+    nation_location: str = 'England'
+    trends: tuple = ()
+    render_arguments: MappingProxyType = MappingProxyType({})
+
+
+def _build_render_arguments(snapshot: DashboardSnapshot) -> MappingProxyType:
+    """Function to build the arguments for render_template from a snapshot"""
+    metrics = snapshot.metrics
+    return MappingProxyType({
+        'title': 'Covid Title',
+        'news_articles': snapshot.articles,
+        'notification': 'news_dictionary',
+        'location': snapshot.location,
+        'updates': snapshot.updates,
+        'nation_location': snapshot.nation_location,
+        'trends': snapshot.trends,
+        'national_7day_infections': metrics[3],
+        'hospital_cases': 'Hospital cases: ' + str(metrics[4]),
+        'deaths_total': 'Total deaths: ' + str(metrics[5]),
+        'local_7day_infections': metrics[0],
+        'image': 'Coronavirus_Covid-19.png',
+        'favicon': 'static/images/coronavirus-5107715_1280.png',
+    })
+
+
+_publish_lock = threading.Lock()
+_listeners = []
+_current = DashboardSnapshot()
+_current = _current._replace(render_arguments=_build_render_arguments(_current))
+
+
+def get_snapshot() -> DashboardSnapshot:
+    """Function to return the current snapshot. This never blocks, because the snapshot is never changed once it is published
+
+        Returns:
+            snapshot ( DashboardSnapshot ):
+                The snapshot that was published last
+
+    """
+    return _current
+
+
+def publish(**changes) -> DashboardSnapshot:
+    """Function to build a new snapshot with some of the fields changed and make it the current snapshot
+
+        Parameters:
+            **changes:
+                The fields to change, for example metrics=(...) or articles=(...). Lists are turned into tuples
+
+        Returns:
+            snapshot ( DashboardSnapshot ):
+                The snapshot that was published
+
+    """
+    global _current
+    for field in ('metrics', 'articles', 'updates', 'trends'):
+        if field in changes:
+            changes[field] = tuple(changes[field])
+    with _publish_lock:
+        snapshot = _current._replace(version=_current.version + 1, published_at=time.time(), **changes)
+        snapshot = snapshot._replace(render_arguments=_build_render_arguments(snapshot))
+        _current = snapshot
+    for listener in _listeners:
+        listener(snapshot)
+    return snapshot
+
+
+def add_listener(listener) -> None:
+    """Function to add a function that is called with every snapshot that is published, for example to share it with other workers
+
+        Parameters:
+            listener ( function ):
+                The function, which is called with the snapshot after it has become the current snapshot
+
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
@@ -0,0 +1,252 @@
+"""A module with timing histograms and counters for the hot paths of the dashboard, which are shown in the Prometheus text format at /metrics. When it is turned off every call returns straight away, so leaving the timers in the code costs almost nothing
+
+    Attributes
+    ----------
+    DEFAULT_BUCKETS ( tuple ):
+        The upper bounds in seconds of the buckets of every histogram.
+    enabled ( bool ):
+        True if timings and counts are recorded. It is set from the "instrumentation" field of the config file.
+
+    Classes
+    -------
+    Timer:
+        A context manager that records how long the code inside it took in a histogram.
+
+    Methods
+    -------
+    observe(name, seconds, **labels):
+        Function to record a time in a histogram
+    increment(name, amount=1, **labels):
+        Function to add to a counter
+    timer(name, **labels):
+        Function to return a Timer for a histogram
+    describe(name, kind, help_text):
+        Function to set the type and help text of a metric
+    add_collector(collector):
+        Function to add a function that returns extra samples every time the metrics are shown
+    record_job_lag(job, lag):
+        Function that records how late a scheduler job started, for Scheduler.on_job_start
+    render_prometheus():
+        Function to return every metric in the Prometheus text format
+    reset():
+        Function to forget every recorded time and count
+
+"""
+import threading
+import time
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+enabled = False
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_descriptions = {}
+_collectors = []
+
+
+class Timer:
+    """A context manager that records how long the code inside it took in a histogram
+
+        Attributes
+        ----------
+        name ( str ):
+            The name of the histogram
+        labels ( dictionary ):
+            The labels of the histogram
+
+    """
+    __slots__ = ('name', 'labels', '_start')
+
+    def __init__(self, name: str, labels: dict) -> None:
+        self.name = name
+        self.labels = labels
+        self._start = None
+
+    def __enter__(self) -> 'Timer':
+        if enabled:
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        if self._start is not None:
+            observe(self.name, time.perf_counter() - self._start, **self.labels)
+            self._start = None
+        return False
+
+
+def _label_key(labels: dict) -> tuple:
+    """Function to turn the labels into a key that is the same whatever order they were passed in"""
+    return tuple(sorted(labels.items()))
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    """Function to record a time in a histogram
+
+        Parameters:
+            name ( str ):
+                The name of the histogram, for example 'dashboard_render_seconds'
+            seconds ( float ):
+                The time to record
+            **labels:
+                The labels of the histogram, for example api='covid'
+
+    """
+    if not enabled:
+        return
+    key = (name, _label_key(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * len(DEFAULT_BUCKETS), 0.0, 0]
+        bucket = bisect_left(DEFAULT_BUCKETS, seconds)
+        if bucket < len(DEFAULT_BUCKETS):
+            histogram[0][bucket] += 1
+        histogram[1] += seconds
+        histogram[2] += 1
+
+
+def increment(name: str, amount: float = 1, **labels) -> None:
+    """Function to add to a counter
+
+        Parameters:
+            name ( str ):
+                The name of the counter, for example 'dashboard_page_cache_total'
+            amount ( float ):
+                The amount to add
+            **labels:
+                The labels of the counter, for example result='hit'
+
+    """
+    if not enabled:
+        return
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def timer(name: str, **labels) -> Timer:
+    """Function to return a Timer that records how long the code inside a with statement took
+
+        Parameters:
+            name ( str ):
+                The name of the histogram
+            **labels:
+                The labels of the histogram
+
+        Returns:
+            timer ( Timer ):
+                The context manager
+
+    """
+    return Timer(name, labels)
+
+
+def describe(name: str, kind: str, help_text: str) -> None:
+    """Function to set the type and help text of a metric, which are shown above its samples
+
+        Parameters:
+            name ( str ):
+                The name of the metric
+            kind ( str ):
+                The Prometheus type of the metric, histogram, counter or gauge
+            help_text ( str ):
+                What the metric measures
+
+    """
+    _descriptions[name] = (kind, help_text)
+
+
+def add_collector(collector) -> None:
+    """Function to add a function that returns extra samples every time the metrics are shown, for numbers that are already counted somewhere else like the hits of the api cache
+
+        Parameters:
+            collector ( function ):
+                A function that returns a list of (name, labels, value) samples
+
+    """
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+def record_job_lag(job, lag: float) -> None:
+    """Function that records how late a scheduler job started, so it can be set as Scheduler.on_job_start
+
+        Parameters:
+            job ( Job ):
+                The job that started
+            lag ( float ):
+                The number of seconds between the time the job was due and the time it started
+
+    """
+    observe('dashboard_scheduler_lag_seconds', max(lag, 0.0), action=getattr(job.action, '__name__', 'job'))
+
+
+def _format_labels(labels: tuple) -> str:
+    """Function to format labels like {api="covid",le="0.5"}"""
+    if not labels:
+        return ''
+    return '{' + ','.join('%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for key, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    """Function to format a sample value"""
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus() -> str:
+    """Function to return every metric in the Prometheus text format
+
+        Returns:
+            text ( str ):
+                The histograms, counters and the samples of the collectors
+
+    """
+    with _lock:
+        histograms = {key: (list(value[0]), value[1], value[2]) for key, value in _histograms.items()}
+        counters = dict(_counters)
+    samples = {}
+    for (name, labels), value in counters.items():
+        samples.setdefault(name, []).append((name, labels, value))
+    for collector in _collectors:
+        for name, labels, value in collector():
+            samples.setdefault(name, []).append((name, _label_key(labels), value))
+    for (name, labels), (buckets, total, count) in histograms.items():
+        lines = samples.setdefault(name, [])
+        cumulative = 0
+        for bound, bucket_count in zip(DEFAULT_BUCKETS, buckets):
+            cumulative += bucket_count
+            lines.append((name + '_bucket', labels + (('le', repr(bound)), ), cumulative))
+        lines.append((name + '_bucket', labels + (('le', '+Inf'), ), count))
+        lines.append((name + '_sum', labels, total))
+        lines.append((name + '_count', labels, count))
+    output = []
+    for name in sorted(samples):
+        if name in _descriptions:
+            kind, help_text = _descriptions[name]
+            output.append('# HELP %s %s' % (name, help_text))
+            output.append('# TYPE %s %s' % (name, kind))
+        for sample_name, labels, value in samples[name]:
+            output.append('%s%s %s' % (sample_name, _format_labels(labels), _format_value(value)))
+    return '\n'.join(output) + '\n'
+
+
+def reset() -> None:
+    """Function to forget every recorded time and count"""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+describe('dashboard_upstream_request_seconds', 'histogram', 'Time taken by requests to the covid and news apis')
+describe('dashboard_upstream_errors_total', 'counter', 'Failed requests to the covid api')
+describe('dashboard_csv_parse_seconds', 'histogram', 'Time taken to read a covid CSV file')
+describe('dashboard_csv_process_seconds', 'histogram', 'Time taken to work out the headline figures from covid data')
+describe('dashboard_scheduler_lag_seconds', 'histogram', 'Time between when a scheduled job was due and when it started')
+describe('dashboard_render_seconds', 'histogram', 'Time taken to render the dashboard template')
+describe('dashboard_page_cache_total', 'counter', 'Requests for the dashboard page by whether the rendered page was reused')
+describe('dashboard_api_cache_total', 'counter', 'Requests through the api cache by result')
+describe('dashboard_api_cache_entries', 'gauge', 'Number of responses held in the api cache')
+describe('dashboard_event_clients', 'gauge', 'Number of open /events streams')
+describe('dashboard_update_runs_total', 'counter', 'Scheduled covid and news updates by whether they ran or were skipped because the data was fresh')
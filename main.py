@@ -10,92 +10,246 @@ The main module used to run the program
         An instance of the flask application that can be @ with the route of the url.
 
 
+    startup : StartupTimer
+        The timer of the start up phases. Heavy modules like requests and uk_covid19 are only imported when the first request is made, and the first update runs on a background thread.
+    startup_report : dict
+        The milliseconds every start up phase took, which is also written to the log.
+
+
     Methods
     -------
-    home() -> render_template()
-        The main flask function used to run the backend of the web server by filling in the variables in the html
+    warm_up() -> None
+        Requests the latest covid data and news on a background thread after the cached data has been loaded
+    start_warm_up() -> None
+        Starts the warm up when this worker is elected leader of the data plane, so with several workers only the leader requests data and runs the scheduler
+    render_page( snapshot ) -> tuple
+        Renders the template for a snapshot, or returns the page that was already rendered for that snapshot version
+    home() -> Response
+        The main flask function used to run the backend of the web server by filling in the html with the current dashboard snapshot
+    api_cache_samples() -> list
+        Returns the counts of the api cache for the /metrics endpoint
+    updater_samples() -> list
+        Returns how many scheduled updates ran or were skipped for the /metrics endpoint
+    start_request() -> None
+        Gives every request an id that is added to everything it logs
+    finish_request( response ) -> Response
+        Sends the id of the request back in the X-Request-ID header
+    metrics() -> Response
+        Shows the timing histograms and counters of the hot paths in the Prometheus text format at /metrics
+    events() -> Response
+        Streams the changes to the dashboard as server-sent events at /events
 """
 
-import json
-import logging
-import pylint.lint
-from flask import Flask, render_template, request
-from time_handling import hhmm_to_seconds, current_time_hhmm
-from covid_data_handler import schedule_covid_updates, get_covid_data_list, update_covid, update_updates, get_updates, remove_from_update, get_s
-from covid_news_handling import update_news, remove_from_articles, get_articles
+import time
+from startup_timer import StartupTimer
+startup = StartupTimer()
 
+import gzip
+import hashlib
+import logging
+import threading
+import uuid
+with startup.phase( 'import flask' ):
+    from flask import Flask, Response, make_response, render_template, request
+with startup.phase( 'import dashboard modules' ):
+    from covid_data_handler import covid_updater, news_updater, get_s, load_cached_covid_data, open_journal, reload_area_stores, restore_schedules, restore_updates, suspend_schedules
+    from covid_news_handling import news_session, removed, restore_articles
+    from dashboard_snapshot import add_listener, get_snapshot, publish
+    from state_backend import data_plane, make_backend
+    import instrumentation
+    from request_cache import api_cache
+    from dashboard_api import api
+    from dashboard_logging import configure_logging, request_id
+    from dashboard_config import get_config
+    from dashboard_events import broadcaster
 
-FORMAT =  '%(levelname)s: %(asctime)s %(message)s'
-logging.basicConfig( filename='pysys.log',level=logging.DEBUG,format=FORMAT )
+logger = logging.getLogger( __name__ )
 
 pylint_opts = ['--disable=line-too-long', 'covid_news_handling.py']
-#pylint.lint.Run( pylint_opts )
+# pylint is only imported when it is run, so it doesnt slow down the start up
+#import pylint.lint; pylint.lint.Run( pylint_opts )
 
 app = Flask( __name__ )
+app.register_blueprint( api )
+
+_rendered_page = None
+
+with startup.phase( 'read config' ):
+    config_data = get_config()
+with startup.phase( 'configure logging' ):
+    configure_logging( config_data.get( 'logging', {} ) )
+api_cache.configure( config_data.get( 'cache_ttl', 300 ), config_data.get( 'cache_max_entries', 128 ) )
+get_s().max_workers = config_data.get( 'scheduler_workers', 2 )
+removed.ttl = config_data.get( 'dismissed_ttl_days', 30 ) * 86400
+removed.max_entries = config_data.get( 'dismissed_max_entries', 10000 )
+news_session.configure( timeout=config_data.get( 'news_timeout', [ 3.05, 10 ] ), retries=config_data.get( 'news_retries', 2 ),
+    backoff=config_data.get( 'news_backoff', 0.5 ), pool_size=config_data.get( 'news_pool_size', 4 ) )
+publish( location=config_data['area_name'] )
+data_plane.backend = make_backend( config_data )
+data_plane.poll_interval = config_data.get( 'state_poll_interval', 0.5 )
+data_plane.lease_seconds = config_data.get( 'leader_lease_seconds', 15 )
+add_listener( data_plane.share_snapshot )
+add_listener( broadcaster.publish_snapshot )
+broadcaster.queue_size = config_data.get( 'event_queue_size', 64 )
+broadcaster.heartbeat = config_data.get( 'event_heartbeat_seconds', 15 )
+instrumentation.enabled = config_data.get( 'instrumentation', True )
+get_s().on_job_start = instrumentation.record_job_lag
+open_journal( config_data.get( 'schedule_journal', 'schedules.journal' ), config_data.get( 'journal_fsync', True ) )
+for updater in ( covid_updater, news_updater ):
+    updater.window = config_data.get( 'coalesce_window_seconds', 60 )
+covid_updater.fresh_for = config_data.get( 'covid_fresh_seconds', 3600 )
+news_updater.fresh_for = config_data.get( 'news_fresh_seconds', 300 )
+
+def api_cache_samples() -> list:
+    """Returns the hits, misses and coalesced requests of the api cache as samples for the /metrics endpoint"""
+    stats = api_cache.stats()
+    return [ ( 'dashboard_api_cache_total', { 'result': result }, stats[result] ) for result in ( 'hits', 'misses', 'coalesced' ) ] + \
+        [ ( 'dashboard_api_cache_entries', {}, stats['entries'] ) ]
+
+instrumentation.add_collector( api_cache_samples )
+
+def updater_samples() -> list:
+    """Returns how many scheduled covid and news updates ran and how many were coalesced with another run, as samples for the /metrics endpoint"""
+    return [ ( 'dashboard_update_runs_total', { 'action': updater.__name__, 'result': 'ran' }, updater.runs ) for updater in ( covid_updater, news_updater ) ] + \
+        [ ( 'dashboard_update_runs_total', { 'action': updater.__name__, 'result': 'skipped' }, updater.skipped ) for updater in ( covid_updater, news_updater ) ]
+
+instrumentation.add_collector( updater_samples )
+
+def event_samples() -> list:
+    """Returns the number of open /events streams as a sample for the /metrics endpoint"""
+    return [ ( 'dashboard_event_clients', {}, len( broadcaster ) ) ]
+
+instrumentation.add_collector( event_samples )
+
+def warm_up() -> None:
+    """Requests the latest covid data and news on a background thread, so the web server can start serving the cached data straight away"""
+    warm_up_start = time.perf_counter()
+    try:
+        covid_updater()
+    except BaseException:
+        logger.exception( 'The first covid update failed' )
+    startup.record( 'warm up covid', time.perf_counter() - warm_up_start )
+    news_start = time.perf_counter()
+    try:
+        news_updater()
+    except BaseException:
+        logger.exception( 'The first news update failed' )
+    startup.record( 'warm up news', time.perf_counter() - news_start )
+    logger.info( 'Warm up finished %s ms after the start', round( startup.elapsed() * 1000, 3 ) )
+
+def start_warm_up() -> None:
+    """Starts the warm up when this worker becomes the leader, so only one worker requests the data however many workers there are"""
+    threading.Thread( target=warm_up, name='warm-up', daemon=True ).start()
 
-update_covid()
-update_news()
+with startup.phase( 'load cached covid data' ):
+    load_cached_covid_data()
+data_plane.on_leader.append( restore_articles )
+data_plane.on_leader.append( restore_updates )
+data_plane.on_leader.append( restore_schedules )
+data_plane.on_leader.append( start_warm_up )
+data_plane.on_follower.append( suspend_schedules )
+data_plane.on_sync.append( reload_area_stores )
+with startup.phase( 'join data plane' ):
+    data_plane.start()
+startup_report = startup.report( config_data.get( 'startup_budget_ms', 1000 ) )
+
+def render_page( snapshot ) -> tuple:
+    """Renders the template for a snapshot, or returns the page that was already rendered for that snapshot version
+
+    Parameters:
+        snapshot ( DashboardSnapshot ): The snapshot to render
+
+    Returns:
+        rendered_page ( tuple ): The snapshot version, the page as bytes, the gzipped page, which is None when gzip is turned off, and the ETag, which is a hash of the page so every worker gives the same page the same ETag
+    """
+    global _rendered_page
+    rendered_page = _rendered_page
+    if rendered_page is None or rendered_page[0] != snapshot.version:
+        instrumentation.increment( 'dashboard_page_cache_total', result='miss' )
+        logger.info( 'Starting the render of the template for snapshot %s', snapshot.version )
+        with instrumentation.timer( 'dashboard_render_seconds' ):
+            body = render_template( "index.html", **snapshot.render_arguments ).encode( 'utf-8' )
+        gzip_body = None
+        if get_config().get( 'gzip_pages', True ):
+            gzip_body = gzip.compress( body, compresslevel=6 )
+        rendered_page = ( snapshot.version, body, gzip_body, hashlib.sha1( body ).hexdigest()[:20] )
+        _rendered_page = rendered_page
+    else:
+        instrumentation.increment( 'dashboard_page_cache_total', result='hit' )
+    return rendered_page
+
+@app.before_request
+def start_request() -> None:
+    """Gives every request an id, or uses the X-Request-ID header, so every line it logs can be found together"""
+    request_id.set( request.headers.get( 'X-Request-ID' ) or uuid.uuid4().hex[:16] )
+
+@app.after_request
+def finish_request( response: Response ) -> Response:
+    """Sends the id of the request back in the X-Request-ID header"""
+    response.headers['X-Request-ID'] = request_id.get()
+    return response
 
 @app.route( "/" )
 @app.route( "/index" )
 def home() -> str:
     """The main flask function used to run the backend of the web server by filling in the variables in the html
 
+    The page is only rendered again when the snapshot version changes, and clients that send the ETag of the current page get a 304 response. There is no Last-Modified header, because it only has a resolution of one second and two snapshots can be published in the same second.
+
     Returns: 
-        Render template( Function ): A function that renders the template to the web server, which take a number of arguments.
+        response ( Response ): The rendered page, which is gzipped if the client accepts it, or a 304 response if the client already has it.
     """
-    logging.info( "Refreshing the webpage backend" )
-    main_s = get_s()
-    main_s.run( blocking=False )
-    logging.info( "Scheduler set to run with blocking=False" )
-    covid_data = get_covid_data_list()
-    national_number_of_cases = covid_data[3]
-    national_current_number_of_hospital = covid_data[4]
-    national_cummulative_number_of_deaths = covid_data[5]
-    local_number_of_cases = covid_data[0]
     notif = request.args.get( "notif" )
-    logging.info('notif value: ' + str(notif))
     update_at = request.args.get( "update" )
-    logging.info('update at value: ' + str(update_at))
     update_covid_tick = request.args.get( "covid-data" )
-    logging.info('Update tick value ' + str(update_covid_tick))
     update_news_tick = request.args.get( "news" )
-    logging.info('Update news tick value: ' + str(update_news_tick))
     repeat = request.args.get( "repeat" )
-    logging.info('Repeat value '+ str(repeat))
     update_name = request.args.get( "two" )
-    logging.info('Update name value '+ str(update_name))
+    logger.debug( 'Refreshing the webpage backend with notif=%s update=%s covid-data=%s news=%s repeat=%s two=%s',
+        notif, update_at, update_covid_tick, update_news_tick, repeat, update_name )
     if update_name is not None and update_at is not None:
-        update_updates( update_name, update_at, update_covid_tick, update_news_tick, repeat )
-        time = (hhmm_to_seconds( update_at ) - hhmm_to_seconds( current_time_hhmm() ))
-        if time <= 0:
-            time = 86400 - abs( time )
-        logging.info('seconds until update ' + str(time))
-        schedule_covid_updates( time, update_name, repeat, update_covid_tick, update_news_tick )
+        data_plane.submit( 'schedule_update', update_name=update_name, update_at=update_at, update_covid_tick=update_covid_tick, update_news_tick=update_news_tick, repeat=repeat )
     update_item = request.args.get( "update_item" )
     if update_item is not None:
-        remove_from_update( update_item )
-    articles = get_articles()
+        data_plane.submit( 'remove_update', what_to_remove=update_item )
     if notif is not None:
-        remove_from_articles( notif )
-    update_list = get_updates()
-    with open( "config.json", 'r', encoding='cp1252' ) as json_data_file:
-        data = json.load( json_data_file )
-        location_thing = data["area_name"]
-    logging.info('Starting the render of the template')
-    return render_template( "index.html", title='Covid Title',
-     news_articles = articles,
-      notification = 'news_dictionary',
-      location = location_thing,
-      updates = update_list,
-      nation_location = 'England',
-      national_7day_infections = national_number_of_cases,
-      hospital_cases = 'Hospital cases: '+ str(national_current_number_of_hospital),
-      deaths_total = 'Total deaths: ' + str(national_cummulative_number_of_deaths),
-      local_7day_infections = local_number_of_cases,
-      image = 'Coronavirus_Covid-19.png',
-      favicon = 'static/images/coronavirus-5107715_1280.png'
-      )
+        data_plane.submit( 'remove_article', what_to_remove=notif )
+    snapshot = get_snapshot()
+    _, body, gzip_body, etag = render_page( snapshot )
+    if gzip_body is not None and 'gzip' in request.accept_encodings:
+        response = make_response( gzip_body )
+        response.headers['Content-Encoding'] = 'gzip'
+        etag += '-gzip'
+    else:
+        response = make_response( body )
+    response.headers['Content-Type'] = 'text/html; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add( 'Accept-Encoding' )
+    response.set_etag( etag )
+    return response.make_conditional( request )
+
+@app.route( "/metrics" )
+def metrics() -> Response:
+    """Shows the timing histograms and counters in the Prometheus text format, or a 404 response if instrumentation is turned off in the config file
+
+    Returns:
+        response ( Response ): The metrics as plain text
+    """
+    if not instrumentation.enabled:
+        return Response( 'Instrumentation is turned off\n', status=404, mimetype='text/plain' )
+    return Response( instrumentation.render_prometheus(), mimetype='text/plain; version=0.0.4' )
+
+@app.route( "/events" )
+def events() -> Response:
+    """Streams the changes to the dashboard as server-sent events. The first event has the whole state and every event after it only has what changed, so an open dashboard never has to reload the page
+
+    Returns:
+        response ( Response ): The event stream, which stays open until the browser disconnects
+    """
+    response = Response( broadcaster.stream( get_snapshot() ), mimetype='text/event-stream' )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 if __name__ == "__main__":
     app.run()
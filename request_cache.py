@@ -0,0 +1,161 @@
+"""A module that caches the responses of the upstream apis, so identical requests that happen close together only reach the api once
+
+    Attributes
+    ----------
+    api_cache ( RequestCache ):
+        The cache that is shared by the covid and news api requests.
+
+    Classes
+    -------
+    RequestCache:
+        A cache with a time to live, least recently used eviction and single flight coalescing of identical requests.
+
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """A request that is in progress, which other threads asking for the same key can wait for"""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCache:
+    """A cache with a time to live, least recently used eviction and single flight coalescing of identical requests
+
+        Attributes
+        ----------
+        ttl ( float ):
+            The number of seconds an entry stays fresh
+        max_entries ( int ):
+            The largest number of entries, the least recently used entry is removed when there are more
+        hits ( int ):
+            The number of requests that were answered from the cache
+        misses ( int ):
+            The number of requests that had to call the api
+        coalesced ( int ):
+            The number of requests that waited for an identical request that was already in progress
+
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 128, clock=time.monotonic) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def configure(self, ttl: float = None, max_entries: int = None) -> None:
+        """Function to change the time to live and the size of the cache
+
+            Parameters:
+                ttl ( float ):
+                    The number of seconds an entry stays fresh, a ttl of 0 turns the cache off but keeps the coalescing
+                max_entries ( int ):
+                    The largest number of entries
+
+        """
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if max_entries is not None:
+                self.max_entries = max_entries
+                self._evict()
+
+    def get_or_call(self, key, function, *args, **kwargs):
+        """Function to return the cached result for a key, or call the function to get it. If the same key is already being requested the call waits for that request instead of calling the function again
+
+            Parameters:
+                key ( tuple ):
+                    The normalised request, which has to be hashable
+                function ( function ):
+                    The function that requests the data from the api
+                *args, **kwargs:
+                    The arguments that are passed to the function
+
+            Returns:
+                result:
+                    The result of the function. The same object is given to every caller, so it shouldnt be changed
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.misses += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = function(*args, **kwargs)
+        except BaseException as error:
+            # the covid api functions call sys.exit() when they cant connect, which must not be cached as a result either
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                if flight.error is None and self.ttl > 0:
+                    self._entries[key] = (self._clock() + self.ttl, flight.result)
+                    self._entries.move_to_end(key)
+                    self._evict()
+            flight.done.set()
+        logger.debug('Cached the response for %s', key)
+        return flight.result
+
+    def invalidate(self, key=None) -> None:
+        """Function to remove one key, or every key if no key is given, from the cache
+
+            Parameters:
+                key ( tuple ):
+                    The key to remove, or None to clear the whole cache
+
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        """Function to return the counters of the cache
+
+            Returns:
+                stats ( dictionary ):
+                    A dictionary with the hits, misses, coalesced requests and the number of entries
+
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'coalesced': self.coalesced, 'entries': len(self._entries)}
+
+    def _evict(self) -> None:
+        """Function to remove the least recently used entries until the cache is small enough, the lock must be held"""
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+api_cache = RequestCache()
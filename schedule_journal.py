@@ -0,0 +1,167 @@
+"""A module with an append only journal of the scheduled updates, so the updates a user scheduled survive a restart or a crash
+
+    Every change is one line of JSON appended to the journal file. Replaying the file gives the updates that are still active, and the file is compacted to just those updates once most of its lines are out of date.
+
+    Classes
+    -------
+    ScheduleJournal:
+        The journal of the scheduled updates.
+
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleJournal:
+    """The journal of the scheduled updates
+
+        Attributes
+        ----------
+        file_name ( str ):
+            The name of the journal file
+        fsync ( bool ):
+            If True every change is flushed to the disk before the function returns, so it survives a crash of the machine
+        compact_after ( int ):
+            The smallest number of out of date lines before the journal is compacted
+
+    """
+
+    def __init__(self, file_name: str, fsync: bool = True, compact_after: int = 1000) -> None:
+        self.file_name = file_name
+        self.fsync = fsync
+        self.compact_after = compact_after
+        self._active = {}
+        self._lines = 0
+        self._lock = threading.Lock()
+        self._file = None
+
+    def replay(self) -> dict:
+        """Function to read the journal file and return the updates that are still active. Lines that cant be read, like a line that was half written when the program crashed, are skipped
+
+            Returns:
+                active ( dictionary ):
+                    A dictionary with the name of every active update as the key and its entry as the value, in the order they were scheduled. An entry has the name, the time in the HH:MM format, the covid, news and repeat flags, the time it is first due and the last time it ran, in seconds since the epoch
+
+        """
+        active = {}
+        lines = 0
+        try:
+            with open(self.file_name, 'r', encoding='utf-8') as journal_file:
+                for line in journal_file:
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                        operation = entry['op']
+                        if operation == 'add':
+                            active[entry['name']] = entry
+                        elif operation == 'remove':
+                            active.pop(entry['name'], None)
+                        elif operation == 'ran' and entry['name'] in active:
+                            active[entry['name']]['ran'] = entry['at']
+                    except (ValueError, KeyError, TypeError):
+                        logger.warning('Skipped line %s of the schedule journal because it cant be read', lines)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._active = active
+            self._lines = lines
+        return {name: dict(entry) for name, entry in active.items()}
+
+    def record_add(self, update_name: str, update_at: str, covid: bool, news: bool, repeat: bool, due: float) -> None:
+        """Function to record that an update was scheduled
+
+            Parameters:
+                update_name ( str ):
+                    The name of the update
+                update_at ( str ):
+                    The time of the update in the HH:MM format
+                covid ( bool ):
+                    True if the update refreshes the covid data
+                news ( bool ):
+                    True if the update refreshes the news
+                repeat ( bool ):
+                    True if the update repeats every 24 hours
+                due ( float ):
+                    The time the update is first due, in seconds since the epoch
+
+        """
+        self._append({'op': 'add', 'name': update_name, 'at': update_at, 'covid': bool(covid), 'news': bool(news), 'repeat': bool(repeat), 'due': due})
+
+    def record_remove(self, update_name: str) -> None:
+        """Function to record that an update was cancelled or has finished
+
+            Parameters:
+                update_name ( str ):
+                    The name of the update
+
+        """
+        with self._lock:
+            if update_name not in self._active:
+                return
+        self._append({'op': 'remove', 'name': update_name})
+
+    def record_ran(self, update_name: str, ran_at: float = None) -> None:
+        """Function to record that a repeating update ran, so a run that is missed while the program is stopped can be found
+
+            Parameters:
+                update_name ( str ):
+                    The name of the update
+                ran_at ( float ):
+                    The time it ran in seconds since the epoch, by default now
+
+        """
+        self._append({'op': 'ran', 'name': update_name, 'at': time.time() if ran_at is None else ran_at})
+
+    def compact(self) -> None:
+        """Function to rewrite the journal with one line for every active update. The new file replaces the old one in one step, so a crash never leaves a half written journal"""
+        with self._lock:
+            self._close()
+            temp_file_name = self.file_name + '.tmp'
+            with open(temp_file_name, 'w', encoding='utf-8') as journal_file:
+                for entry in self._active.values():
+                    journal_file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+                journal_file.flush()
+                if self.fsync:
+                    os.fsync(journal_file.fileno())
+            os.replace(temp_file_name, self.file_name)
+            self._lines = len(self._active)
+        logger.info('Compacted the schedule journal to %s updates', self._lines)
+
+    def close(self) -> None:
+        """Function to close the journal file"""
+        with self._lock:
+            self._close()
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    def _append(self, entry: dict) -> None:
+        """Function to append one entry to the journal and compact it if most of its lines are out of date"""
+        with self._lock:
+            if entry['op'] == 'add':
+                self._active[entry['name']] = entry
+            elif entry['op'] == 'remove':
+                self._active.pop(entry['name'], None)
+            elif entry['name'] in self._active:
+                self._active[entry['name']]['ran'] = entry['at']
+            if self._file is None:
+                self._file = open(self.file_name, 'a', encoding='utf-8')
+            self._file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._lines += 1
+            out_of_date = self._lines - len(self._active)
+        if out_of_date > max(self.compact_after, len(self._active)):
+            self.compact()
+
+    def _close(self) -> None:
+        """Function to close the journal file, the lock must be held"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,352 @@
+"""A module with the scheduler engine that runs the scheduled updates on a background thread, so that updates happen on time even if nobody loads the page
+
+    Classes
+    -------
+    Job:
+        An event in the scheduler, with the time it is due, the function it runs and how often it repeats.
+    Scheduler:
+        A scheduler with a min-heap of jobs, a background thread that waits for the next job and a pool of worker threads that run the jobs.
+    CoalescedAction:
+        A wrapper for the action of a job that skips the run if the same action already ran within a window or its data is still fresh.
+
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dashboard_logging import job_id
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """An event in the scheduler
+
+        Attributes
+        ----------
+        run_at ( float ):
+            The time the job is next due, in seconds since the epoch
+        priority ( int ):
+            Jobs that are due at the same time run in order of priority, lowest first
+        action ( function ):
+            The function the job runs
+        argument ( tuple ):
+            The arguments that are passed to the function
+        name ( str ):
+            The name of the update the job belongs to, used to cancel every job of an update at once
+        repeat_every ( float ):
+            The number of seconds between runs, or None if the job only runs once
+        cancelled ( bool ):
+            True once the job has been cancelled
+        finished ( bool ):
+            True once a job that only runs once has been handed to a worker thread
+
+    """
+
+    def __init__(self, run_at: float, priority: int, sequence: int, action, argument: tuple = (), name: str = None, repeat_every: float = None) -> None:
+        self.run_at = run_at
+        self.priority = priority
+        self.sequence = sequence
+        self.action = action
+        self.argument = argument
+        self.name = name
+        self.repeat_every = repeat_every
+        self.cancelled = False
+        self.finished = False
+
+    def __lt__(self, other: 'Job') -> bool:
+        return (self.run_at, self.priority, self.sequence) < (other.run_at, other.priority, other.sequence)
+
+    def __repr__(self) -> str:
+        return 'Job(name=%r, run_at=%r, action=%s)' % (self.name, self.run_at, getattr(self.action, '__name__', self.action))
+
+
+class Scheduler:
+    """A scheduler with a min-heap of jobs, a background thread that waits for the next job and a pool of worker threads that run the jobs
+
+        Attributes
+        ----------
+        max_workers ( int ):
+            The number of worker threads that run the jobs
+        on_job_start ( function ):
+            An optional function that is called with the job and the number of seconds it started late
+
+    """
+
+    def __init__(self, max_workers: int = 2, clock=time.time) -> None:
+        self.max_workers = max_workers
+        self.on_job_start = None
+        self._clock = clock
+        self._heap = []
+        self._names = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._stopped = False
+
+    def enter(self, delay: float, priority: int, action, argument: tuple = (), name: str = None, repeat_every: float = None) -> Job:
+        """Function to add a job that is due after a delay
+
+            Parameters:
+                delay ( float ):
+                    The number of seconds until the job is due
+                priority ( int ):
+                    Jobs that are due at the same time run in order of priority, lowest first
+                action ( function ):
+                    The function the job runs
+                argument ( tuple ):
+                    The arguments that are passed to the function
+                name ( str ):
+                    The name of the update the job belongs to
+                repeat_every ( float ):
+                    The number of seconds between runs, for example 86400 for a daily job, or None to only run once
+
+            Returns:
+                job ( Job ):
+                    The job that was added, which can be passed to cancel()
+
+        """
+        return self.enterabs(self._clock() + delay, priority, action, argument, name, repeat_every)
+
+    def enterabs(self, run_at: float, priority: int, action, argument: tuple = (), name: str = None, repeat_every: float = None) -> Job:
+        """Function to add a job that is due at a time in seconds since the epoch, see enter() for the parameters"""
+        with self._condition:
+            job = Job(run_at, priority, next(self._sequence), action, argument, name, repeat_every)
+            heapq.heappush(self._heap, job)
+            if name is not None:
+                self._names.setdefault(name, set()).add(job)
+            self._start()
+            self._condition.notify()
+        return job
+
+    def enter_many(self, entries) -> list:
+        """Function to add many jobs in one step, which is much faster than calling enterabs() for every job when thousands of jobs are restored at start up
+
+            Parameters:
+                entries ( iterable ):
+                    Tuples of (run_at, priority, action, argument, name, repeat_every), see enter() for what they mean
+
+            Returns:
+                jobs ( list ):
+                    The jobs that were added, in the same order as the entries
+
+        """
+        with self._condition:
+            jobs = [Job(run_at, priority, next(self._sequence), action, argument, name, repeat_every)
+                for run_at, priority, action, argument, name, repeat_every in entries]
+            self._heap.extend(jobs)
+            heapq.heapify(self._heap)
+            for job in jobs:
+                if job.name is not None:
+                    self._names.setdefault(job.name, set()).add(job)
+            if jobs:
+                self._start()
+                self._condition.notify()
+        return jobs
+
+    def cancel(self, job: Job) -> bool:
+        """Function to cancel a job, so it wont run again
+
+            Parameters:
+                job ( Job ):
+                    The job to cancel
+
+            Returns:
+                cancelled ( bool ):
+                    False if the job had already been cancelled or finished
+
+        """
+        with self._condition:
+            if job.cancelled or job.finished:
+                return False
+            job.cancelled = True
+            self._forget_name(job)
+            self._condition.notify()
+        return True
+
+    def cancel_name(self, name: str) -> int:
+        """Function to cancel every job of an update
+
+            Parameters:
+                name ( str ):
+                    The name of the update
+
+            Returns:
+                count ( int ):
+                    The number of jobs that were cancelled
+
+        """
+        with self._condition:
+            jobs = self._names.pop(name, set())
+            for job in jobs:
+                job.cancelled = True
+            self._condition.notify()
+        return len(jobs)
+
+    def cancel_all(self) -> int:
+        """Function to cancel every job that is waiting to run, for example when this worker stops being the leader. Jobs that are already running are left to finish
+
+            Returns:
+                count ( int ):
+                    The number of jobs that were cancelled
+
+        """
+        with self._condition:
+            jobs = [job for job in self._heap if not job.cancelled]
+            for job in jobs:
+                job.cancelled = True
+            self._names.clear()
+            self._condition.notify()
+        return len(jobs)
+
+    @property
+    def queue(self) -> list:
+        """A list of the jobs that are waiting to run, in the order they will run"""
+        with self._condition:
+            return sorted(job for job in self._heap if not job.cancelled)
+
+    def empty(self) -> bool:
+        """Function to check if there are no jobs waiting to run"""
+        return not self.queue
+
+    def run(self, blocking: bool = True) -> None:
+        """Function kept so code written for sched still works. The jobs already run on the background thread, so this only starts it"""
+        with self._condition:
+            self._start()
+
+    def stop(self, wait: bool = True) -> None:
+        """Function to stop the background thread and the worker threads
+
+            Parameters:
+                wait ( bool ):
+                    If True, wait for the jobs that are running to finish
+
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+            thread = self._thread
+            executor = self._executor
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _start(self) -> None:
+        """Function to start the background thread the first time it is needed, the condition must be held"""
+        if self._thread is None and not self._stopped:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scheduler-worker')
+            self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def _forget_name(self, job: Job) -> None:
+        """Function to remove a job from the names dictionary, the condition must be held"""
+        if job.name in self._names:
+            self._names[job.name].discard(job)
+            if not self._names[job.name]:
+                del self._names[job.name]
+
+    def _loop(self) -> None:
+        """Function that runs on the background thread and hands every job to the worker threads when it is due"""
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    while self._heap and self._heap[0].cancelled:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    delay = self._heap[0].run_at - self._clock()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                if self._stopped:
+                    return
+                job = heapq.heappop(self._heap)
+                scheduled_at = job.run_at
+                if job.repeat_every:
+                    now = self._clock()
+                    while job.run_at <= now:
+                        job.run_at += job.repeat_every
+                    job.sequence = next(self._sequence)
+                    heapq.heappush(self._heap, job)
+                else:
+                    job.finished = True
+                    self._forget_name(job)
+            self._executor.submit(self._execute, job, scheduled_at)
+
+    def _execute(self, job: Job, scheduled_at: float) -> None:
+        """Function that runs a job on a worker thread"""
+        token = job_id.set('%s-%s' % (job.name or getattr(job.action, '__name__', 'job'), job.sequence))
+        try:
+            lag = self._clock() - scheduled_at
+            logger.debug('Running %r %.3f seconds after it was due', job, lag)
+            if self.on_job_start is not None:
+                self.on_job_start(job, lag)
+            job.action(*job.argument)
+        except BaseException:
+            # a job that calls sys.exit() would otherwise end up unlogged on the Future of its worker
+            logger.exception('The scheduled job %r failed', job)
+        finally:
+            job_id.reset(token)
+
+
+class CoalescedAction:
+    """A wrapper for the action of a job, so many jobs of the same kind share one run. A run is skipped if the action started less than window seconds ago or finished less than fresh_for seconds ago. Runs never overlap, so a job that is due while another run is going waits for it and is then skipped
+
+        Attributes
+        ----------
+        action ( function ):
+            The function that is run. A run that returns False has failed, so it doesnt count as fresh data
+        window ( float ):
+            The number of seconds after a run starts in which other runs are skipped
+        fresh_for ( float ):
+            The number of seconds after a run finishes in which the data is still fresh
+        runs ( int ):
+            The number of times the action ran
+        skipped ( int ):
+            The number of runs that were skipped
+
+    """
+
+    def __init__(self, action, window: float = 60.0, fresh_for: float = 0.0, clock=time.time) -> None:
+        self.action = action
+        self.__name__ = getattr(action, '__name__', 'job')
+        self.window = window
+        self.fresh_for = fresh_for
+        self.runs = 0
+        self.skipped = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_started = None
+        self._last_finished = None
+
+    def is_fresh(self) -> bool:
+        """Function to check if a run now would be skipped"""
+        if self._last_started is None:
+            return False
+        now = self._clock()
+        return now - self._last_started < self.window or now - self._last_finished < self.fresh_for
+
+    def __call__(self, *argument) -> bool:
+        """Function that runs the action unless it is coalesced with a run that just happened
+
+            Returns:
+                ran ( bool ):
+                    True if the action ran and didnt fail
+        """
+        with self._lock:
+            if self.is_fresh():
+                self.skipped += 1
+                logger.info('Skipped %s because it ran %.1f seconds ago', self.__name__, self._clock() - self._last_started)
+                return False
+            started = self._clock()
+            if self.action(*argument) is False:
+                return False
+            self._last_started = started
+            self._last_finished = self._clock()
+            self.runs += 1
+        return True
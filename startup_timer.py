@@ -0,0 +1,85 @@
+"""A module that times the phases of starting the program, so the time it takes a worker to boot is measured and can be kept within a budget
+
+    Classes
+    -------
+    StartupTimer:
+        A timer that records how long every named phase of the start up took.
+
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """A timer that records how long every named phase of the start up took
+
+        Attributes
+        ----------
+        started_at ( float ):
+            The time.perf_counter() value when the timer was made, which should be as early as possible
+        phases ( list ):
+            A list of (name, seconds) pairs in the order the phases finished
+
+    """
+
+    def __init__(self, started_at: float = None) -> None:
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.phases = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Context manager that records how long the code inside it took
+
+            Parameters:
+                name ( str ):
+                    The name of the phase, for example 'import flask'
+
+        """
+        phase_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - phase_start)
+
+    def record(self, name: str, seconds: float) -> None:
+        """Function to record a phase that was timed somewhere else, for example on a background thread
+
+            Parameters:
+                name ( str ):
+                    The name of the phase
+                seconds ( float ):
+                    How long the phase took
+
+        """
+        with self._lock:
+            self.phases.append((name, seconds))
+
+    def elapsed(self) -> float:
+        """Function to return the number of seconds since the timer was made"""
+        return time.perf_counter() - self.started_at
+
+    def report(self, budget_ms: float = None) -> dict:
+        """Function to log the time every phase took and the total, with a warning if the total is over the budget
+
+            Parameters:
+                budget_ms ( float ):
+                    The number of milliseconds the start up should take, or None to not check it
+
+            Returns:
+                report ( dictionary ):
+                    A dictionary with the milliseconds every phase took and the total under 'total'
+
+        """
+        with self._lock:
+            report = {name: round(seconds * 1000, 3) for name, seconds in self.phases}
+        report['total'] = round(self.elapsed() * 1000, 3)
+        for name, milliseconds in report.items():
+            logger.info('Start up phase %s took %s ms', name, milliseconds)
+        if budget_ms is not None and report['total'] > budget_ms:
+            logger.warning('Start up took %s ms, which is over the budget of %s ms', report['total'], budget_ms)
+        return report
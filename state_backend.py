@@ -0,0 +1,396 @@
+"""A module that lets several worker processes share one dashboard. One worker is elected leader and runs the updates and the scheduler, every other worker reads the state the leader publishes and sends its changes to the leader as commands
+
+    Attributes
+    ----------
+    SHARED_FIELDS ( tuple ):
+        The fields of the dashboard snapshot that are shared between workers.
+    RECORD_FIELDS ( tuple ):
+        The shared fields that hold Article and Update records, which are shared as dictionaries.
+    data_plane ( DataPlane ):
+        The data plane used by the program. It starts with a MemoryBackend, which is right for a single worker.
+
+    Classes
+    -------
+    StateBackend:
+        The interface every state backend has.
+    MemoryBackend:
+        A backend that keeps the state in the memory of one process.
+    SQLiteBackend:
+        A backend that keeps the state in a SQLite database in WAL mode, so many processes can share it.
+    DataPlane:
+        Elects the leader, sends commands to it and keeps the local dashboard snapshot in step with the shared state.
+
+    Methods
+    -------
+    make_backend(config_data):
+        Function to make the state backend that the config file asks for
+
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dashboard_records import Article, Update
+from dashboard_snapshot import get_snapshot, publish
+
+logger = logging.getLogger(__name__)
+
+SHARED_FIELDS = ('metrics', 'articles', 'updates', 'location', 'nation_location', 'trends')
+RECORD_FIELDS = ('articles', 'updates')
+
+
+class StateBackend:
+    """The interface every state backend has"""
+
+    def write_state(self, state: dict) -> int:
+        """Function to replace the shared state and return its new version"""
+        raise NotImplementedError
+
+    def read_version(self) -> int:
+        """Function to return the version of the shared state, which should be cheap because followers call it often"""
+        raise NotImplementedError
+
+    def read_state(self) -> tuple:
+        """Function to return the version and the shared state as a dictionary"""
+        raise NotImplementedError
+
+    def acquire_leadership(self, owner: str, lease_seconds: float) -> bool:
+        """Function to become the leader, or renew the lease if owner already is the leader. Returns True if owner is the leader"""
+        raise NotImplementedError
+
+    def release_leadership(self, owner: str) -> None:
+        """Function to give up the leadership so another worker can take it straight away"""
+        raise NotImplementedError
+
+    def push_command(self, kind: str, arguments: dict) -> None:
+        """Function to send a command to the leader"""
+        raise NotImplementedError
+
+    def pop_commands(self) -> list:
+        """Function to take every waiting command, as a list of (kind, arguments) pairs in the order they were sent"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Function to close any connection the backend holds"""
+
+
+class MemoryBackend(StateBackend):
+    """A backend that keeps the state in the memory of one process, for when there is only one worker"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._version = 0
+        self._state = {}
+        self._leader = None
+        self._lease_expires = 0.0
+        self._commands = []
+
+    def write_state(self, state: dict) -> int:
+        with self._lock:
+            self._version += 1
+            self._state = dict(state)
+            return self._version
+
+    def read_version(self) -> int:
+        return self._version
+
+    def read_state(self) -> tuple:
+        with self._lock:
+            return self._version, dict(self._state)
+
+    def acquire_leadership(self, owner: str, lease_seconds: float) -> bool:
+        with self._lock:
+            now = time.time()
+            if self._leader in (None, owner) or self._lease_expires <= now:
+                self._leader = owner
+                self._lease_expires = now + lease_seconds
+            return self._leader == owner
+
+    def release_leadership(self, owner: str) -> None:
+        with self._lock:
+            if self._leader == owner:
+                self._leader = None
+
+    def push_command(self, kind: str, arguments: dict) -> None:
+        with self._lock:
+            self._commands.append((kind, dict(arguments)))
+
+    def pop_commands(self) -> list:
+        with self._lock:
+            commands, self._commands = self._commands, []
+            return commands
+
+
+class SQLiteBackend(StateBackend):
+    """A backend that keeps the state in a SQLite database in WAL mode, so the workers on one machine can share it without blocking each other's reads
+
+        Attributes
+        ----------
+        database ( str ):
+            The file name of the SQLite database
+
+    """
+
+    def __init__(self, database: str) -> None:
+        self.database = database
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(database, timeout=10, isolation_level=None, check_same_thread=False)
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS state (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL, payload TEXT NOT NULL)')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS leader (id INTEGER PRIMARY KEY CHECK (id = 1), owner TEXT NOT NULL, expires_at REAL NOT NULL)')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS commands (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT NOT NULL)')
+
+    def write_state(self, state: dict) -> int:
+        payload = json.dumps(state, separators=(',', ':'))
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._connection.execute('SELECT version FROM state WHERE id = 1').fetchone()
+                version = (row[0] if row else 0) + 1
+                self._connection.execute('INSERT OR REPLACE INTO state (id, version, payload) VALUES (1, ?, ?)', (version, payload))
+                self._connection.execute('COMMIT')
+            except sqlite3.Error:
+                self._connection.execute('ROLLBACK')
+                raise
+        return version
+
+    def read_version(self) -> int:
+        with self._lock:
+            row = self._connection.execute('SELECT version FROM state WHERE id = 1').fetchone()
+        return row[0] if row else 0
+
+    def read_state(self) -> tuple:
+        with self._lock:
+            row = self._connection.execute('SELECT version, payload FROM state WHERE id = 1').fetchone()
+        if row is None:
+            return 0, {}
+        return row[0], json.loads(row[1])
+
+    def acquire_leadership(self, owner: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._connection.execute('SELECT owner, expires_at FROM leader WHERE id = 1').fetchone()
+                is_leader = row is None or row[0] == owner or row[1] <= now
+                if is_leader:
+                    self._connection.execute('INSERT OR REPLACE INTO leader (id, owner, expires_at) VALUES (1, ?, ?)', (owner, now + lease_seconds))
+                self._connection.execute('COMMIT')
+            except sqlite3.Error:
+                self._connection.execute('ROLLBACK')
+                raise
+        return is_leader
+
+    def release_leadership(self, owner: str) -> None:
+        with self._lock:
+            self._connection.execute('DELETE FROM leader WHERE id = 1 AND owner = ?', (owner, ))
+
+    def push_command(self, kind: str, arguments: dict) -> None:
+        with self._lock:
+            self._connection.execute('INSERT INTO commands (kind, payload) VALUES (?, ?)', (kind, json.dumps(arguments)))
+
+    def pop_commands(self) -> list:
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                rows = self._connection.execute('SELECT id, kind, payload FROM commands ORDER BY id').fetchall()
+                if rows:
+                    self._connection.execute('DELETE FROM commands WHERE id <= ?', (rows[-1][0], ))
+                self._connection.execute('COMMIT')
+            except sqlite3.Error:
+                self._connection.execute('ROLLBACK')
+                raise
+        return [(kind, json.loads(payload)) for _, kind, payload in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class DataPlane:
+    """Elects the leader, sends commands to it and keeps the local dashboard snapshot in step with the shared state
+
+        Attributes
+        ----------
+        backend ( StateBackend ):
+            The backend the state is shared through
+        owner ( str ):
+            The name of this worker, made from the host name and process id
+        is_leader ( bool ):
+            True while this worker is the leader
+        poll_interval ( float ):
+            The number of seconds between checks of the shared state
+        lease_seconds ( float ):
+            The number of seconds the leadership lasts without being renewed
+        on_leader ( list ):
+            Functions that are called when this worker becomes the leader, for example to start the first update
+        on_follower ( list ):
+            Functions that are called when this worker loses the leadership, for example to stop the scheduled updates so two workers never run them
+        on_sync ( list ):
+            Functions that are called after this worker has published a newer shared state written by the leader, for example to read the data the leader saved to disk
+
+    """
+
+    def __init__(self, backend: StateBackend, poll_interval: float = 0.5, lease_seconds: float = 15, owner: str = None) -> None:
+        self.backend = backend
+        self.owner = owner or '%s-%s' % (socket.gethostname(), os.getpid())
+        self.is_leader = False
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.on_leader = []
+        self.on_follower = []
+        self.on_sync = []
+        self._handlers = {}
+        self._synced_version = 0
+        self._shared_version = 0
+        self._share_lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def register(self, kind: str, function) -> None:
+        """Function to register the function that runs a kind of command on the leader
+
+            Parameters:
+                kind ( str ):
+                    The name of the command, for example 'remove_article'
+                function ( function ):
+                    The function that is called with the arguments of the command as keyword arguments
+
+        """
+        self._handlers[kind] = function
+
+    def submit(self, kind: str, **arguments) -> None:
+        """Function to run a command that changes the dashboard. The leader runs it straight away, other workers send it to the leader. A data plane that hasnt been started is the only worker, so it runs the command straight away too
+
+            Parameters:
+                kind ( str ):
+                    The name of the command
+                **arguments:
+                    The arguments of the command, which must be JSON serializable
+
+        """
+        if self.is_leader or self._thread is None:
+            self._handlers[kind](**arguments)
+        else:
+            self.backend.push_command(kind, arguments)
+            logger.info('Sent the command %s to the leader', kind)
+
+    def share_snapshot(self, snapshot) -> None:
+        """Function that is called whenever a snapshot is published. The leader writes it to the backend so the other workers can read it. Listeners run after the snapshot is published, so two updates that publish at the same time can call this out of order, and a snapshot older than the last one written is skipped so it never replaces a newer one
+
+            Parameters:
+                snapshot ( DashboardSnapshot ):
+                    The snapshot that was published
+
+        """
+        if not self.is_leader:
+            return
+        with self._share_lock:
+            if snapshot.version <= self._shared_version:
+                return
+            state = {field: getattr(snapshot, field) for field in SHARED_FIELDS}
+            for field in RECORD_FIELDS:
+                state[field] = [record.as_dict() if hasattr(record, 'as_dict') else record for record in state[field]]
+            self._synced_version = self.backend.write_state(state)
+            self._shared_version = snapshot.version
+
+    def start(self) -> None:
+        """Function to run the first election and start the background thread that renews the lease, runs commands and reads the shared state"""
+        self.tick()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='data-plane', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Function to stop the background thread and give up the leadership"""
+        self._stopped.set()
+        if self.is_leader:
+            self.backend.release_leadership(self.owner)
+            self.is_leader = False
+
+    def tick(self) -> None:
+        """Function that renews or tries to take the leadership, then runs the waiting commands if this worker is the leader or reads the shared state if it isnt"""
+        was_leader = self.is_leader
+        self.is_leader = self.backend.acquire_leadership(self.owner, self.lease_seconds)
+        if self.is_leader and not was_leader:
+            logger.info('%s is now the leader', self.owner)
+            if not self.sync():
+                self.share_snapshot(get_snapshot())
+            self._run_callbacks(self.on_leader, 'after becoming the leader')
+        elif was_leader and not self.is_leader:
+            logger.warning('%s lost the leadership', self.owner)
+            self._run_callbacks(self.on_follower, 'after losing the leadership')
+        if self.is_leader:
+            for kind, arguments in self.backend.pop_commands():
+                try:
+                    self._handlers[kind](**arguments)
+                except Exception:
+                    logger.exception('The command %s failed', kind)
+        else:
+            self.sync()
+
+    def sync(self) -> bool:
+        """Function to publish the shared state locally if it is newer than the last state this worker saw
+
+            Returns:
+                changed ( bool ):
+                    True if a newer state was published
+
+        """
+        if self.backend.read_version() <= self._synced_version:
+            return False
+        version, state = self.backend.read_state()
+        changes = {field: state[field] for field in SHARED_FIELDS if field in state}
+        if 'articles' in changes:
+            changes['articles'] = [Article.from_dict(entry) for entry in changes['articles']]
+        if 'updates' in changes:
+            changes['updates'] = [Update.from_dict(entry) if 'at' in entry else entry for entry in changes['updates']]
+        if changes:
+            publish(**changes)
+        self._synced_version = version
+        self._run_callbacks(self.on_sync, 'after reading the shared state')
+        return True
+
+    @staticmethod
+    def _run_callbacks(callbacks: list, when: str) -> None:
+        """Function to call every callback in a list, logging the error of a callback that fails so the callbacks after it and the data plane keep running"""
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception('Could not run %s %s', getattr(callback, '__name__', callback), when)
+
+    def _loop(self) -> None:
+        """Function that runs on the background thread. An error never stops the thread, because a worker that stopped renewing its lease while it still thinks it is the leader would run the scheduled updates alongside the new leader"""
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                self.tick()
+            except sqlite3.Error:
+                logger.exception('Could not reach the state backend')
+            except Exception:
+                logger.exception('The data plane tick failed')
+
+
+def make_backend(config_data: dict) -> StateBackend:
+    """Function to make the state backend that the config file asks for
+
+        Parameters:
+            config_data ( dictionary ):
+                The contents of the config file. "state_backend" is "memory" or "sqlite", and "state_database" is the file name of the SQLite database
+
+        Returns:
+            backend ( StateBackend ):
+                The state backend
+
+    """
+    if config_data.get('state_backend', 'memory') == 'sqlite':
+        return SQLiteBackend(config_data.get('state_database', 'dashboard_state.db'))
+    return MemoryBackend()
+
+
+data_plane = DataPlane(MemoryBackend())
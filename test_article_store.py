@@ -0,0 +1,69 @@
+import covid_news_handling
+from covid_news_handling import DismissedKeys
+from covid_news_handling import duplicate_key
+from covid_news_handling import get_articles
+from covid_news_handling import load_articles
+from covid_news_handling import remove_from_articles
+
+def make_article(title, url, source=None):
+    return {'title': title, 'content': 'content of ' + title, 'url': url, 'source': {'id': None, 'name': source}}
+
+def test_duplicate_stories_are_dropped():
+    articles = load_articles([
+        make_article('Covid cases rise in England - BBC News', 'https://bbc.example/1', 'BBC News'),
+        make_article('Covid cases rise in England | Sky News', 'https://sky.example/1', 'Sky News'),
+        make_article('Booster jabs open to over-40s', 'https://bbc.example/2'),
+        make_article('Booster jabs open to over-40s', 'https://bbc.example/2'),
+    ])
+    assert [article['url'] for article in articles] == ['https://bbc.example/1', 'https://bbc.example/2']
+    assert duplicate_key(articles[0]) == 'story:covid cases rise in england'
+
+def test_distinct_stories_are_kept():
+    titles = ['UK Covid cases - Scotland', 'UK Covid cases - Wales', 'Coronavirus live updates - 12 December',
+        'Coronavirus live updates - 13 December', 'Covid news - live', 'Covid news - live updates']
+    articles = load_articles([make_article(title, 'https://news.example/%d' % number, 'BBC News') for number, title in enumerate(titles)])
+    assert [article['title'] for article in articles] == titles
+    assert duplicate_key(make_article('UK Covid cases - Scotland', None, 'The Scotsman')) == 'story:uk covid cases scotland'
+
+def test_removed_articles_stay_removed():
+    covid_news_handling.removed.clear()
+    load_articles([make_article('Live updates - 12 December', 'https://bbc.example/one', 'BBC News'), make_article('Story two', 'https://bbc.example/two')])
+    remove_from_articles('Live updates - 12 December')
+    assert [article['title'] for article in get_articles()] == ['Story two']
+    assert len(covid_news_handling.removed) == 1
+    load_articles([make_article('Live updates - 12 December', 'https://bbc.example/one', 'BBC News'), make_article('Story two', 'https://bbc.example/two'),
+        make_article('Live updates - 13 December', 'https://bbc.example/three', 'BBC News')])
+    assert [article['title'] for article in get_articles()] == ['Story two', 'Live updates - 13 December']
+    remove_from_articles('Live updates - 13 December')
+    remove_from_articles('not an article')
+    assert len(get_articles()) == 1
+
+def test_dismissed_keys_expire_and_are_bounded():
+    now = [0.0]
+    dismissed = DismissedKeys(ttl=10, max_entries=2, clock=lambda: now[0])
+    dismissed.add('a')
+    dismissed.add('b')
+    dismissed.add('c')
+    assert 'a' not in dismissed
+    assert 'b' in dismissed and len(dismissed) == 2
+    now[0] = 11
+    assert 'c' not in dismissed
+    dismissed.expire()
+    assert len(dismissed) == 0
+
+def test_update_news_with_fake_api():
+    covid_news_handling.api_cache.invalidate()
+    original = covid_news_handling._news_api_request
+    covid_news_handling._news_api_request = lambda covid_terms: {'articles': [make_article('Fake story', 'https://fake.example/1')]}
+    try:
+        covid_news_handling.update_news()
+    finally:
+        covid_news_handling._news_api_request = original
+        covid_news_handling.api_cache.invalidate()
+    assert [article['title'] for article in get_articles()] == ['Fake story']
+
+test_duplicate_stories_are_dropped()
+test_distinct_stories_are_kept()
+test_removed_articles_stay_removed()
+test_dismissed_keys_expire_and_are_bounded()
+test_update_news_with_fake_api()
@@ -0,0 +1,36 @@
+from benchmark import bench_csv
+from benchmark import bench_records
+from benchmark import bench_scheduler
+from benchmark import compare_results
+from benchmark import time_function
+
+def test_time_function():
+    timing = time_function(lambda: sum(range(1000)), repeat=3)
+    assert timing['repeat'] == 3
+    assert timing['min_ms'] <= timing['median_ms']
+
+def test_bench_csv():
+    results = bench_csv((1_000, ), repeat=1)
+    assert results['parse_and_process']['1000']['repeat'] == 1
+    assert '1000' in results['convert_csv_to_dict']
+
+def test_bench_scheduler():
+    results = bench_scheduler(200)
+    assert results['jobs'] == 200
+    assert results['jobs_per_second'] > 0
+
+def test_bench_records():
+    results = bench_records((4000, ))
+    assert results['articles']['4000']['record_bytes_each'] * 2 < results['articles']['4000']['dict_bytes_each']
+    assert results['updates']['4000']['record_bytes_each'] * 1.5 < results['updates']['4000']['dict_bytes_each']
+
+def test_compare_results():
+    old = {'results': {'csv': {'parse_and_process': {'1000': {'median_ms': 10.0}}}, 'scheduler': {'run_ms': 5.0}}}
+    new = {'results': {'csv': {'parse_and_process': {'1000': {'median_ms': 15.0}}}, 'scheduler': {'run_ms': 5.5}}}
+    assert compare_results(old, new) == [('csv/parse_and_process/1000/median_ms', 10.0, 15.0)]
+
+test_time_function()
+test_bench_csv()
+test_bench_scheduler()
+test_bench_records()
+test_compare_results()
@@ -0,0 +1,57 @@
+import math
+from covid_analytics import analyse_area
+from covid_analytics import analyse_areas
+from covid_analytics import latest_figures
+from covid_analytics import rolling_sums
+from covid_analytics import series_matrix
+from covid_data_store import CovidDataStore
+
+def test_rolling_sum_matches_window_sum():
+    store = CovidDataStore.from_file('nation_2021-10-28.csv')
+    analytics = analyse_area(store)
+    newest = len(store) - 1
+    assert analytics.rolling_sum[newest - 2] == store.window_sum('newCasesBySpecimenDate', 2, 7) == 240_299
+    assert analytics.rolling_average[newest - 2] == 240_299 / 7
+    assert math.isnan(analytics.rolling_sum[newest])
+    assert math.isnan(analytics.rolling_sum[0])
+
+def test_rolling_sums_skip_windows_with_missing_values():
+    lines = ['E1,Area,ltla,2021-01-04,,,1', 'E1,Area,ltla,2021-01-03,,,1', 'E1,Area,ltla,2021-01-02,,,', 'E1,Area,ltla,2021-01-01,,,1']
+    matrix, lengths = series_matrix([CovidDataStore.from_lines(lines)], 'newCasesBySpecimenDate')
+    assert lengths == [4]
+    sums = rolling_sums(matrix, 2)[0]
+    assert [math.isnan(value) for value in sums] == [True, True, True, False]
+    assert sums[3] == 2
+
+def test_growth_and_rates():
+    store = CovidDataStore.from_file('nation_2021-10-28.csv')
+    analytics = analyse_area(store, population=100_000)
+    row = len(store) - 3
+    growth = analytics.rolling_sum[row] / analytics.rolling_sum[row - 7] - 1
+    assert math.isclose(analytics.week_on_week[row], growth)
+    assert math.isclose(analytics.doubling_time[row], 7 * math.log(2) / math.log(1 + growth))
+    assert analytics.per_100k[row] == 240_299
+
+def test_batch_uses_the_cache():
+    nation = CovidDataStore.from_file('nation_2021-10-28.csv')
+    short = CovidDataStore.from_file('nation_2021-10-28.csv')
+    short.values = {metric: values[:20] for metric, values in short.values.items()}
+    short.missing = {metric: missing[:20] for metric, missing in short.missing.items()}
+    short.dates = short.dates[:20]
+    first = analyse_areas({'nation': nation, 'short': short})
+    assert len(first['short'].rolling_sum) == 20
+    assert first['short'].rolling_sum[-3] == first['nation'].rolling_sum[-3]
+    second = analyse_areas({'nation': nation})
+    assert second['nation'] is first['nation']
+def test_latest_figures():
+    store = CovidDataStore.from_file('nation_2021-10-28.csv')
+    analytics = analyse_area(store)
+    figures = latest_figures(analytics)
+    assert figures['date'] == '2021-10-27' and figures['rolling_sum'] == analytics.rolling_sum[len(store) - 2] == 206_057
+    assert figures['per_100k'] is None and isinstance(figures['week_on_week'], float)
+
+test_rolling_sum_matches_window_sum()
+test_rolling_sums_skip_windows_with_missing_values()
+test_growth_and_rates()
+test_batch_uses_the_cache()
+test_latest_figures()
@@ -0,0 +1,187 @@
+from covid_data_handler import covid_api_stream
+from covid_data_handler import covid_api_request
+import requests
+from covid_data_handler import covid_api_delta
+import json
+import os
+import tempfile
+import covid_data_handler
+from covid_data_handler import load_area_series
+from covid_data_handler import refresh_area
+from covid_data_handler import save_area_series
+from covid_data_store import METRICS
+from covid_data_handler import fetch_area
+from covid_data_handler import fetch_areas
+from covid_data_handler import process_covid_api_csv_data
+
+class FakeCovidAPI:
+    """A local fake of the covid api that serves the lines of a CSV file and counts how many were read"""
+
+    def __init__(self, csv_filename):
+        with open(csv_filename, 'r', encoding='cp1252') as file:
+            self.lines = file.read().splitlines()
+        self.lines_read = 0
+        self.closed = False
+
+    def __call__(self, location, location_type):
+        try:
+            for line in self.lines:
+                self.lines_read += 1
+                yield line
+        finally:
+            self.closed = True
+
+def test_covid_api_stream_stops_early():
+    fake_api = FakeCovidAPI('nation_2021-10-28.csv')
+    store = covid_api_stream('areaName=England', 'areaType=nation', fetch_lines=fake_api)
+    assert fake_api.closed
+    assert fake_api.lines_read < len(fake_api.lines)
+    assert process_covid_api_csv_data(store, False) == (240_299, 7_019, 141_544)
+
+def test_covid_api_stream_stops_early_with_missing_columns():
+    fake_api = FakeCovidAPI('nation_2021-10-28.csv')
+    fields = [line.split(',') for line in fake_api.lines]
+    fake_api.lines = [fake_api.lines[0]] + [','.join(row[:2] + ['ltla'] + row[3:5] + [''] + row[6:]) for row in fields[1:]]
+    store = covid_api_stream('areaName=England', 'areaType=ltla', fetch_lines=fake_api)
+    assert fake_api.lines_read < 30
+    assert store.window_sum('newCasesBySpecimenDate', 2, 7) == 240_299
+    assert store.latest_value('cumDailyNsoDeathsByDeathDate') == 141_544
+    fake_api = FakeCovidAPI('nation_2021-10-28.csv')
+    fake_api.lines = [fake_api.lines[0]] + [','.join(row[:4] + [''] + row[5:]) for row in fields[1:]]
+    covid_api_stream('areaName=England', 'areaType=nation', fetch_lines=fake_api)
+    assert fake_api.lines_read < 100
+
+def test_covid_api_stream_full():
+    fake_api = FakeCovidAPI('nation_2021-10-28.csv')
+    store = covid_api_stream('areaName=England', 'areaType=nation', stop_early=False, fetch_lines=fake_api)
+    assert fake_api.lines_read == len(fake_api.lines)
+    assert len(store) == 638
+
+def test_covid_api_request_with_fake():
+    data = covid_api_request(fetch_lines=FakeCovidAPI('nation_2021-10-28.csv'))
+    assert isinstance(data, dict)
+    assert data['2021-10-28'][4] == '7019'
+
+def test_covid_api_delta():
+    full_series = covid_api_delta('areaName=England', 'areaType=nation', fetch_lines=FakeCovidAPI('nation_2021-10-28.csv'))
+    assert len(full_series) == 638
+    known_series = {key: value for key, value in full_series.items() if key < '2021-10-20'}
+    known_series['2021-10-15'] = ['E92000001', 'England', 'nation', '', '1', '1']
+    fake_api = FakeCovidAPI('nation_2021-10-28.csv')
+    merged_series = covid_api_delta('areaName=England', 'areaType=nation', known_series, 7, fake_api)
+    assert fake_api.closed
+    assert fake_api.lines_read < 20
+    assert merged_series == full_series
+
+def test_refresh_area_only_parses_and_saves_new_rows():
+    with tempfile.TemporaryDirectory() as directory:
+        series_file_name = os.path.join(directory, 'covid_series.json')
+        older_api = FakeCovidAPI('nation_2021-10-28.csv')
+        older_api.lines = older_api.lines[:1] + older_api.lines[11:]
+        refresh_area('areaName=England', 'areaType=nation', 7, older_api)
+        save_area_series(series_file_name)
+        size = os.path.getsize(series_file_name)
+        fake_api = FakeCovidAPI('nation_2021-10-28.csv')
+        store = refresh_area('areaName=England', 'areaType=nation', 7, fake_api)
+        save_area_series(series_file_name)
+        assert fake_api.lines_read < 25
+        assert os.path.getsize(series_file_name) - size < size / 10
+        full_store = covid_api_stream('areaName=England', 'areaType=nation', stop_early=False, fetch_lines=FakeCovidAPI('nation_2021-10-28.csv'))
+        assert list(store.dates) == list(full_store.dates)
+        for metric in METRICS:
+            assert list(store.values[metric]) == list(full_store.values[metric])
+            assert store.latest_value(metric) == full_store.latest_value(metric)
+        saved_series = dict(covid_data_handler.area_series)
+        covid_data_handler.area_series.clear()
+        covid_data_handler.series_stores.clear()
+        load_area_series(series_file_name)
+        assert covid_data_handler.area_series == saved_series
+        assert len(covid_data_handler.area_series['areaName=England;areaType=nation']) == 638
+
+def test_old_series_files_are_rewritten_before_appending():
+    with tempfile.TemporaryDirectory() as directory:
+        series_file_name = os.path.join(directory, 'covid_series.json')
+        covid_data_handler.area_series.clear()
+        covid_data_handler.series_stores.clear()
+        older_api = FakeCovidAPI('nation_2021-10-28.csv')
+        older_api.lines = older_api.lines[:1] + older_api.lines[11:]
+        old_series = {'areaName=England;areaType=nation': covid_api_delta('areaName=England', 'areaType=nation', fetch_lines=older_api)}
+        with open(series_file_name, 'w', encoding='utf-8') as series_file:
+            json.dump(old_series, series_file)
+        load_area_series(series_file_name)
+        refresh_area('areaName=England', 'areaType=nation', 7, FakeCovidAPI('nation_2021-10-28.csv'))
+        save_area_series(series_file_name)
+        saved_series = dict(covid_data_handler.area_series)
+        covid_data_handler.area_series.clear()
+        covid_data_handler.series_stores.clear()
+        load_area_series(series_file_name)
+        assert covid_data_handler.area_series == saved_series
+        assert len(saved_series['areaName=England;areaType=nation']) == 638
+        with open(series_file_name, 'a', encoding='utf-8') as series_file:
+            series_file.write('{"area":"half wri\n')
+        load_area_series(series_file_name)
+        save_area_series(series_file_name)
+        with open(series_file_name, encoding='utf-8') as series_file:
+            assert [json.loads(line)['area'] for line in series_file] == ['areaName=England;areaType=nation']
+
+class FlakyCovidAPI(FakeCovidAPI):
+    """A fake of the covid api that fails the first request for every area and always fails for areaName=Broken"""
+
+    def __init__(self, csv_filename):
+        super().__init__(csv_filename)
+        self.requests = []
+
+    def __call__(self, location, location_type):
+        self.requests.append(location)
+        if location == 'areaName=Broken' or self.requests.count(location) == 1:
+            raise requests.ConnectionError('fake connection error')
+        return super().__call__(location, location_type)
+
+def test_fetch_areas():
+    fake_api = FlakyCovidAPI('nation_2021-10-28.csv')
+    results = fetch_areas([('England', 'nation'), ('Exeter', 'ltla'), ('Broken', 'ltla')], max_workers=2, retries=1, incremental=False, fetch_lines=fake_api)
+    assert len(results) == 3
+    assert results[('Broken', 'ltla')] is None
+    assert fake_api.requests.count('areaName=Broken') == 2
+    assert results[('England', 'nation')].latest_value('hospitalCases') == 7_019
+    assert results[('Exeter', 'ltla')].date_at(0) == '2021-10-28'
+
+test_covid_api_stream_stops_early()
+test_covid_api_stream_stops_early_with_missing_columns()
+test_covid_api_stream_full()
+test_covid_api_request_with_fake()
+test_covid_api_delta()
+test_refresh_area_only_parses_and_saves_new_rows()
+test_old_series_files_are_rewritten_before_appending()
+def test_connection_errors_are_raised_and_retried():
+    class DroppedCovidAPI(FlakyCovidAPI):
+        def __call__(self, location, location_type):
+            self.requests.append(location)
+            yield 'areaCode,areaName,areaType,date,cumDailyNsoDeathsByDeathDate,hospitalCases,newCasesBySpecimenDate'
+            raise ConnectionError('connection dropped')
+    fake_api = DroppedCovidAPI('nation_2021-10-28.csv')
+    try:
+        covid_api_stream('areaName=England', 'areaType=nation', fetch_lines=fake_api)
+    except ConnectionError:
+        pass
+    else:
+        assert False
+    results = fetch_areas([('England', 'nation')], retries=1, incremental=False, fetch_lines=fake_api)
+    assert results[('England', 'nation')] is None
+    assert len(fake_api.requests) == 3
+
+def test_fetch_area_always_reaches_the_api():
+    fake_api = FlakyCovidAPI('nation_2021-10-28.csv')
+    fake_api.requests = ['areaName=England']
+    stream_lines = covid_data_handler.stream_covid_csv_lines
+    covid_data_handler.stream_covid_csv_lines = lambda location, location_type, timeout=None: fake_api(location, location_type)
+    try:
+        fetch_area('England', 'nation', incremental=False)
+        fetch_area('England', 'nation', incremental=False)
+    finally:
+        covid_data_handler.stream_covid_csv_lines = stream_lines
+    assert fake_api.requests.count('areaName=England') == 3
+
+test_fetch_areas()
+test_fetch_area_always_reaches_the_api()
+test_connection_errors_are_raised_and_retried()
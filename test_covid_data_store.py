@@ -0,0 +1,95 @@
+import os
+import tempfile
+from covid_data_handler import convert_csv_to_dict
+from covid_data_handler import parse_csv_data
+from covid_data_handler import process_covid_dictionary_data
+from covid_data_handler import process_covid_api_csv_data
+from covid_data_store import CovidDataStore
+from covid_data_store import binary_file_name
+
+def test_from_file():
+    store = CovidDataStore.from_file('nation_2021-10-28.csv')
+    assert len(store) == 638
+    assert store.area_name == 'England'
+    assert store.date_at(0) == '2021-10-28'
+    assert store.value_at('newCasesBySpecimenDate', 0) is None
+    assert store.value_at('hospitalCases', 0) == 7_019
+
+def test_from_lines_matches_from_file():
+    from_lines = CovidDataStore.from_lines(parse_csv_data('nation_2021-10-28.csv'))
+    from_file = CovidDataStore.from_file('nation_2021-10-28.csv')
+    assert from_lines.dates == from_file.dates
+    assert from_lines.values == from_file.values
+    assert from_lines.missing == from_file.missing
+
+def test_window_sum_and_latest_value():
+    store = CovidDataStore.from_file('nation_2021-10-28.csv')
+    assert store.window_sum('newCasesBySpecimenDate', 2, 7) == 240_299
+    assert store.latest_value('cumDailyNsoDeathsByDeathDate') == 141_544
+    assert store.latest_row('hospitalCases', len(store) - 1) == -1
+
+def test_process_covid_api_csv_data():
+    store = CovidDataStore.from_file('nation_2021-10-28.csv')
+    assert process_covid_api_csv_data(store, False) == (240_299, 7_019, 141_544)
+
+def test_process_covid_dictionary_data():
+    covid_dict = convert_csv_to_dict(parse_csv_data('nation_2021-10-28.csv'))
+    assert process_covid_dictionary_data(covid_dict) == (240_299, 7_019, 141_544)
+
+def test_latest_index():
+    store = CovidDataStore.from_file('nation_2021-10-28.csv')
+    assert store.latest['newCasesBySpecimenDate'] == 1
+    assert store.latest['hospitalCases'] == 0
+    assert store.window_start['newCasesBySpecimenDate'] == 2
+    assert store.values['cumDailyNsoDeathsByDeathDate'][store.latest['cumDailyNsoDeathsByDeathDate']] == 141_544
+    assert store.headline_figures() == (240_299, 7_019, 141_544)
+    assert process_covid_api_csv_data(store, True) == (240_299, 7_019, 141_544)
+
+def test_latest_index_follows_publication_lag():
+    lines = parse_csv_data('nation_2021-10-28.csv')
+    no_lag = CovidDataStore.from_lines(lines[:1] + lines[2:])
+    assert no_lag.latest['newCasesBySpecimenDate'] == 0
+    assert no_lag.headline_figures()[0] == 240_299
+    longer_lag = [line.rsplit(',', 1)[0] + ',' if 0 < number < 4 else line for number, line in enumerate(lines)]
+    store = CovidDataStore.from_lines(longer_lag)
+    assert store.latest['newCasesBySpecimenDate'] == 3
+    assert store.headline_figures()[0] == CovidDataStore.from_lines(lines).window_sum('newCasesBySpecimenDate', 4, 7)
+    too_short = CovidDataStore.from_lines(lines[:8])
+    assert too_short.window_start['newCasesBySpecimenDate'] == -1
+    assert too_short.headline_figures()[0] == 0
+
+def test_binary_round_trip():
+    store = CovidDataStore.from_file('nation_2021-10-28.csv')
+    with tempfile.TemporaryDirectory() as cache_dir:
+        file_name = binary_file_name(cache_dir, 'England', 'nation')
+        store.save_binary(file_name)
+        loaded = CovidDataStore.load_binary(file_name)
+        assert loaded.area_name == 'England'
+        assert len(loaded) == 638
+        assert loaded.dates == store.dates
+        assert loaded.values == store.values
+        assert loaded.missing == store.missing
+        assert process_covid_api_csv_data(loaded, False) == (240_299, 7_019, 141_544)
+        assert loaded.window_start == store.window_start
+        del loaded
+
+def test_load_binary_rejects_other_files():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        file_name = os.path.join(cache_dir, 'not_a_store.bin')
+        with open(file_name, 'wb') as binary_file:
+            binary_file.write(bytes(512))
+        try:
+            CovidDataStore.load_binary(file_name)
+            assert False, 'Its broken'
+        except ValueError:
+            pass
+
+test_from_file()
+test_from_lines_matches_from_file()
+test_window_sum_and_latest_value()
+test_process_covid_api_csv_data()
+test_process_covid_dictionary_data()
+test_latest_index()
+test_latest_index_follows_publication_lag()
+test_binary_round_trip()
+test_load_binary_rejects_other_files()
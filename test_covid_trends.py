@@ -0,0 +1,42 @@
+from datetime import date
+from covid_data_store import CovidDataStore
+from covid_trends import downsample
+from covid_trends import rollups
+from covid_trends import select
+from covid_trends import sparkline
+from covid_trends import trend
+
+def test_rollups_keep_the_totals():
+    store = CovidDataStore.from_file('nation_2021-10-28.csv')
+    area_rollups = rollups(store)
+    daily = area_rollups['newCasesBySpecimenDate', 'daily']
+    weekly = area_rollups['newCasesBySpecimenDate', 'weekly']
+    monthly = area_rollups['newCasesBySpecimenDate', 'monthly']
+    assert sum(daily.values) == sum(weekly.values) == sum(monthly.values)
+    assert all(date.fromordinal(ordinal).weekday() == 0 for ordinal in weekly.dates)
+    assert all(date.fromordinal(ordinal).day == 1 for ordinal in monthly.dates)
+    assert area_rollups['cumDailyNsoDeathsByDeathDate', 'monthly'].values[-1] == 141_544
+    assert rollups(store) is area_rollups
+
+def test_select_and_downsample():
+    store = CovidDataStore.from_file('nation_2021-10-28.csv')
+    daily = rollups(store)['hospitalCases', 'daily']
+    dates, values = select(daily, date(2021, 1, 1), date(2021, 3, 31))
+    assert len(dates) == 90 and date.fromordinal(dates[0]) == date(2021, 1, 1)
+    kept_dates, kept_values = downsample(dates, values, 20)
+    assert len(kept_dates) <= 20
+    assert max(kept_values) == max(values) and min(kept_values) == min(values)
+    assert list(kept_dates) == sorted(kept_dates)
+
+def test_trend_resolution_and_points():
+    store = CovidDataStore.from_file('nation_2021-10-28.csv')
+    assert trend(store, 'cases', max_points=50)['resolution'] == 'weekly'
+    assert trend(store, 'cases', max_points=10)['resolution'] == 'monthly'
+    result = trend(store, 'deaths', date(2021, 10, 1), resolution='daily')
+    assert result['points'][-1] == ['2021-10-15', 141_544]
+    assert len(sparkline(store, 'cases').split()) <= 120
+    assert len(sparkline(store, 'cases', resolution='weekly').split()) == len(trend(store, 'cases', resolution='weekly', max_points=120)['points'])
+
+test_rollups_keep_the_totals()
+test_select_and_downsample()
+test_trend_resolution_and_points()
@@ -0,0 +1,77 @@
+from flask import Flask
+import covid_data_handler
+from covid_data_handler import get_s
+from covid_data_store import CovidDataStore
+from covid_news_handling import load_articles
+from covid_news_handling import removed
+from dashboard_api import api
+from dashboard_snapshot import publish
+
+app = Flask(__name__)
+app.register_blueprint(api)
+
+def test_get_metrics():
+    publish(metrics=[1, 2, 3, 240_299, 7_019, 141_544], location='Exeter')
+    client = app.test_client()
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.get_json()['national'] == {'location': 'England', 'cases_7day': 240_299, 'hospital_cases': 7_019, 'deaths_total': 141_544}
+    assert client.get('/api/metrics', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+def test_etag_only_changes_with_payload():
+    client = app.test_client()
+    etag = client.get('/api/metrics').headers['ETag']
+    publish(updates=[])
+    assert client.get('/api/metrics', headers={'If-None-Match': etag}).status_code == 304
+    response = client.get('/api/metrics')
+    assert 'Last-Modified' not in response.headers
+    publish(metrics=[2, 2, 3, 240_299, 7_019, 141_544])
+    assert client.get('/api/metrics', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'}).status_code == 200
+
+def test_schedule_and_delete_update():
+    client = app.test_client()
+    assert client.post('/api/updates', json={'name': 'api test', 'time': '25:00'}).status_code == 400
+    response = client.post('/api/updates', json={'name': 'api test', 'time': '12:30', 'news': True})
+    assert response.status_code == 201
+    assert client.post('/api/updates', json={'name': 'api test', 'time': '12:30'}).status_code == 409
+    assert [update['title'] for update in client.get('/api/updates').get_json()['updates']] == ['api test']
+    assert client.delete('/api/updates/api test').status_code == 204
+    assert client.delete('/api/updates/api test').status_code == 404
+    assert client.get('/api/updates').get_json() == {'updates': []}
+    assert get_s().empty()
+
+def test_delete_article():
+    removed.clear()
+    load_articles([{'title': 'api article', 'content': 'content', 'url': 'https://example.com/api'}])
+    client = app.test_client()
+    assert client.get('/api/news').get_json()['articles'][-1]['title'] == 'api article'
+    assert client.delete('/api/news/api article').status_code == 204
+    assert client.delete('/api/news/api article').status_code == 404
+
+def test_get_trend():
+    covid_data_handler.area_stores['England', 'nation'] = CovidDataStore.from_file('nation_2021-10-28.csv')
+    client = app.test_client()
+    response = client.get('/api/trends/cases?area=England&area_type=nation&resolution=weekly&points=30')
+    assert response.status_code == 200
+    assert response.get_json()['resolution'] == 'weekly' and len(response.get_json()['points']) <= 30
+    assert client.get('/api/trends/cases?area=England&area_type=nation&resolution=weekly&points=30', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert client.get('/api/trends/vaccines?area=England&area_type=nation').status_code == 400
+    assert client.get('/api/trends/cases?area=England&area_type=nation&start=yesterday').status_code == 400
+    assert client.get('/api/trends/cases?area=Nowhere&area_type=ltla').status_code == 404
+    del covid_data_handler.area_stores['England', 'nation']
+def test_get_analytics():
+    covid_data_handler.area_stores['England', 'nation'] = CovidDataStore.from_file('nation_2021-10-28.csv')
+    client = app.test_client()
+    response = client.get('/api/analytics')
+    assert response.status_code == 200
+    england = [area for area in response.get_json()['areas'] if area['area'] == 'England'][0]
+    assert england['date'] == '2021-10-27' and england['rolling_sum'] == 206_057 and england['window'] == 7
+    assert client.get('/api/analytics', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    del covid_data_handler.area_stores['England', 'nation']
+
+test_get_metrics()
+test_etag_only_changes_with_payload()
+test_schedule_and_delete_update()
+test_delete_article()
+test_get_trend()
+test_get_analytics()
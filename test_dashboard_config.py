@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+from dashboard_config import ConfigService
+
+VALID = {'api_key': '', 'area_name': 'Exeter', 'location_type': 'ltla', 'covid_file_name': 'data.csv', 'max_workers': 4, 'batch_areas': [['Devon', 'utla']]}
+
+def write_config(file_name, config_data):
+    with open(file_name, 'w', encoding='cp1252') as json_data_file:
+        json.dump(config_data, json_data_file)
+
+def test_config_is_cached_and_read_only():
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'config.json')
+        write_config(file_name, VALID)
+        service = ConfigService(file_name, check_interval=60, environ={})
+        config = service.get()
+        assert config['area_name'] == 'Exeter' and config['batch_areas'] == (('Devon', 'utla'), )
+        for _ in range(100):
+            assert service.get() is config
+        assert service.loads == 1
+        try:
+            config['area_name'] = 'Leeds'
+            assert False
+        except TypeError:
+            pass
+
+def test_reload_when_the_file_changes():
+    now = [0.0]
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'config.json')
+        write_config(file_name, VALID)
+        service = ConfigService(file_name, check_interval=1, environ={}, clock=lambda: now[0])
+        assert service.get()['max_workers'] == 4
+        write_config(file_name, dict(VALID, max_workers=16))
+        assert service.get()['max_workers'] == 4
+        now[0] += 2
+        assert service.get()['max_workers'] == 16
+        now[0] += 2
+        assert service.get()['max_workers'] == 16
+        assert service.loads == 2
+        write_config(file_name, dict(VALID, location_type='town', extra_field=1))
+        now[0] += 2
+        assert service.get()['max_workers'] == 16
+
+def test_validation_and_environment_overrides():
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'config.json')
+        write_config(file_name, {'api_key': 1, 'location_type': 'town'})
+        try:
+            ConfigService(file_name, environ={}).get()
+            assert False
+        except ValueError as error:
+            assert '"api_key" must be a str' in str(error)
+            assert '"area_name" is missing' in str(error)
+            assert '"location_type" must be one of' in str(error)
+        write_config(file_name, VALID)
+        config = ConfigService(file_name, environ={'DASHBOARD_API_KEY': 'secret', 'DASHBOARD_MAX_WORKERS': '8', 'HOME': '/root'}).get()
+        assert config['api_key'] == 'secret' and config['max_workers'] == 8
+        config = ConfigService(file_name, environ={'DASHBOARD_API_KEY': '12e34', 'DASHBOARD_AREA_NAME': '1234', 'DASHBOARD_UNRELATED': '1'}).get()
+        assert config['api_key'] == '12e34' and config['area_name'] == '1234'
+        assert 'unrelated' not in config
+
+test_config_is_cached_and_read_only()
+test_reload_when_the_file_changes()
+test_validation_and_environment_overrides()
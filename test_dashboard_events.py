@@ -0,0 +1,57 @@
+import json
+from dashboard_events import Broadcaster
+from dashboard_events import encode_event
+from dashboard_events import snapshot_diff
+from dashboard_snapshot import DashboardSnapshot
+
+def decode(message):
+    lines = message.decode('utf-8').strip().split('\n')
+    fields = dict(line.split(': ', 1) for line in lines)
+    return fields['event'], json.loads(fields['data'])
+
+def test_snapshot_diff():
+    old = DashboardSnapshot(version=1, metrics=(1, 2, 3, 4, 5, 6), articles=({'title': 'one', 'content': 'first'}, {'title': 'two', 'content': 'second'}))
+    assert snapshot_diff(old, old._replace(version=2)) == []
+    new = old._replace(version=2, metrics=(1, 2, 3, 4, 5, 7), articles=({'title': 'two', 'content': 'second'}, {'title': 'three', 'content': 'third'}))
+    events = dict(snapshot_diff(old, new))
+    assert sorted(events) == ['metrics', 'news']
+    assert events['metrics']['national']['deaths_total'] == 7
+    assert events['news'] == {'added': [{'title': 'three', 'content': 'third'}], 'removed': ['one']}
+
+def test_encode_event():
+    message = encode_event('metrics', {'cases': 1}, 4)
+    assert message == b'id: 4\nevent: metrics\ndata: {"cases":1}\n\n'
+    assert decode(message) == ('metrics', {'cases': 1})
+
+def test_fan_out_and_slow_clients():
+    broadcaster = Broadcaster(queue_size=2)
+    first = DashboardSnapshot(version=1, location='Exeter')
+    fast = broadcaster.subscribe(first)
+    slow = broadcaster.subscribe(first)
+    assert fast.get_nowait() is slow.get_nowait()
+    assert len(broadcaster) == 2
+    broadcaster.publish_snapshot(first._replace(version=2, metrics=(1, 2, 3, 4, 5, 6)))
+    assert decode(fast.get_nowait())[0] == 'metrics'
+    broadcaster.publish_snapshot(first._replace(version=1, metrics=(0, 0, 0, 0, 0, 0)))
+    broadcaster.publish_snapshot(first._replace(version=3, metrics=(2, 2, 3, 4, 5, 6)))
+    broadcaster.publish_snapshot(first._replace(version=4, metrics=(3, 2, 3, 4, 5, 6)))
+    assert fast.qsize() == 2 and len(broadcaster) == 1
+    while not slow.empty():
+        last = slow.get_nowait()
+    assert last is Broadcaster.CLOSE
+
+def test_stream():
+    broadcaster = Broadcaster(heartbeat=0.01)
+    stream = broadcaster.stream(DashboardSnapshot(version=5, location='Exeter'))
+    assert next(stream) == b'retry: 5000\n\n'
+    event, state = decode(next(stream))
+    assert event == 'snapshot' and state['metrics']['local']['location'] == 'Exeter'
+    assert next(stream) == b': keep-alive\n\n'
+    broadcaster.close_all()
+    assert list(stream) == []
+    assert len(broadcaster) == 0
+
+test_snapshot_diff()
+test_encode_event()
+test_fan_out_and_slow_clients()
+test_stream()
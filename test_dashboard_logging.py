@@ -0,0 +1,60 @@
+import json
+import logging
+import os
+import tempfile
+from dashboard_logging import configure_logging
+from dashboard_logging import request_id
+from dashboard_logging import stop_logging
+
+def read_lines(file_name):
+    with open(file_name, encoding='utf-8') as log_file:
+        return [json.loads(line) for line in log_file]
+
+def remove_handlers():
+    stop_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+def test_json_lines_with_request_id():
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'test.log')
+        configure_logging({'file': file_name, 'level': 'INFO'})
+        token = request_id.set('abc123')
+        try:
+            logging.getLogger('covid_data_handler').info('Fetched %s rows', 638)
+        finally:
+            request_id.reset(token)
+        logging.getLogger('covid_data_handler').debug('Not written')
+        remove_handlers()
+        lines = read_lines(file_name)
+    assert len(lines) == 1
+    assert lines[0]['message'] == 'Fetched 638 rows'
+    assert lines[0]['logger'] == 'covid_data_handler'
+    assert lines[0]['request_id'] == 'abc123'
+
+def test_levels_per_module():
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'test.log')
+        configure_logging({'file': file_name, 'level': 'WARNING', 'levels': {'scheduler': 'DEBUG'}})
+        logging.getLogger('scheduler').debug('Scheduler detail')
+        logging.getLogger('main').info('Not written')
+        remove_handlers()
+        logging.getLogger('scheduler').setLevel(logging.NOTSET)
+        messages = [line['message'] for line in read_lines(file_name)]
+    assert messages == ['Scheduler detail']
+
+def test_rotation():
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'test.log')
+        configure_logging({'file': file_name, 'max_bytes': 2_000, 'backup_count': 2, 'format': 'text', 'async': False})
+        for number in range(200):
+            logging.getLogger('main').warning('Line number %s', number)
+        remove_handlers()
+        assert sorted(os.listdir(directory)) == ['test.log', 'test.log.1', 'test.log.2']
+        assert os.path.getsize(file_name) <= 2_000
+
+test_json_lines_with_request_id()
+test_levels_per_module()
+test_rotation()
@@ -0,0 +1,30 @@
+from jinja2 import Template
+from dashboard_records import Article, Update
+
+def test_update_content_from_flags():
+    assert Update('morning', '09:00', True, True, True)['content'] == 'REPEATING: Updating covid and news at 09:00'
+    assert Update('lunch', '12:30', False, True, False).content == 'Updating news at 12:30'
+    assert Update('noon', '12:00').content == 'Updating nothing at 12:00'
+    update = Update('morning', '09:00', True, False, False)
+    assert Update.from_dict(update.as_dict()) == update
+    assert update.get('missing') is None
+
+def test_article_fields():
+    article = Article.from_dict({'title': 'Covid story', 'content': 'Content', 'url': 'https://example.com/1',
+        'publishedAt': '2021-12-01T10:00:00Z', 'description': 'Not kept', 'source': {'name': 'Example'}})
+    assert article['title'] == 'Covid story' and article.get('url') == 'https://example.com/1'
+    assert article.as_dict() == {'title': 'Covid story', 'content': 'Content', 'url': 'https://example.com/1', 'publishedAt': '2021-12-01T10:00:00Z', 'source': 'Example'}
+    assert Article.from_dict(article.as_dict()) == article
+    assert article.get('description', 'default') == 'default'
+    assert not hasattr(article, '__dict__')
+    assert Article.from_dict({'title': 'Covid story', 'publishedAt': '2021-12-01T' + '10:00:00Z'}).published_at is article.published_at
+
+def test_records_render_like_dictionaries():
+    template = Template("{% for update in updates %}{{ update['title'] }}: {{ update['content'] }};{% endfor %}"
+        "{% for news in news_articles %}{{ news['title'] }}{% endfor %}")
+    page = template.render(updates=[Update('morning', '09:00', True, False, True)], news_articles=[Article('Covid story', 'Content')])
+    assert page == 'morning: REPEATING: Updating covid at 09:00;Covid story'
+
+test_update_content_from_flags()
+test_article_fields()
+test_records_render_like_dictionaries()
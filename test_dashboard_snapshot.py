@@ -0,0 +1,25 @@
+from dashboard_snapshot import get_snapshot
+from dashboard_snapshot import publish
+
+def test_publish_swaps_snapshot():
+    before = get_snapshot()
+    after = publish(metrics=[1, 2, 3, 4, 5, 6], location='Exeter')
+    assert get_snapshot() is after
+    assert after.version == before.version + 1
+    assert after.metrics == (1, 2, 3, 4, 5, 6)
+    assert after.render_arguments['local_7day_infections'] == 1
+    assert after.render_arguments['hospital_cases'] == 'Hospital cases: 5'
+    assert after.render_arguments['location'] == 'Exeter'
+
+def test_old_snapshot_is_unchanged():
+    articles = [{'title': 'one', 'content': 'first'}]
+    old = publish(articles=articles)
+    articles.append({'title': 'two', 'content': 'second'})
+    new = publish(articles=articles)
+    assert len(old.articles) == 1
+    assert len(old.render_arguments['news_articles']) == 1
+    assert len(new.articles) == 2
+    assert new.metrics == old.metrics
+
+test_publish_swaps_snapshot()
+test_old_snapshot_is_unchanged()
@@ -0,0 +1,55 @@
+import instrumentation
+from instrumentation import increment
+from instrumentation import observe
+from instrumentation import render_prometheus
+from instrumentation import reset
+from instrumentation import timer
+
+def test_nothing_is_recorded_when_disabled():
+    reset()
+    instrumentation.enabled = False
+    observe('test_seconds', 0.1)
+    increment('test_total')
+    with timer('test_seconds'):
+        pass
+    text = render_prometheus()
+    assert 'test_seconds' not in text
+    assert 'test_total' not in text
+
+def test_histogram_buckets():
+    reset()
+    instrumentation.enabled = True
+    try:
+        observe('test_seconds', 0.003, api='covid')
+        observe('test_seconds', 0.2, api='covid')
+        observe('test_seconds', 100, api='covid')
+        text = render_prometheus()
+    finally:
+        instrumentation.enabled = False
+        reset()
+    assert 'test_seconds_bucket{api="covid",le="0.0025"} 0' in text
+    assert 'test_seconds_bucket{api="covid",le="0.005"} 1' in text
+    assert 'test_seconds_bucket{api="covid",le="0.25"} 2' in text
+    assert 'test_seconds_bucket{api="covid",le="+Inf"} 3' in text
+    assert 'test_seconds_count{api="covid"} 3' in text
+
+def test_counters_timers_and_collectors():
+    reset()
+    instrumentation.enabled = True
+    try:
+        increment('test_total', result='hit')
+        increment('test_total', 2, result='hit')
+        with timer('test_render_seconds'):
+            pass
+        instrumentation.add_collector(lambda: [('test_entries', {'name': 'say "hi"'}, 4)])
+        text = render_prometheus()
+    finally:
+        instrumentation.enabled = False
+        reset()
+    assert 'test_total{result="hit"} 3' in text
+    assert 'test_render_seconds_count 1' in text
+    assert 'test_entries{name="say \\"hi\\""} 4' in text
+
+test_nothing_is_recorded_when_disabled()
+test_histogram_buckets()
+test_counters_timers_and_collectors()
@@ -0,0 +1,126 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import covid_news_handling
+from covid_news_handling import NewsSession
+
+FEED = json.dumps({'status': 'ok', 'totalResults': 1, 'articles': [{
+    'source': {'id': None, 'name': 'Example'}, 'author': 'Someone', 'title': 'Covid story',
+    'description': 'A long description', 'url': 'https://example.com/1', 'urlToImage': 'https://example.com/1.png',
+    'publishedAt': '2021-12-01T10:00:00Z', 'content': 'Content of the story'}]}).encode()
+
+class FakeNewsApi(BaseHTTPRequestHandler):
+    requests = []
+    failures = 0
+    error = None
+
+    def do_GET(self):
+        FakeNewsApi.requests.append((self.path, self.headers.get('X-Api-Key'), self.headers.get('If-None-Match')))
+        if FakeNewsApi.error:
+            body = json.dumps({'status': 'error', 'code': 'apiKeyInvalid', 'message': 'Your API key is invalid'}).encode()
+            self.send_response(FakeNewsApi.error)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if FakeNewsApi.failures:
+            FakeNewsApi.failures -= 1
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(FEED)))
+        self.end_headers()
+        self.wfile.write(FEED)
+
+    def log_message(self, *args):
+        pass
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeNewsApi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def test_conditional_requests_and_trimmed_articles():
+    server = start_server()
+    url = covid_news_handling.NEWS_API_URL
+    covid_news_handling.NEWS_API_URL = 'http://127.0.0.1:%s/v2/everything' % server.server_port
+    session = NewsSession('secret', timeout=(1, 2), backoff=0)
+    try:
+        FakeNewsApi.requests = []
+        first = session.get_news('Covid & COVID-19')
+        assert [article.as_dict() for article in first['articles']] == [{'title': 'Covid story', 'content': 'Content of the story',
+            'url': 'https://example.com/1', 'publishedAt': '2021-12-01T10:00:00Z', 'source': 'Example'}]
+        assert session.get_news('Covid & COVID-19') is first
+        assert FakeNewsApi.requests[0][0] == '/v2/everything?q=Covid+%26+COVID-19&language=en&sortBy=publishedAt'
+        assert [request[1:] for request in FakeNewsApi.requests] == [('secret', None), ('secret', '"v1"')]
+    finally:
+        covid_news_handling.NEWS_API_URL = url
+        session.close()
+        server.shutdown()
+
+def test_retries_with_backoff():
+    server = start_server()
+    url = covid_news_handling.NEWS_API_URL
+    covid_news_handling.NEWS_API_URL = 'http://127.0.0.1:%s/v2/everything' % server.server_port
+    session = NewsSession('secret', timeout=(1, 2), retries=2, backoff=0)
+    try:
+        FakeNewsApi.requests = []
+        FakeNewsApi.failures = 2
+        assert session.get_news('Covid')['articles'][0]['title'] == 'Covid story'
+        assert len(FakeNewsApi.requests) == 3
+        FakeNewsApi.failures = 3
+        try:
+            NewsSession('secret', timeout=(1, 2), retries=2, backoff=0).get_news('Covid')
+            assert False
+        except Exception as error:
+            assert '503' in str(error)
+    finally:
+        covid_news_handling.NEWS_API_URL = url
+        FakeNewsApi.failures = 0
+        session.close()
+        server.shutdown()
+
+def test_error_statuses_raise():
+    server = start_server()
+    url = covid_news_handling.NEWS_API_URL
+    covid_news_handling.NEWS_API_URL = 'http://127.0.0.1:%s/v2/everything' % server.server_port
+    session = NewsSession('wrong', timeout=(1, 2), retries=2, backoff=0)
+    try:
+        FakeNewsApi.requests = []
+        FakeNewsApi.error = 401
+        try:
+            session.get_news('Covid')
+            assert False
+        except Exception as error:
+            assert '401' in str(error)
+        assert len(FakeNewsApi.requests) == 1
+    finally:
+        covid_news_handling.NEWS_API_URL = url
+        FakeNewsApi.error = None
+        session.close()
+        server.shutdown()
+
+def test_decode_news_in_chunks():
+    body = json.dumps({'status': 'ok', 'totalResults': 12345, 'articles': [{'source': {'name': 'Example', 'title': 'not an article'},
+        'title': 'Story %d' % number, 'content': 'Content', 'url': 'https://example.com/%d' % number} for number in range(3)]}).encode()
+    for size in (1, 7, len(body)):
+        news = covid_news_handling.decode_news(body[start:start + size] for start in range(0, len(body), size))
+        assert news['totalResults'] == 12345
+        assert [article['title'] for article in news['articles']] == ['Story 0', 'Story 1', 'Story 2']
+    try:
+        covid_news_handling.decode_news([b'{"articles": [{"title": "cut off"'])
+        assert False
+    except ValueError:
+        pass
+
+test_conditional_requests_and_trimmed_articles()
+test_retries_with_backoff()
+test_error_statuses_raise()
+test_decode_news_in_chunks()
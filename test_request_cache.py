@@ -0,0 +1,84 @@
+import threading
+import time
+from request_cache import RequestCache
+
+class FakeClock:
+    """A clock that only moves when the test moves it"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_ttl():
+    clock = FakeClock()
+    cache = RequestCache(ttl=10, clock=clock)
+    calls = []
+    assert cache.get_or_call('key', calls.append, 1) is None
+    cache.get_or_call('key', calls.append, 2)
+    clock.now = 11
+    cache.get_or_call('key', calls.append, 3)
+    assert calls == [1, 3]
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'coalesced': 0, 'entries': 1}
+
+def test_lru_eviction():
+    cache = RequestCache(max_entries=2)
+    cache.get_or_call('a', str, 'a')
+    cache.get_or_call('b', str, 'b')
+    cache.get_or_call('a', str, 'a')
+    cache.get_or_call('c', str, 'c')
+    cache.get_or_call('a', str, 'a')
+    cache.get_or_call('b', str, 'b')
+    assert cache.hits == 2
+    assert cache.misses == 4
+
+def test_single_flight():
+    cache = RequestCache()
+    release = threading.Event()
+    calls = []
+    def slow_request():
+        calls.append(1)
+        release.wait(5)
+        return {'articles': []}
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_call('news', slow_request))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while cache.coalesced + cache.misses < 8:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+
+def test_errors_are_not_cached():
+    cache = RequestCache()
+    def failing_request():
+        raise ValueError('api down')
+    for _ in range(2):
+        try:
+            cache.get_or_call('key', failing_request)
+        except ValueError:
+            pass
+    assert cache.misses == 2
+    assert cache.stats()['entries'] == 0
+def test_exits_are_not_cached():
+    cache = RequestCache()
+    def exiting_request():
+        raise SystemExit('no connection')
+    try:
+        cache.get_or_call('key', exiting_request)
+        assert False, 'Its broken'
+    except SystemExit:
+        pass
+    assert cache.stats()['entries'] == 0
+    assert cache.get_or_call('key', lambda: 'data') == 'data'
+
+test_ttl()
+test_lru_eviction()
+test_single_flight()
+test_errors_are_not_cached()
+test_exits_are_not_cached()
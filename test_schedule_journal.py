@@ -0,0 +1,87 @@
+import os
+import tempfile
+import threading
+import time
+import covid_data_handler
+from schedule_journal import ScheduleJournal
+from scheduler import Scheduler
+
+def test_replay_active_updates():
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'schedules.journal')
+        journal = ScheduleJournal(file_name, fsync=False)
+        journal.record_add('morning', '09:00', True, False, True, 100.0)
+        journal.record_add('lunch', '12:30', False, True, False, 200.0)
+        journal.record_ran('morning', 150.0)
+        journal.record_remove('lunch')
+        journal.record_remove('never added')
+        journal.close()
+        with open(file_name, 'a', encoding='utf-8') as journal_file:
+            journal_file.write('{"op":"add","name":"half wri')
+        active = ScheduleJournal(file_name).replay()
+        assert list(active) == ['morning']
+        assert active['morning']['at'] == '09:00'
+        assert active['morning']['ran'] == 150.0
+
+def test_compaction():
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'schedules.journal')
+        journal = ScheduleJournal(file_name, fsync=False, compact_after=10)
+        for number in range(50):
+            journal.record_add('update %s' % number, '10:00', True, True, False, 100.0)
+            if number % 5:
+                journal.record_remove('update %s' % number)
+        journal.close()
+        with open(file_name, 'r', encoding='utf-8') as journal_file:
+            assert len(journal_file.readlines()) < 40
+        assert len(ScheduleJournal(file_name).replay()) == 10
+
+def test_enter_many():
+    scheduler = Scheduler()
+    ran = []
+    done = threading.Event()
+    now = time.time()
+    jobs = scheduler.enter_many([(now + 0.05, 2, ran.append, ('second', ), 'a', None),
+        (now + 0.01, 1, ran.append, ('first', ), 'b', None),
+        (now + 0.1, 3, done.set, (), 'a', None)])
+    assert len(jobs) == 3
+    assert done.wait(2)
+    assert ran == ['first', 'second']
+    scheduler.stop()
+
+def test_restore_coalesces_missed_updates():
+    with tempfile.TemporaryDirectory() as directory:
+        journal = covid_data_handler.open_journal(os.path.join(directory, 'schedules.journal'), False)
+        now = time.time()
+        journal.record_add('missed covid', '08:00', True, False, False, now - 3600)
+        journal.record_add('missed news', '08:30', False, True, False, now - 1800)
+        journal.record_add('daily', '07:00', True, True, True, now - 86400 * 2 - 60)
+        journal.record_ran('daily', now - 86400 - 30)
+        for number in range(2000):
+            journal.record_add('later %s' % number, '23:00', True, False, False, now + 3600)
+        caught_up = []
+        catch_up_updates = covid_data_handler.catch_up_updates
+        covid_data_handler.catch_up_updates = lambda covid, news: caught_up.append((covid, news))
+        try:
+            start = time.perf_counter()
+            assert covid_data_handler.restore_schedules() == 2001
+            assert time.perf_counter() - start < 2
+            time.sleep(0.1)
+            assert caught_up == [(True, True)]
+            titles = [update['title'] for update in covid_data_handler.updates]
+            assert 'missed covid' not in titles and 'daily' in titles
+            daily_jobs = covid_data_handler.schedules['daily']
+            assert all(now + 86400 - 120 < job.run_at <= now + 86400 for job in daily_jobs)
+            assert len(covid_data_handler.journal.replay()) == 2001
+        finally:
+            covid_data_handler.catch_up_updates = catch_up_updates
+            for update_name in list(covid_data_handler.schedules):
+                covid_data_handler.get_s().cancel_name(update_name)
+            covid_data_handler.schedules.clear()
+            covid_data_handler.updates.clear()
+            covid_data_handler.open_journal('')
+
+test_replay_active_updates()
+test_compaction()
+test_enter_many()
+test_restore_coalesces_missed_updates()
@@ -0,0 +1,123 @@
+import logging
+import sys
+import threading
+import time
+from scheduler import CoalescedAction, Scheduler
+
+def test_jobs_run_in_background():
+    scheduler = Scheduler()
+    ran = []
+    done = threading.Event()
+    scheduler.enter(0.05, 2, ran.append, argument=('second', ))
+    scheduler.enter(0.01, 1, ran.append, argument=('first', ))
+    scheduler.enter(0.1, 3, done.set)
+    assert done.wait(2)
+    assert ran == ['first', 'second']
+    assert scheduler.empty()
+    scheduler.stop()
+
+def test_cancel_name():
+    scheduler = Scheduler()
+    ran = []
+    scheduler.enter(0.05, 1, ran.append, argument=(1, ), name='update test')
+    scheduler.enter(0.05, 2, ran.append, argument=(2, ), name='update test')
+    kept = scheduler.enter(0.05, 3, ran.append, argument=(3, ), name='other update')
+    assert scheduler.cancel_name('update test') == 2
+    assert len(scheduler.queue) == 1
+    time.sleep(0.2)
+    assert ran == [3]
+    assert not scheduler.cancel(kept)
+    scheduler.stop()
+
+def test_cancel_all():
+    scheduler = Scheduler()
+    ran = []
+    scheduler.enter(0.05, 1, ran.append, argument=(1, ), name='update test')
+    scheduler.enter(0.05, 2, ran.append, argument=(2, ), repeat_every=0.05)
+    assert scheduler.cancel_all() == 2
+    assert scheduler.empty() and scheduler.cancel_name('update test') == 0
+    time.sleep(0.2)
+    assert ran == []
+    scheduler.stop()
+
+def test_repeating_job():
+    scheduler = Scheduler()
+    runs = []
+    job = scheduler.enter(0.01, 1, runs.append, argument=(1, ), name='repeat', repeat_every=0.05)
+    time.sleep(0.2)
+    assert len(runs) >= 2
+    assert scheduler.queue == [job]
+    assert scheduler.cancel(job)
+    assert scheduler.empty()
+    scheduler.stop()
+
+def test_exiting_jobs_are_logged_and_repeat():
+    failures = []
+    handler = logging.Handler()
+    handler.emit = failures.append
+    logging.getLogger('scheduler').addHandler(handler)
+    scheduler = Scheduler()
+    runs = []
+    def exit_run():
+        runs.append(1)
+        sys.exit()
+    scheduler.enter(0.01, 1, exit_run, name='exit', repeat_every=0.05)
+    time.sleep(0.2)
+    scheduler.stop()
+    logging.getLogger('scheduler').removeHandler(handler)
+    assert len(runs) >= 2
+    assert len(failures) >= 2 and failures[0].exc_info[0] is SystemExit
+
+def test_job_lag_is_reported():
+    scheduler = Scheduler()
+    lags = []
+    done = threading.Event()
+    scheduler.on_job_start = lambda job, lag: lags.append(lag)
+    scheduler.enter(0, 1, done.set)
+    assert done.wait(2)
+    assert len(lags) == 1 and lags[0] >= 0
+    scheduler.stop()
+
+def test_coalesced_jobs_share_one_run():
+    now = [1000.0]
+    runs = []
+    updater = CoalescedAction(lambda: runs.append(now[0]), window=60, fresh_for=300, clock=lambda: now[0])
+    assert updater()
+    now[0] += 30
+    assert not updater()
+    now[0] += 200
+    assert not updater()
+    now[0] += 100
+    assert updater()
+    assert runs == [1000.0, 1330.0]
+    assert (updater.runs, updater.skipped) == (2, 2)
+
+def test_failed_run_is_not_fresh():
+    results = [False, True]
+    updater = CoalescedAction(lambda: results.pop(0), window=60)
+    assert not updater()
+    assert updater()
+    assert updater.runs == 1
+
+def test_jobs_due_together_run_once():
+    scheduler = Scheduler(max_workers=4)
+    runs = []
+    toasts = []
+    updater = CoalescedAction(lambda: (time.sleep(0.05), runs.append(1)), window=60)
+    for number in range(5):
+        scheduler.enter(0.01, 1, updater, name='update %s' % number)
+        scheduler.enter(0.01, 3, toasts.append, argument=(number, ), name='update %s' % number)
+    time.sleep(0.5)
+    assert runs == [1]
+    assert sorted(toasts) == [0, 1, 2, 3, 4]
+    scheduler.stop()
+
+test_jobs_run_in_background()
+test_cancel_name()
+test_cancel_all()
+test_repeating_job()
+test_exiting_jobs_are_logged_and_repeat()
+test_job_lag_is_reported()
+test_coalesced_jobs_share_one_run()
+test_failed_run_is_not_fresh()
+test_jobs_due_together_run_once()
@@ -0,0 +1,22 @@
+import subprocess
+import sys
+import time
+from startup_timer import StartupTimer
+
+def test_phases_are_reported():
+    timer = StartupTimer()
+    with timer.phase('sleep'):
+        time.sleep(0.01)
+    timer.record('background', 0.5)
+    report = timer.report(budget_ms=10_000)
+    assert report['sleep'] >= 10
+    assert report['background'] == 500
+    assert report['total'] >= report['sleep']
+
+def test_heavy_modules_are_imported_lazily():
+    code = 'import sys, covid_data_handler, covid_news_handling; print("requests" in sys.modules, "uk_covid19" in sys.modules)'
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.split() == ['False', 'False']
+
+test_phases_are_reported()
+test_heavy_modules_are_imported_lazily()
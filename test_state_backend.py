@@ -0,0 +1,154 @@
+import os
+import tempfile
+import time
+import covid_data_handler
+import covid_news_handling
+from dashboard_records import Article, Update
+from dashboard_snapshot import NO_METRICS, get_snapshot, publish
+from state_backend import DataPlane, MemoryBackend, SQLiteBackend
+
+def test_memory_backend_lease():
+    backend = MemoryBackend()
+    assert backend.acquire_leadership('a', 60)
+    assert not backend.acquire_leadership('b', 60)
+    backend.release_leadership('a')
+    assert backend.acquire_leadership('b', 0)
+    assert backend.acquire_leadership('a', 60)
+
+def test_sqlite_leader_election():
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'state.db')
+        leader = DataPlane(SQLiteBackend(database), poll_interval=60, owner='worker-1')
+        follower = DataPlane(SQLiteBackend(database), poll_interval=60, owner='worker-2')
+        elected = []
+        follower.on_leader.append(lambda: elected.append('worker-2'))
+        leader.tick()
+        follower.tick()
+        assert leader.is_leader and not follower.is_leader
+        leader.stop()
+        follower.tick()
+        assert follower.is_leader and elected == ['worker-2']
+        follower.stop()
+        leader.backend.close()
+        follower.backend.close()
+
+def test_commands_are_sent_to_the_leader():
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'state.db')
+        leader = DataPlane(SQLiteBackend(database), poll_interval=60, owner='worker-1')
+        follower = DataPlane(SQLiteBackend(database), poll_interval=60, owner='worker-2')
+        received = []
+        leader.register('remove_article', lambda what_to_remove: received.append(what_to_remove))
+        follower.register('remove_article', lambda what_to_remove: received.append('ran on the follower'))
+        leader.start()
+        follower.start()
+        follower.submit('remove_article', what_to_remove='Some title')
+        assert received == []
+        leader.tick()
+        assert received == ['Some title']
+        leader.stop()
+        follower.stop()
+        leader.backend.close()
+        follower.backend.close()
+
+def test_follower_reads_the_shared_snapshot():
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'state.db')
+        leader = DataPlane(SQLiteBackend(database), poll_interval=60, owner='worker-1')
+        follower = DataPlane(SQLiteBackend(database), poll_interval=60, owner='worker-2')
+        synced = []
+        follower.on_sync.append(lambda: synced.append(get_snapshot().metrics))
+        leader.tick()
+        follower.tick()
+        leader.share_snapshot(publish(metrics=[1, 2, 3, 240_299, 7_019, 141_544], updates=[{'title': 'shared', 'content': 'At 12:30'}]))
+        publish(metrics=NO_METRICS, updates=[])
+        assert follower.sync()
+        assert synced[-1] == (1, 2, 3, 240_299, 7_019, 141_544)
+        assert get_snapshot().metrics == (1, 2, 3, 240_299, 7_019, 141_544)
+        assert get_snapshot().updates[0]['title'] == 'shared'
+        assert not follower.sync()
+        leader.stop()
+        follower.stop()
+        leader.backend.close()
+        follower.backend.close()
+
+def test_lost_leadership_is_handed_over():
+    backend = MemoryBackend()
+    first = DataPlane(backend, poll_interval=60, lease_seconds=0, owner='worker-1')
+    second = DataPlane(backend, poll_interval=60, lease_seconds=60, owner='worker-2')
+    events = []
+    first.on_follower.append(lambda: events.append('worker-1 stopped'))
+    second.on_leader.append(lambda: events.append('worker-2 started'))
+    first.tick()
+    second.tick()
+    first.tick()
+    assert second.is_leader and not first.is_leader
+    assert events == ['worker-2 started', 'worker-1 stopped']
+    second.stop()
+
+def test_older_snapshots_are_not_shared():
+    leader = DataPlane(MemoryBackend(), poll_interval=60, owner='worker-1')
+    leader.tick()
+    older = publish(metrics=[1, 1, 1, 1, 1, 1])
+    newer = publish(metrics=[2, 2, 2, 2, 2, 2])
+    leader.share_snapshot(newer)
+    leader.share_snapshot(older)
+    assert leader.backend.read_state()[1]['metrics'] == (2, 2, 2, 2, 2, 2)
+    leader.stop()
+
+def test_failing_callbacks_dont_stop_the_loop():
+    backend = MemoryBackend()
+    leader = DataPlane(backend, poll_interval=0.01, lease_seconds=0.2, owner='worker-1')
+    other = DataPlane(backend, poll_interval=60, lease_seconds=60, owner='worker-2')
+    started = []
+    def fail():
+        started.append(True)
+        raise OSError('journal could not be read')
+    leader.on_leader.append(fail)
+    leader.on_leader.append(lambda: started.append('next callback'))
+    leader.start()
+    assert leader.is_leader and started == [True, 'next callback']
+    renew = backend.acquire_leadership
+    def flaky_acquire(owner, lease_seconds):
+        if not flaky_acquire.failed:
+            flaky_acquire.failed = True
+            raise RuntimeError('backend hiccup')
+        return renew(owner, lease_seconds)
+    flaky_acquire.failed = False
+    backend.acquire_leadership = flaky_acquire
+    time.sleep(0.5)
+    assert flaky_acquire.failed and leader._thread.is_alive()
+    other.tick()
+    assert leader.is_leader and not other.is_leader
+    leader.stop()
+
+def test_new_leader_rebuilds_articles_and_updates():
+    backend = MemoryBackend()
+    first = DataPlane(backend, poll_interval=60, lease_seconds=60, owner='worker-1')
+    second = DataPlane(backend, poll_interval=60, lease_seconds=60, owner='worker-2')
+    second.on_leader.extend([covid_news_handling.restore_articles, covid_data_handler.restore_updates])
+    first.tick()
+    second.tick()
+    covid_news_handling.load_articles([])
+    covid_data_handler.updates.clear()
+    first.share_snapshot(publish(articles=[Article('Shared story', 'Content', 'https://example.com/shared')],
+        updates=[Update('shared update', '12:30', covid=True)]))
+    first.stop()
+    second.tick()
+    assert second.is_leader
+    assert [article['title'] for article in covid_news_handling.get_articles()] == ['Shared story']
+    assert [update['title'] for update in covid_data_handler.updates] == ['shared update']
+    covid_news_handling.remove_from_articles('Shared story')
+    assert get_snapshot().articles == ()
+    second.stop()
+    covid_data_handler.updates.clear()
+    covid_news_handling.removed.clear()
+
+test_memory_backend_lease()
+test_sqlite_leader_election()
+test_commands_are_sent_to_the_leader()
+test_follower_reads_the_shared_snapshot()
+test_older_snapshots_are_not_shared()
+test_lost_leadership_is_handed_over()
+test_failing_callbacks_dont_stop_the_loop()
+test_new_leader_rebuilds_articles_and_updates()
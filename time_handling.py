@@ -28,3 +28,10 @@ def hhmmss_to_seconds( hhmmss: str ) -> int:
 def current_time_hhmm():
     """Gets the current time in hhmm"""
     return str(time.gmtime().tm_hour) + ":" + str(time.gmtime().tm_min)
+
+def seconds_until_hhmm( hhmm: str ) -> int:
+    """Gets the number of seconds until the clock next reaches hhmm, which is a whole day if it is hhmm now"""
+    seconds = hhmm_to_seconds( hhmm ) - hhmm_to_seconds( current_time_hhmm() )
+    if seconds <= 0:
+        seconds = 86400 - abs( seconds )
+    return seconds